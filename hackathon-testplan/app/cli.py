@@ -11,68 +11,29 @@ sys.path.insert(0, str(project_root))
 
 from core.models import ParsedEntities
 from core.generator import generate_plan_offline
-from nlp.llm_client import generate_plan_llm
-from rules.validator import validate_entities, annotate_plan
-from ingest.netlist_parser import parse_netlist
+from core.render import RENDERERS, write_plan
+from nlp.llm_client import generate_plan_llm_report
+from rules.validator import validate_entities, validate_against_netlist, annotate_plan
+from ingest.netlist_parser import load_netlist
 from ingest.pdf_parser import extract_pdf_hints
 from ingest.bom_parser import parse_bom
-import re
+from ingest.infer import infer_entities_from_text
 
 
-def infer_entities_from_text(text: str, title: str = "Design") -> ParsedEntities:
-    """Heuristically infer entities from text content"""
-    T = text.upper()
-    
-    # Rails - look for voltage patterns
-    rails = []
-    voltage_patterns = [
-        (r"\+?5V", 5.0), (r"\+?3V3", 3.3), (r"\+?3\.3V", 3.3),
-        (r"VCC5", 5.0), (r"VCC3V3", 3.3), (r"PWR_JACK", 5.0)
-    ]
-    
-    seen_voltages = set()
-    for pattern, voltage in voltage_patterns:
-        if re.search(pattern, T) and voltage not in seen_voltages:
-            rails.append({"name": f"+{voltage:g}V" if voltage == 5.0 else f"+{voltage:g}V", 
-                         "voltage": voltage, "tolerance_mv": 100})
-            seen_voltages.add(voltage)
-    
-    # Oscillators - look for crystal references
-    oscillators = []
-    if "Y1" in T or "16MHZ" in T:
-        oscillators.append({"ref": "Y1", "frequency_hz": 16000000, "tolerance_hz": 100000})
-    if "Y2" in T or "32MHZ" in T:
-        oscillators.append({"ref": "Y2", "frequency_hz": 32000000, "tolerance_hz": 100000})
-    
-    # Functional tests - infer from components
-    functional_tests = []
-    if "LORA" in T or "SX1276" in T:
-        functional_tests.append({"name": "LoRa BIT", "command": "bit.lora", "expected": "PASS"})
-    if "GPS" in T or "MAX-M10S" in T:
-        functional_tests.append({"name": "GPS BIT", "command": "bit.gps", "expected": "PASS"})
-    if "IMU" in T or "LSM6DSOX" in T:
-        functional_tests.append({"name": "IMU BIT", "command": "bit.imu", "expected": "PASS"})
-    if "I2C" in T:
-        functional_tests.append({"name": "I2C BIT", "command": "bit.i2c", "expected": "PASS"})
-    
-    # Defaults if nothing found
-    if not rails:
-        rails = [{"name": "+5V", "voltage": 5.0, "tolerance_mv": 100},
-                 {"name": "+3V3", "voltage": 3.3, "tolerance_mv": 100}]
-    if not functional_tests:
-        functional_tests.append({"name": "Full BIT", "command": "bit", "expected": "PASS"})
-    
-    return ParsedEntities.model_validate({
-        "title": title,
-        "rails": rails,
-        "oscillators": oscillators,
-        "functional_tests": functional_tests
-    })
+def generate_plan(ent: ParsedEntities, offline: bool = False):
+    """Offline plan, or LLM-enhanced within LLM_BUDGET_S; says why if enhancement was skipped."""
+    if offline:
+        return generate_plan_offline(ent)
+    plan, report = generate_plan_llm_report(ent)
+    if not report.enhanced:
+        print(f"[yellow]LLM enhancement skipped ({report.reason}); using the offline plan[/yellow]")
+    return plan
 
 
-def auto_command(input_path: Path, out: Path = Path("out/plan.md"), offline: bool = False):
+def auto_command(input_path: Path, out: Path = Path("out/plan.md"), offline: bool = False, fmt: str | None = None):
     """Auto-detect file type and generate plan"""
     suffix = input_path.suffix.lower()
+    netlist = None
     
     if suffix == ".json":
         data = json.loads(input_path.read_text())
@@ -92,28 +53,76 @@ def auto_command(input_path: Path, out: Path = Path("out/plan.md"), offline: boo
         text = "\n".join(hints)
         ent = infer_entities_from_text(text, title=input_path.name)
     elif suffix in (".txt", ".net", ".ipc"):
-        ent = parse_netlist(str(input_path))
+        ent, netlist = load_netlist(str(input_path))
     else:
         print(f"[red]Error: Unsupported file type: {suffix}[/red]")
         sys.exit(1)
 
-    plan = generate_plan_offline(ent) if offline else generate_plan_llm(ent)
-    plan = annotate_plan(plan, validate_entities(ent))
+    issues = validate_entities(ent)
+    if netlist is not None:
+        issues += validate_against_netlist(ent, netlist)
+    plan = generate_plan(ent, offline)
+    plan = annotate_plan(plan, issues)
     
     out.parent.mkdir(parents=True, exist_ok=True)
     entities_out = out.parent / "entities.json"
     entities_out.write_text(ent.model_dump_json(indent=2))
     
-    md = plan.to_markdown() if plan.steps else (plan.notes or "")
-    out.write_text(md)
+    write_plan(plan, out, fmt)
     
     print(f"[green]Wrote {out} and {entities_out}[/green]")
 
 
+def library_main(argv: list[str]):
+    """`cli.py library ...`: fill and inspect the design-doc library."""
+    parser = argparse.ArgumentParser(prog="cli.py library", description="Manage the design-doc library used for LLM context")
+    parser.add_argument("--store", default=None, help="Library directory (default: CHROMA_PATH or out/chroma)")
+    parser.add_argument("--backend", default=None, choices=["auto", "chroma", "local"], help="Retrieval backend (default: RAG_BACKEND)")
+    sub = parser.add_subparsers(dest="command", required=True)
+    sync = sub.add_parser("sync", help="Add new/changed PDF, .docx, .txt and .md files under a directory; prune deleted ones")
+    sync.add_argument("directory")
+    sync.add_argument("--workers", type=int, default=None, help="Extraction processes (default: one per CPU, 0 = in-process)")
+    sync.add_argument("--no-prune", action="store_true", help="Keep chunks of files that no longer exist")
+    sub.add_parser("stats", help="Show library statistics")
+    args = parser.parse_args(argv)
+
+    from storage.vectorstore import configure_store, get_store
+    store = configure_store(Path(args.store), backend=args.backend) if args.store or args.backend else get_store()
+
+    if args.command == "stats":
+        print(store.stats())
+        return
+
+    from rich.progress import Progress
+    from storage.library_sync import sync_library
+
+    directory = Path(args.directory)
+    if not directory.is_dir():
+        print(f"[red]Error: {directory} is not a directory[/red]")
+        sys.exit(1)
+    with Progress() as progress:
+        task = progress.add_task("Extracting", total=None)
+
+        def report(done: int, total: int, path: str):
+            progress.update(task, completed=done, total=total, description=f"Extracting {Path(path).name[:40]}")
+
+        stats = sync_library(directory, store, workers=args.workers, prune=not args.no_prune, progress=report)
+    for error in stats.errors[:20]:
+        print(f"[yellow]Skipped {error}[/yellow]")
+    print(f"[green]{stats.summary()}[/green]")
+    print(f"[green]Chunks: {stats.ingest.summary()}[/green]")
+
+
 def main():
-    parser = argparse.ArgumentParser(description="Hardware bring-up/test plan generator")
+    if len(sys.argv) > 1 and sys.argv[1] == "library":
+        library_main(sys.argv[2:])
+        return
+
+    parser = argparse.ArgumentParser(description="Hardware bring-up/test plan generator",
+                                     epilog="Library: cli.py library {sync DIR,stats} fills the design-doc library.")
     parser.add_argument("input", help="Path to design file (JSON, PDF, BOM, Altium, Netlist)")
-    parser.add_argument("--out", default="out/testplan.md", help="Output markdown path")
+    parser.add_argument("--out", default="out/testplan.md", help="Output path (.md, .csv, .jsonl or .xml)")
+    parser.add_argument("--format", choices=sorted(RENDERERS), default=None, help="Output format (default: inferred from --out suffix)")
     parser.add_argument("--offline", action="store_true", help="Force offline deterministic plan")
     parser.add_argument("--netlist", action="store_true", help="Input is a netlist file (IPC-D-356A format)")
     parser.add_argument("--auto", action="store_true", help="Auto-detect file type and generate both plan and entities")
@@ -127,14 +136,15 @@ def main():
     
     # Use auto command if requested
     if args.auto:
-        auto_command(input_path, Path(args.out), args.offline)
+        auto_command(input_path, Path(args.out), args.offline, args.format)
         return
     
     # Parse input based on type
+    netlist = None
     if args.netlist or input_path.suffix.lower() in ['.net', '.txt', '.356']:
         print(f"[blue]Parsing netlist file: {input_path}[/blue]")
         try:
-            ent = parse_netlist(str(input_path))
+            ent, netlist = load_netlist(str(input_path))
             print(f"[green]Extracted: {len(ent.rails)} rails, {len(ent.oscillators)} oscillators, {len(ent.functional_tests)} tests[/green]")
         except Exception as e:
             print(f"[red]Error parsing netlist: {e}[/red]")
@@ -145,13 +155,13 @@ def main():
         ent = ParsedEntities.model_validate(data)
 
     issues = validate_entities(ent)
-    plan = generate_plan_offline(ent) if args.offline else generate_plan_llm(ent)
+    if netlist is not None:
+        issues += validate_against_netlist(ent, netlist)
+    plan = generate_plan(ent, args.offline)
     plan = annotate_plan(plan, issues)
 
     out_path = Path(args.out)
-    out_path.parent.mkdir(parents=True, exist_ok=True)
-    md = plan.to_markdown() if plan.steps else (plan.notes or "")
-    out_path.write_text(md)
+    write_plan(plan, out_path, args.format)
     print(f"[green]Wrote {out_path}[/green]")
 
 
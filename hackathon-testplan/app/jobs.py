@@ -0,0 +1,202 @@
+"""
+Background parse jobs for the web app
+
+Uploads are parsed in a process pool shared by every session of the
+server, so a large archive or PDF never runs inside a Streamlit request.
+submit() returns a job id at once; the UI polls the job for progress and
+the pieces parsed so far. A zip is split by a worker, then becomes one
+task per member. Finished jobs are cached by upload content, so the same
+file is parsed only once.
+"""
+from __future__ import annotations
+import atexit
+import multiprocessing
+import os
+import threading
+import time
+import uuid
+from concurrent.futures import Future, ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from dataclasses import dataclass, field
+from functools import partial
+from typing import Any, Dict, List, Optional
+
+from core.cache import LRUCache, fingerprint
+from ingest.sources import Piece, assemble_pieces, run_task, source_tasks
+
+WEB_JOB_WORKERS = int(os.getenv("WEB_JOB_WORKERS", "2"))  # heavy parses running at once per server
+WEB_JOB_HISTORY = int(os.getenv("WEB_JOB_HISTORY", "256"))  # jobs kept for polling
+WEB_JOB_CACHE = int(os.getenv("WEB_JOB_CACHE", "64"))  # finished uploads kept for reuse
+
+
+@dataclass
+class Job:
+    id: str
+    name: str
+    key: str
+    labels: List[str]
+    parsed: List[Optional[Piece]]  # by task, filled in as tasks finish
+    futures: List[Future] = field(default_factory=list, repr=False)
+    errors: List[str] = field(default_factory=list)
+    done: int = 0
+    submitted: float = field(default_factory=time.time)
+    finished: Optional[float] = None
+
+    @property
+    def total(self) -> int:
+        return len(self.labels)
+
+    @property
+    def is_zip(self) -> bool:
+        return self.name.lower().endswith(".zip")
+
+    @property
+    def status(self) -> str:
+        if self.finished is not None:
+            return "failed" if self.errors and not any(self.parsed) else "done"
+        return "running" if any(f.running() for f in self.futures) else "queued"
+
+    @property
+    def progress(self) -> float:
+        return self.done / self.total if self.total else 1.0
+
+    def pieces(self) -> List[Piece]:
+        """Pieces parsed so far, in upload order; complete once the job has finished."""
+        return assemble_pieces(self.name, list(self.parsed), self.is_zip)
+
+
+class JobManager:
+    def __init__(self, workers: int = WEB_JOB_WORKERS, history: int = WEB_JOB_HISTORY, cache_entries: int = WEB_JOB_CACHE):
+        self.workers = max(1, workers)
+        self._pool: Optional[ProcessPoolExecutor] = None
+        self._jobs = LRUCache(history)
+        self.results = LRUCache(cache_entries)  # content key -> finished job
+        self._inflight: Dict[str, Job] = {}
+        self._lock = threading.Lock()
+
+    def _executor(self) -> ProcessPoolExecutor:
+        if self._pool is None:
+            # spawn: forking a threaded server process can deadlock the child
+            self._pool = ProcessPoolExecutor(max_workers=self.workers, mp_context=multiprocessing.get_context("spawn"))
+        return self._pool
+
+    def _reset(self, pool: ProcessPoolExecutor) -> None:
+        """Drop a pool whose worker died; the next submit starts a fresh one."""
+        if self._pool is pool:
+            self._pool = None
+            pool.shutdown(wait=False, cancel_futures=True)
+
+    def submit(self, name: str, data: bytes) -> str:
+        """Queue one upload and return its job id; identical uploads share a job.
+
+        Nothing is decompressed or parsed in the caller's thread: a zip is
+        first split into its members by a worker, then each member is queued.
+        """
+        key = fingerprint(name, data)
+        with self._lock:
+            job = self.results.get(key) or self._inflight.get(key)
+            if job is not None:
+                self._jobs.put(job.id, job)
+                return job.id
+            job = Job(uuid.uuid4().hex, name, key, labels=[name], parsed=[None])
+            self._jobs.put(job.id, job)
+            self._inflight[key] = job
+        if job.is_zip:
+            self._dispatch(job, source_tasks, [(name, data)], self._split_done)
+        else:
+            self._dispatch(job, run_task, [((name, data, name, False),)], self._task_done)
+        return job.id
+
+    def _dispatch(self, job: Job, fn, calls: List[tuple], done) -> None:
+        """Submit fn(*args) for each args in calls; done(job, index, pool, future) runs as each finishes."""
+        with self._lock:
+            pool = self._executor()
+            try:
+                job.futures = [pool.submit(fn, *args) for args in calls]
+            except BrokenProcessPool:  # a worker died since the last submit
+                self._reset(pool)
+                pool = self._executor()
+                job.futures = [pool.submit(fn, *args) for args in calls]
+            futures = job.futures
+        for i, future in enumerate(futures):
+            future.add_done_callback(partial(done, job, i, pool))
+
+    def _split_done(self, job: Job, index: int, pool: ProcessPoolExecutor, future: Future) -> None:
+        try:
+            tasks = future.result()
+        except Exception:  # unreadable or oversized archive, or a dead worker
+            self._task_done(job, index, pool, future)
+            return
+        with self._lock:
+            job.labels = [t[2] for t in tasks]
+            job.parsed = [None] * len(tasks)
+            if not tasks:
+                self._finish(job)
+                return
+        # Queue the members from a thread of our own: this callback runs on the
+        # pool's management thread, which must not block on its own wakeup pipe
+        threading.Thread(
+            target=self._dispatch, args=(job, run_task, [(task,) for task in tasks], self._task_done), daemon=True
+        ).start()
+
+    def _task_done(self, job: Job, index: int, pool: ProcessPoolExecutor, future: Future) -> None:
+        with self._lock:
+            try:
+                job.parsed[index] = future.result()
+            except Exception as e:
+                job.errors.append(f"{job.labels[index]}: {type(e).__name__}: {e}")
+                if isinstance(e, BrokenProcessPool):
+                    self._reset(pool)
+            job.done += 1
+            if job.done == job.total:
+                self._finish(job)
+
+    def _finish(self, job: Job) -> None:
+        job.finished = time.time()
+        self._inflight.pop(job.key, None)
+        if not job.errors:
+            self.results.put(job.key, job)
+
+    def get(self, job_id: str) -> Optional[Job]:
+        return self._jobs.get(job_id)
+
+    def wait(self, job_ids: List[str], timeout: Optional[float] = None, poll: float = 0.05) -> bool:
+        """Block until every job has finished; False on timeout."""
+        deadline = None if timeout is None else time.monotonic() + timeout
+        while True:
+            jobs = [self.get(j) for j in job_ids]
+            if all(job is None or job.finished is not None for job in jobs):
+                return True
+            if deadline is not None and time.monotonic() > deadline:
+                return False
+            time.sleep(poll)
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            inflight = list(self._inflight.values())
+        return {
+            "workers": self.workers,
+            "running": sum(job.status == "running" for job in inflight),
+            "queued": sum(job.status == "queued" for job in inflight),
+            "jobs": len(self._jobs),
+            "results": self.results.info(),
+        }
+
+    def shutdown(self) -> None:
+        pool, self._pool = self._pool, None
+        if pool is not None:
+            pool.shutdown(wait=True, cancel_futures=True)
+
+
+_manager: Optional[JobManager] = None
+_manager_lock = threading.Lock()
+
+
+def get_job_manager() -> JobManager:
+    """The process-wide job manager; its pool starts on the first submit."""
+    global _manager
+    with _manager_lock:
+        if _manager is None:
+            _manager = JobManager()
+            atexit.register(_manager.shutdown)
+        return _manager
@@ -0,0 +1,89 @@
+"""
+Per-server report of how much memory web sessions hold in st.session_state
+
+Each session's state is measured by its pickled size at most once per
+SESSION_STATS_INTERVAL_S, so a rerun rarely pays for a measurement;
+sessions not seen for SESSION_STATS_TTL_S drop out of the report. Sizes
+are what a value would cost to copy or persist, a close enough proxy for
+its footprint to tune how many sessions a server takes.
+"""
+from __future__ import annotations
+import os
+import pickle
+import sys
+import threading
+import time
+from typing import Any, Dict, Mapping, Optional, Tuple
+
+SESSION_STATS_TTL_S = float(os.getenv("SESSION_STATS_TTL_S", "3600"))
+SESSION_STATS_INTERVAL_S = float(os.getenv("SESSION_STATS_INTERVAL_S", "30"))
+
+
+def value_size(value: Any) -> int:
+    try:
+        return len(pickle.dumps(value, protocol=pickle.HIGHEST_PROTOCOL))
+    except Exception:  # unpicklable (locks, handles): shallow size is the best we have
+        return sys.getsizeof(value)
+
+
+def state_sizes(state: Mapping[str, Any]) -> Dict[str, int]:
+    """Bytes per key; a value shared by several keys is counted once."""
+    sizes: Dict[str, int] = {}
+    seen: set = set()
+    for key in list(state.keys()):
+        value = state[key]
+        sizes[key] = 0 if id(value) in seen else value_size(value)
+        seen.add(id(value))
+    return sizes
+
+
+class SessionSizes:
+    def __init__(self, ttl: float = SESSION_STATS_TTL_S, interval: float = SESSION_STATS_INTERVAL_S):
+        self.ttl = ttl
+        self.interval = interval
+        self._sessions: Dict[str, Tuple[float, Dict[str, int]]] = {}
+        self._lock = threading.Lock()
+
+    def record(self, session_id: str, state: Mapping[str, Any]) -> Dict[str, int]:
+        sizes = state_sizes(state)
+        now = time.time()
+        with self._lock:
+            self._sessions[session_id] = (now, sizes)
+            for sid in [s for s, (seen, _) in self._sessions.items() if now - seen > self.ttl]:
+                del self._sessions[sid]
+        return sizes
+
+    def sample(self, session_id: str, state: Mapping[str, Any]) -> Dict[str, int]:
+        """Sizes from the last measurement, re-measured once it is older than the interval."""
+        with self._lock:
+            last = self._sessions.get(session_id)
+        if last is not None and time.time() - last[0] < self.interval:
+            return last[1]
+        return self.record(session_id, state)
+
+    def report(self) -> Dict[str, Any]:
+        with self._lock:
+            totals = [sum(sizes.values()) for _, sizes in self._sessions.values()]
+            by_key: Dict[str, int] = {}
+            for _, sizes in self._sessions.values():
+                for key, size in sizes.items():
+                    by_key[key] = by_key.get(key, 0) + size
+        return {
+            "sessions": len(totals),
+            "total_bytes": sum(totals),
+            "max_bytes": max(totals, default=0),
+            "mean_bytes": sum(totals) / len(totals) if totals else 0.0,
+            "by_key": dict(sorted(by_key.items(), key=lambda kv: -kv[1])),
+        }
+
+
+_sizes: Optional[SessionSizes] = None
+_sizes_lock = threading.Lock()
+
+
+def get_session_sizes() -> SessionSizes:
+    global _sizes
+    with _sizes_lock:
+        if _sizes is None:
+            _sizes = SessionSizes()
+        return _sizes
@@ -1,22 +1,32 @@
 from __future__ import annotations
+import io
 import json
 import sys
 import os
 from pathlib import Path
+from typing import List, Tuple
 import streamlit as st
-import re
+from streamlit.runtime.scriptrunner import get_script_run_ctx
 
 # Add project root to Python path
 project_root = Path(__file__).parent.parent
 sys.path.insert(0, str(project_root))
 
-from core.models import ParsedEntities
+from core.models import ParsedEntities, TestPlan
 from core.generator import generate_plan_offline
-from nlp.llm_client import generate_plan_llm
+from core.plan_view import PAGE_SIZES, PlanIndex, step_markdown
+from core.render import render_plan
+from nlp.llm_client import EnhancementReport, stream_enhancement
 from rules.validator import validate_entities, annotate_plan
-from ingest.netlist_parser import parse_netlist
-from ingest.pdf_parser import extract_pdf_hints
-from ingest.bom_parser import parse_bom
+from ingest.infer import infer_entities_from_text, with_defaults
+from ingest.merge import DEFAULT_TITLES, merge_entities
+from ingest.sources import entities_summary
+from app.jobs import JobManager, get_job_manager
+from app.session_stats import SESSION_STATS_INTERVAL_S, get_session_sizes
+
+# Entries per memoized stage; every stage is keyed by content, not by session
+WEB_CACHE_ENTRIES = int(os.getenv("WEB_CACHE_ENTRIES", "64"))
+MAX_CONFLICT_MESSAGES = 20
 
 # ---------- Page config & styling ----------
 st.set_page_config(
@@ -102,87 +112,142 @@ def _has_openai_key() -> bool:
     """Check if OpenAI API key is available"""
     return bool(os.getenv("OPENAI_API_KEY"))
 
-def infer_entities_from_text(text: str, title: str = "Design") -> ParsedEntities:
-    """Heuristically infer entities from text content"""
-    T = text.upper()
-    lines = text.split('\n')
-    
-    # Rails - look for voltage patterns
-    rails = []
-    voltage_patterns = [
-        (r"\+?5V", 5.0), (r"\+?3V3", 3.3), (r"\+?3\.3V", 3.3),
-        (r"VCC5", 5.0), (r"VCC3V3", 3.3), (r"PWR_JACK", 5.0)
-    ]
-    
-    seen_voltages = set()
-    for pattern, voltage in voltage_patterns:
-        if re.search(pattern, T) and voltage not in seen_voltages:
-            rails.append({
-                "name": f"+{voltage:g}V" if voltage == 5.0 else f"+{voltage:g}V", 
-                "voltage": voltage, 
-                "tolerance_mv": 100
-            })
-            seen_voltages.add(voltage)
-    
-    # Oscillators - look for crystal references
-    oscillators = []
-    if "Y1" in T or "16MHZ" in T:
-        oscillators.append({
-            "ref": "Y1", 
-            "frequency_hz": 16000000, 
-            "tolerance_hz": 100000
-        })
-    
-    if "Y2" in T or "32MHZ" in T:
-        oscillators.append({
-            "ref": "Y2", 
-            "frequency_hz": 32000000, 
-            "tolerance_hz": 100000
-        })
-    
-    # Functional tests - infer from components
-    functional_tests = []
-    if "LORA" in T or "SX1276" in T:
-        functional_tests.append({
-            "name": "LoRa BIT", 
-            "command": "bit.lora", 
-            "expected": "PASS"
-        })
-    
-    if "GPS" in T or "MAX-M10S" in T:
-        functional_tests.append({
-            "name": "GPS BIT", 
-            "command": "bit.gps", 
-            "expected": "PASS"
-        })
-    
-    if "IMU" in T or "LSM6DSOX" in T:
-        functional_tests.append({
-            "name": "IMU BIT", 
-            "command": "bit.imu", 
-            "expected": "PASS"
-        })
-    
-    if "I2C" in T:
-        functional_tests.append({
-            "name": "I2C BIT", 
-            "command": "bit.i2c", 
-            "expected": "PASS"
-        })
-    
-    # Defaults if nothing found
-    if not rails:
-        rails = [{"name": "+5V", "voltage": 5.0, "tolerance_mv": 100},
-                 {"name": "+3V3", "voltage": 3.3, "tolerance_mv": 100}]
-    if not functional_tests:
-        functional_tests.append({"name": "Full BIT", "command": "bit", "expected": "PASS"})
-    
-    return ParsedEntities.model_validate({
-        "title": title,
-        "rails": rails,
-        "oscillators": oscillators,
-        "functional_tests": functional_tests
-    })
+# ---------- Cached stages ----------
+# Streamlit reruns this script on every interaction; these keep the work
+# done for a given upload or entities JSON across reruns and sessions.
+# Uploads themselves are parsed by background jobs (app/jobs.py).
+
+@st.cache_data(max_entries=WEB_CACHE_ENTRIES, show_spinner=False)
+def infer_entities_cached(blob: str, title: str, defaults: bool = True) -> ParsedEntities:
+    return infer_entities_from_text(blob, title, defaults)
+
+
+@st.cache_data(max_entries=WEB_CACHE_ENTRIES, show_spinner=False)
+def parse_entities_json(entities_text: str) -> ParsedEntities:
+    return ParsedEntities.model_validate(json.loads(entities_text))
+
+
+@st.cache_data(max_entries=WEB_CACHE_ENTRIES, show_spinner=False)
+def validate_entities_json(entities_text: str) -> List[str]:
+    return validate_entities(parse_entities_json(entities_text))
+
+
+@st.cache_data(max_entries=WEB_CACHE_ENTRIES, show_spinner=False)
+def offline_plan(entities_text: str) -> TestPlan:
+    """The deterministic plan, annotated with validation issues."""
+    return annotate_plan(generate_plan_offline(parse_entities_json(entities_text)), validate_entities_json(entities_text))
+
+
+# Session state holds the design once, as compact JSON ("entities"); the
+# editor text, the pydantic object and the plan are derived from it on
+# demand through the content-keyed caches above.
+
+def compact_json(text: str) -> str:
+    """Canonical form of an entities JSON document; raises ValueError if it does not parse."""
+    return json.dumps(json.loads(text), separators=(",", ":"))
+
+
+@st.cache_data(max_entries=WEB_CACHE_ENTRIES, show_spinner=False)
+def pretty_json(entities_text: str) -> str:
+    return json.dumps(json.loads(entities_text), indent=2)
+
+
+@st.cache_resource(max_entries=WEB_CACHE_ENTRIES, show_spinner=False)
+def plan_index(entities_text: str) -> PlanIndex:
+    """Shared, read-only view of the plan for paging and search; never mutate it."""
+    return PlanIndex(offline_plan(entities_text))
+
+
+DOWNLOAD_FORMATS = {"md": ("Markdown", "text/markdown"), "csv": ("CSV", "text/csv"),
+                    "jsonl": ("JSON Lines", "application/x-ndjson"), "junit": ("JUnit XML", "application/xml")}
+DOWNLOAD_SUFFIXES = {"md": "md", "csv": "csv", "jsonl": "jsonl", "junit": "xml"}
+
+
+@st.cache_data(max_entries=WEB_CACHE_ENTRIES, show_spinner=False)
+def plan_download(entities_text: str, fmt: str, llm_md: str = "") -> str:
+    """The plan rendered by the streaming writers of core.render; Markdown carries this session's LLM section."""
+    buf = io.StringIO(newline="")
+    render_plan(plan_index(entities_text).plan, buf, fmt)
+    if fmt == "md" and llm_md:
+        buf.write("\n\nLLM Enhancements:\n" + llm_md)
+    return buf.getvalue()
+
+
+def _reset_plan_page() -> None:
+    st.session_state["plan_page"] = 1
+
+
+@st.cache_resource(show_spinner=False)
+def job_manager() -> JobManager:
+    """Background parse jobs, one process pool per server."""
+    return get_job_manager()
+
+
+def entities_from_jobs(job_ids: List[str]) -> Tuple[ParsedEntities | None, List[Tuple[str, str]]]:
+    """Entities merged from every finished parse job, plus (level, message) lines to show.
+
+    JSON and netlists take priority over what is inferred from BOM, PDF and
+    Altium text; disagreements between sources are listed as warnings.
+    """
+    messages: List[Tuple[str, str]] = []
+    structured: List[Tuple[str, ParsedEntities]] = []
+    inferred: List[Tuple[str, ParsedEntities]] = []
+    file_names: List[str] = []
+    for job_id in job_ids:
+        job = job_manager().get(job_id)
+        if job is None:
+            messages.append(("error", f"❌ Parse job {job_id} expired; upload the file again"))
+            continue
+        file_names.append(job.name)
+        messages.extend(("warning", f"⚠️ {err}") for err in job.errors)
+        for piece in job.pieces():
+            if piece["kind"] == "entities":
+                structured.append((piece["name"], piece["entities"]))
+                messages.append(("success", piece["message"]))
+                continue
+            if piece["kind"] == "text":
+                inferred.append((piece["name"], infer_entities_cached(piece["text"], "", False)))
+            if piece["message"]:
+                messages.append(("info", piece["message"]))
+    if not structured and not inferred:
+        return None, messages
+
+    titles = [ent.title for _, ent in structured if ent.title not in DEFAULT_TITLES]
+    merged = merge_entities(structured + inferred, title=titles[0] if titles else " | ".join(file_names))
+    ent = merged.entities if structured else with_defaults(merged.entities)
+    if len(structured) + len(inferred) > 1:
+        combined = f", {merged.duplicates} duplicates combined" if merged.duplicates else ""
+        messages.append(("success", f"✅ Merged {len(structured) + len(inferred)} sources: {entities_summary(ent)}{combined}"))
+    for conflict in merged.conflicts[:MAX_CONFLICT_MESSAGES]:
+        messages.append(("warning", f"⚠️ Conflict: {conflict.message()}"))
+    if len(merged.conflicts) > MAX_CONFLICT_MESSAGES:
+        messages.append(("warning", f"⚠️ ... and {len(merged.conflicts) - MAX_CONFLICT_MESSAGES} more conflicts"))
+    return ent, messages
+
+
+@st.fragment(run_every=0.5)
+def parse_progress() -> None:
+    """Poll this session's parse jobs; apply their result once all have finished."""
+    job_ids = st.session_state.get("parse_jobs", [])
+    jobs = [job_manager().get(job_id) for job_id in job_ids]
+    for job in jobs:
+        if job is not None:
+            st.progress(job.progress, text=f"{job.name}: {job.status} ({job.done}/{job.total})")
+            for piece in job.pieces():
+                if piece["kind"] != "note":
+                    st.caption(f"• {piece['name']}")
+    if any(job is not None and job.finished is None for job in jobs):
+        return
+    ent, messages = entities_from_jobs(job_ids)
+    st.session_state["parse_jobs"] = []
+    if ent is None:
+        messages.append(("error", "❌ Error processing files: no entities could be extracted"))
+    else:
+        st.session_state["entities"] = ent.model_dump_json()
+        messages.append(("info", "🎯 Entities extracted! Switch to 'Configure Entities' tab to review and edit."))
+    st.session_state["parse_messages"] = messages
+    st.rerun()
+
 
 # ---------- Sidebar ----------
 with st.sidebar:
@@ -207,6 +272,17 @@ with st.sidebar:
             del st.session_state[key]
         st.rerun()
 
+    # Memory held by sessions on this server, to tune how many it can take
+    with st.expander("📈 Session Memory"):
+        ctx = get_script_run_ctx()
+        # Expander bodies run on every rerun, so the pickling is sampled
+        sizes = get_session_sizes().sample(ctx.session_id if ctx else "local", st.session_state)
+        report = get_session_sizes().report()
+        st.caption(f"This session: {sum(sizes.values()) / 1024:.1f} KiB (measured every {SESSION_STATS_INTERVAL_S:g}s)")
+        st.caption(f"Server: {report['sessions']} sessions, {report['total_bytes'] / 1024:.1f} KiB total, "
+                   f"{report['max_bytes'] / 1024:.1f} KiB largest")
+        st.json(report["by_key"], expanded=False)
+
 # ---------- Main Content ----------
 st.title("🛠️ Bring-Up / Test Plan Generator")
 
@@ -218,7 +294,7 @@ llm_pill = '<span class="pill {}">LLM {}</span>'.format(
 st.markdown(f"**Status** {llm_pill}", unsafe_allow_html=True)
 
 # Initialize session state
-if "entities_text" not in st.session_state:
+if "entities" not in st.session_state:
     placeholder = {
         "title": "LoRa Car Radio",
         "rails": [
@@ -233,13 +309,10 @@ if "entities_text" not in st.session_state:
             {"name": "GPS BIT", "command": "bit.gps", "expected": "PASS"}
         ]
     }
-    st.session_state["entities_text"] = json.dumps(placeholder, indent=2)
-
-if "plan_md" not in st.session_state:
-    st.session_state["plan_md"] = ""
+    st.session_state["entities"] = json.dumps(placeholder, separators=(",", ":"))
 
-if "entities_obj" not in st.session_state:
-    st.session_state["entities_obj"] = None
+if "plan_entities" not in st.session_state:
+    st.session_state["plan_entities"] = ""  # the entities the current plan was generated from
 
 # ---------- Tabs ----------
 tab_upload, tab_entities, tab_plan = st.tabs(["📁 Upload Files", "⚙️ Configure Entities", "📋 Generated Plan"])
@@ -266,147 +339,13 @@ with tab_upload:
         st.success(f"✅ {len(uploaded)} file(s) uploaded: {', '.join([f.name for f in uploaded])}")
         
         if st.button("🔍 Parse Files → Extract Entities", type="primary", use_container_width=True):
-            try:
-                texts = []
-                file_names = []
-                processed_files = []  # Track individual files processed
-                
-                for f in uploaded:
-                    # Save uploaded file temporarily
-                    temp_path = f"/tmp/{f.name}"
-                    with open(temp_path, "wb") as tmp_file:
-                        tmp_file.write(f.getbuffer())
-                    
-                    file_ext = f.name.lower().split('.')[-1]
-                    file_names.append(f.name)
-                    
-                    if file_ext in ['txt', 'net', 'ipc']:
-                        # Parse netlist
-                        ent = parse_netlist(temp_path)
-                        processed_files.append(f.name)
-                        st.success(f"✅ Parsed netlist {f.name}: {len(ent.rails)} rails, {len(ent.oscillators)} oscillators, {len(ent.functional_tests)} tests")
-                        break  # Netlist is complete, no need to merge
-                    
-                    elif file_ext == 'json':
-                        # Parse as JSON
-                        data = json.loads(Path(temp_path).read_text())
-                        ent = ParsedEntities.model_validate(data)
-                        processed_files.append(f.name)
-                        st.success(f"✅ Loaded JSON {f.name}: {len(ent.rails)} rails, {len(ent.oscillators)} oscillators, {len(ent.functional_tests)} tests")
-                        break  # JSON is complete, no need to merge
-                    
-                    elif file_ext == 'pdf':
-                        # Extract text from PDF
-                        hints = extract_pdf_hints(temp_path)
-                        text = "\n".join(hints)
-                        texts.append(text)
-                        processed_files.append(f.name)
-                    
-                    elif file_ext in ['xlsx', 'xlsm', 'csv']:
-                        # Parse BOM
-                        rows = parse_bom(temp_path)
-                        text = "\n".join([f"{r} {v}" for r, v in rows])
-                        texts.append(text)
-                        processed_files.append(f.name)
-                    
-                    elif file_ext in ['schdoc', 'pcbdoc', 'prjpcb', 'bomdoc']:
-                        # Parse Altium files
-                        try:
-                            text = Path(temp_path).read_text(encoding="utf-8", errors="ignore")
-                        except:
-                            text = Path(temp_path).read_bytes().decode("latin-1", errors="ignore")
-                        texts.append(text)
-                        processed_files.append(f.name)
-                    
-                    elif file_ext == 'zip':
-                        # Extract and process zip files
-                        from ingest.zip_loader import extract_zip
-                        import tempfile
-                        import os
-                        
-                        # Create temporary directory for extraction
-                        with tempfile.TemporaryDirectory() as temp_dir:
-                            extracted_files = extract_zip(temp_path, temp_dir)
-                            
-                            # Show what files were extracted
-                            st.info(f"📦 Extracted {len(extracted_files)} files from {f.name}")
-                            
-                            # Process each extracted file
-                            processed_count = 0
-                            for extracted_file in extracted_files:
-                                ext = Path(extracted_file).suffix.lower().lstrip('.')
-                                file_name = Path(extracted_file).name
-                                
-                                if ext in ['txt', 'net', 'ipc']:
-                                    # Parse netlist from zip
-                                    ent = parse_netlist(extracted_file)
-                                    processed_files.append(f"{f.name}/{file_name}")
-                                    st.success(f"✅ Parsed netlist {file_name}: {len(ent.rails)} rails, {len(ent.oscillators)} oscillators, {len(ent.functional_tests)} tests")
-                                    processed_count += 1
-                                    break  # Netlist is complete, no need to merge
-                                
-                                elif ext == 'json':
-                                    # Parse JSON from zip
-                                    data = json.loads(Path(extracted_file).read_text())
-                                    ent = ParsedEntities.model_validate(data)
-                                    processed_files.append(f"{f.name}/{file_name}")
-                                    st.success(f"✅ Loaded JSON {file_name}: {len(ent.rails)} rails, {len(ent.oscillators)} oscillators, {len(ent.functional_tests)} tests")
-                                    processed_count += 1
-                                    break  # JSON is complete, no need to merge
-                                
-                                elif ext == 'pdf':
-                                    # Extract text from PDF in zip
-                                    hints = extract_pdf_hints(extracted_file)
-                                    text = "\n".join(hints)
-                                    texts.append(text)
-                                    processed_files.append(f"{f.name}/{file_name}")
-                                    st.info(f"📄 Processed PDF {file_name}: {len(hints)} text hints")
-                                    processed_count += 1
-                                
-                                elif ext in ['xlsx', 'xlsm', 'csv']:
-                                    # Parse BOM from zip
-                                    rows = parse_bom(extracted_file)
-                                    text = "\n".join([f"{r} {v}" for r, v in rows])
-                                    texts.append(text)
-                                    processed_files.append(f"{f.name}/{file_name}")
-                                    st.info(f"📊 Processed BOM {file_name}: {len(rows)} components")
-                                    processed_count += 1
-                                
-                                elif ext in ['schdoc', 'pcbdoc', 'prjpcb', 'bomdoc']:
-                                    # Parse Altium files from zip
-                                    try:
-                                        text = Path(extracted_file).read_text(encoding="utf-8", errors="ignore")
-                                    except:
-                                        text = Path(extracted_file).read_bytes().decode("latin-1", errors="ignore")
-                                    texts.append(text)
-                                    processed_files.append(f"{f.name}/{file_name}")
-                                    st.info(f"🔧 Processed Altium {file_name}: {len(text)} characters")
-                                    processed_count += 1
-                            
-                            # Show processing summary
-                            if processed_count > 0:
-                                st.success(f"🎯 Successfully processed {processed_count} files from {f.name}")
-                            
-                            # If we found a complete entity (JSON or netlist), break out of zip processing
-                            if 'ent' in locals():
-                                break
-                
-                # If we have multiple texts to merge
-                if texts and not ('ent' in locals()):
-                    blob = "\n".join(texts)
-                    title = " | ".join(file_names)
-                    ent = infer_entities_from_text(blob, title)
-                    st.success(f"✅ Merged {len(processed_files)} files: {len(ent.rails)} rails, {len(ent.oscillators)} oscillators, {len(ent.functional_tests)} tests")
-                
-                # Update session state
-                st.session_state["entities_text"] = ent.model_dump_json(indent=2)
-                st.session_state["entities_obj"] = ent
+            st.session_state["parse_jobs"] = [job_manager().submit(f.name, f.getvalue()) for f in uploaded]
+            st.session_state["parse_messages"] = []
                 
-                st.info("🎯 Entities extracted! Switch to 'Configure Entities' tab to review and edit.")
-                
-            except Exception as e:
-                st.error(f"❌ Error processing files: {e}")
-                st.exception(e)
+    if st.session_state.get("parse_jobs"):
+        parse_progress()
+    for level, message in st.session_state.get("parse_messages", []):
+        getattr(st, level)(message)
 
 # ---- Entities Tab ----
 with tab_entities:
@@ -418,7 +357,7 @@ with tab_entities:
         st.markdown("**📝 Edit Entities JSON**")
         sample_json = st.text_area(
             "entities.json", 
-            value=st.session_state["entities_text"], 
+            value=pretty_json(st.session_state["entities"]), 
             height=400,
             help="Modify the JSON structure to match your hardware design"
         )
@@ -433,8 +372,7 @@ with tab_entities:
             if st.button("Arduino", use_container_width=True):
                 arduino_path = Path("examples/arduino_entities.json")
                 if arduino_path.exists():
-                    sample_json = arduino_path.read_text()
-                    st.session_state["entities_text"] = sample_json
+                    st.session_state["entities"] = compact_json(arduino_path.read_text())
                     st.success("Arduino sample loaded!")
                     st.rerun()
                 else:
@@ -444,8 +382,7 @@ with tab_entities:
             if st.button("LoRa", use_container_width=True):
                 lora_path = Path("examples/lora_entities.json")
                 if lora_path.exists():
-                    sample_json = lora_path.read_text()
-                    st.session_state["entities_text"] = sample_json
+                    st.session_state["entities"] = compact_json(lora_path.read_text())
                     st.success("LoRa sample loaded!")
                     st.rerun()
                 else:
@@ -456,9 +393,9 @@ with tab_entities:
         # Validate button
         if st.button("✅ Validate JSON", use_container_width=True):
             try:
-                data = json.loads(st.session_state["entities_text"])
-                ent = ParsedEntities.model_validate(data)
-                st.session_state["entities_obj"] = ent
+                entities = compact_json(sample_json)
+                ent = parse_entities_json(entities)
+                st.session_state["entities"] = entities
                 st.success("✅ Valid JSON structure!")
                 
                 # Show summary
@@ -474,22 +411,21 @@ with tab_entities:
         # Generate plan button
         if st.button("🚀 Generate Test Plan", type="primary", use_container_width=True):
             try:
-                data = json.loads(st.session_state["entities_text"])
-                ent = ParsedEntities.model_validate(data)
+                ent = parse_entities_json(compact_json(sample_json))
                 
                 # Show extracted entities
                 st.subheader("📋 Extracted Entities")
                 st.json(ent.model_dump(), expanded=False)
                 
-                # Generate plan
-                issues = validate_entities(ent)
-                plan = generate_plan_llm(ent) if use_llm else generate_plan_offline(ent)
-                plan = annotate_plan(plan, issues)
-                md = plan.to_markdown() if plan.steps else (plan.notes or "")
-                
-                # Update session state
-                st.session_state["plan_md"] = md
-                st.session_state["entities_obj"] = ent
+                # Generate plan; the deterministic plan is shown right away and
+                # the LLM section is streamed into the plan tab below
+                # Update session state; editor and plan share one canonical string
+                entities = ent.model_dump_json()
+                plan_index(entities)
+                st.session_state["entities"] = entities
+                st.session_state["plan_entities"] = entities
+                st.session_state["llm_md"] = ""
+                st.session_state["llm_pending"] = bool(use_llm)
                 
                 st.success("🎉 Test plan generated! Switch to 'Generated Plan' tab to view.")
                 
@@ -501,7 +437,8 @@ with tab_entities:
 with tab_plan:
     st.subheader("📋 Generated Test Plan")
     
-    if not st.session_state["plan_md"]:
+    plan_entities = st.session_state["plan_entities"]
+    if not plan_entities:
         st.info("""
         📝 **No test plan yet!** 
         
@@ -509,8 +446,46 @@ with tab_plan:
         2. Go to **Configure Entities** tab to edit the JSON and generate a plan
         """)
     else:
-        # Display the plan
-        st.markdown(st.session_state["plan_md"])
+        index = plan_index(plan_entities)
+        plan = index.plan
+        if not plan.steps:
+            st.markdown(plan.notes or "")
+        else:
+            # Only the current page of (matching) steps is rendered, grouped by section
+            st.markdown(f"# {plan.title}")
+            col_search, col_size = st.columns([3, 1])
+            with col_search:
+                query = st.text_input("🔎 Search steps", key="plan_search", on_change=_reset_plan_page,
+                                      placeholder="id, section, description, equipment or expected value")
+            with col_size:
+                page_size = st.selectbox("Steps per page", PAGE_SIZES, index=1, key="plan_page_size",
+                                         on_change=_reset_plan_page)
+            matches = index.search(query)
+            pages = index.page_count(len(matches), page_size)
+            if st.session_state.get("plan_page", 1) > pages:
+                st.session_state["plan_page"] = pages
+            page = st.number_input(f"Page (of {pages})", min_value=1, max_value=pages, step=1, key="plan_page") if pages > 1 else 1
+            st.caption(f"{len(matches)} of {len(index)} steps" + (f" matching “{query}”" if query.strip() else ""))
+            for section, steps in index.grouped(index.page(matches, page, page_size)):
+                with st.expander(f"**{section}** ({len(steps)} of {len(index.sections[section])} steps)", expanded=True):
+                    st.markdown("\n\n".join(step_markdown(step) for step in steps))
+            if plan.notes:
+                with st.expander("**Notes**"):
+                    st.markdown(plan.notes)
+        
+        # Stream the LLM section under the plan that is already on screen
+        if st.session_state.get("llm_pending"):
+            st.session_state["llm_pending"] = False
+            st.markdown("**LLM Enhancements:**")
+            report = EnhancementReport()
+            llm_md = st.write_stream(stream_enhancement(parse_entities_json(plan_entities), report))
+            if report.enhanced and llm_md:
+                st.session_state["llm_md"] = llm_md
+            else:
+                st.warning(f"⚠️ LLM enhancement skipped: {report.reason}")
+        elif st.session_state.get("llm_md"):
+            st.markdown("**LLM Enhancements:**")
+            st.markdown(st.session_state["llm_md"])
         
         st.divider()
         
@@ -520,36 +495,35 @@ with tab_plan:
         col1, col2 = st.columns(2)
         
         with col1:
+            fmt = st.selectbox("Plan format", list(DOWNLOAD_FORMATS), format_func=lambda f: DOWNLOAD_FORMATS[f][0],
+                               key="plan_format", label_visibility="collapsed")
             st.download_button(
-                label="📄 Download Test Plan (Markdown)",
-                data=st.session_state["plan_md"],
-                file_name="testplan.md",
-                mime="text/markdown",
+                label=f"📄 Download Test Plan ({DOWNLOAD_FORMATS[fmt][0]})",
+                data=plan_download(plan_entities, fmt, st.session_state.get("llm_md", "") if fmt == "md" else ""),
+                file_name=f"testplan.{DOWNLOAD_SUFFIXES[fmt]}",
+                mime=DOWNLOAD_FORMATS[fmt][1],
                 use_container_width=True
             )
         
         with col2:
-            if st.session_state["entities_obj"]:
-                st.download_button(
-                    label="📋 Download Entities (JSON)",
-                    data=st.session_state["entities_obj"].model_dump_json(indent=2),
-                    file_name="entities.json",
-                    mime="application/json",
-                    use_container_width=True
-                )
+            st.download_button(
+                label="📋 Download Entities (JSON)",
+                data=pretty_json(plan_entities),
+                file_name="entities.json",
+                mime="application/json",
+                use_container_width=True
+            )
         
         # Plan statistics
-        if st.session_state["entities_obj"]:
-            ent = st.session_state["entities_obj"]
-            st.markdown("**📊 Plan Statistics:**")
+        ent = parse_entities_json(plan_entities)
+        st.markdown("**📊 Plan Statistics:**")
             
-            col1, col2, col3, col4 = st.columns(4)
-            with col1:
-                st.metric("Power Rails", len(ent.rails))
-            with col2:
-                st.metric("Oscillators", len(ent.oscillators))
-            with col3:
-                st.metric("Functional Tests", len(ent.functional_tests))
-            with col4:
-                total_steps = len([line for line in st.session_state["plan_md"].split('\n') if line.startswith('**') and '.' in line])
-                st.metric("Test Steps", total_steps)
\ No newline at end of file
+        col1, col2, col3, col4 = st.columns(4)
+        with col1:
+            st.metric("Power Rails", len(ent.rails))
+        with col2:
+            st.metric("Oscillators", len(ent.oscillators))
+        with col3:
+            st.metric("Functional Tests", len(ent.functional_tests))
+        with col4:
+            st.metric("Test Steps", len(index))
\ No newline at end of file
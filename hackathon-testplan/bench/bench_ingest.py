@@ -0,0 +1,54 @@
+#!/usr/bin/env python3
+"""
+Benchmark chunked library ingestion (chunks/s) for several upsert batch sizes.
+Uses Chroma when installed, otherwise the in-memory stand-in from the tests.
+"""
+
+import argparse
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+# Add project root to Python path
+project_root = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(project_root))
+
+from storage.vectorstore import VectorStore, _open_chroma
+from tests.fake_chroma import FakeChromaClient
+
+
+def make_docs(n: int, sections: int = 12, words: int = 400):
+    docs = []
+    for d in range(n):
+        parts = [f"{s} Section {s}\n" + " ".join(f"w{d % 7}_{s}_{j % 97}" for j in range(words)) for s in range(1, sections + 1)]
+        parts.append("LEGAL NOTICE\n" + "All rights reserved. " * 40)  # shared boilerplate, deduped
+        docs.append((f"doc{d}.pdf", "\n".join(parts), None))
+    return docs
+
+
+def main():
+    ap = argparse.ArgumentParser(description=__doc__)
+    ap.add_argument("--docs", type=int, default=40)
+    ap.add_argument("--fake", action="store_true", help="use the in-memory stand-in even if chromadb is installed")
+    args = ap.parse_args()
+
+    try:
+        import chromadb  # noqa: F401
+        factory = FakeChromaClient if args.fake else _open_chroma
+    except ImportError:
+        factory = FakeChromaClient
+    docs = make_docs(args.docs)
+    print(f"backend: {factory.__name__}, {len(docs)} docs")
+    for batch in (1, 64, 512):
+        with tempfile.TemporaryDirectory() as tmp:
+            store = VectorStore(Path(tmp), client_factory=factory)
+            start = time.perf_counter()
+            stats = store.add_docs(docs, batch_size=batch)
+            elapsed = time.perf_counter() - start
+            store.close()
+        print(f"batch {batch:>4}: {stats.summary()} ({elapsed:.2f}s)")
+
+
+if __name__ == "__main__":
+    main()
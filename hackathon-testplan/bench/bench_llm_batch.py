@@ -0,0 +1,57 @@
+#!/usr/bin/env python3
+"""
+Benchmark multi-board batching against the local stand-in OpenAI server.
+Reports requests/s, boards/s and prompt tokens per board for each batch size.
+"""
+
+import argparse
+import os
+import sys
+import time
+from pathlib import Path
+
+# Add project root to Python path
+project_root = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(project_root))
+
+from core.models import ParsedEntities
+from nlp.llm_batch import generate_plans_llm_batch
+from nlp.prompting import estimate_tokens
+from tests.fake_openai import FakeOpenAIServer, batch_reply
+
+
+def make_boards(n: int):
+    boards = []
+    for i in range(n):
+        boards.append(ParsedEntities.model_validate({
+            "title": f"Family board {i}",
+            "rails": [{"name": f"VDD_{v}V{i}", "voltage": v, "tolerance_mv": 50} for v in (1.2, 1.8, 3.3, 5.0)],
+            "oscillators": [{"ref": "Y1", "frequency_hz": 32768, "tolerance_hz": 20}],
+            "functional_tests": [{"name": "UART Echo", "command": "uart_echo.py"}],
+        }))
+    return boards
+
+
+def main():
+    ap = argparse.ArgumentParser(description=__doc__)
+    ap.add_argument("--boards", type=int, default=32)
+    ap.add_argument("--delay", type=float, default=0.05, help="stand-in server latency per request (s)")
+    ap.add_argument("--concurrency", type=int, default=4)
+    args = ap.parse_args()
+
+    boards = make_boards(args.boards)
+    print(f"{'batch':>5} {'requests':>8} {'req/s':>8} {'boards/s':>9} {'tok/board':>10}")
+    for size in (1, 2, 4, 8, 16):
+        with FakeOpenAIServer(delay=args.delay, reply=batch_reply) as server:
+            os.environ.update(OPENAI_API_KEY="bench", OPENAI_BASE_URL=server.base_url, LLM_CACHE="off")
+            start = time.perf_counter()
+            results = generate_plans_llm_batch(boards, max_boards=size, concurrency=args.concurrency, use_cache=False)
+            elapsed = time.perf_counter() - start
+            tokens = sum(estimate_tokens(m["content"]) for r in server.requests for m in r["messages"])
+            ok = sum(r.report.enhanced for r in results)
+            n = len(server.requests)
+        print(f"{size:>5} {n:>8} {n / elapsed:>8.1f} {ok / elapsed:>9.1f} {tokens / len(boards):>10.0f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,85 @@
+#!/usr/bin/env python3
+"""
+Benchmark retrieval backends on a synthetic chunk library: ingest rate and
+query latency (p50/p95) for single terms and 10-term batches.
+Chroma is included when chromadb is installed.
+"""
+
+import argparse
+import random
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+# Add project root to Python path
+project_root = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(project_root))
+
+from storage.vectorstore import BACKENDS, VectorStore
+
+PARTS = [f"{p}{n}" for p in ("SX", "STM", "LM", "TPS", "ADS", "MAX") for n in range(1000, 1400, 7)]
+WORDS = "rail supply ripple load regulator clock crystal bus pull-up reset enable fault thermal current pin".split()
+
+
+def make_chunks(n: int, seed: int = 1):
+    rnd = random.Random(seed)
+    for i in range(n):
+        words = rnd.choices(WORDS, k=120) + rnd.choices(PARTS, k=4) + [f"+{rnd.choice([1.2, 1.8, 3.3, 5.0])}V"]
+        rnd.shuffle(words)
+        yield f"c{i}", " ".join(words)
+
+
+def percentile(values, q):
+    values = sorted(values)
+    return values[min(len(values) - 1, int(q * len(values)))]
+
+
+def run(backend: str, n: int, queries: int):
+    with tempfile.TemporaryDirectory() as tmp:
+        store = VectorStore(Path(tmp), backend=backend)
+        coll = store.collection
+        start = time.perf_counter()
+        batch = []
+        for cid, text in make_chunks(n):
+            batch.append((cid, text))
+            if len(batch) == 2048:
+                coll.upsert(ids=[b[0] for b in batch], documents=[b[1] for b in batch], metadatas=[{"name": b[0]} for b in batch])
+                batch.clear()
+        if batch:
+            coll.upsert(ids=[b[0] for b in batch], documents=[b[1] for b in batch], metadatas=[{"name": b[0]} for b in batch])
+        ingest = time.perf_counter() - start
+
+        rnd = random.Random(2)
+        single, batched = [], []
+        for _ in range(queries):
+            t = time.perf_counter()
+            coll.query(query_texts=[rnd.choice(PARTS)], n_results=4)
+            single.append(time.perf_counter() - t)
+            terms = rnd.sample(PARTS, 7) + ["+3.3V", "I2C", "SPI"]
+            t = time.perf_counter()
+            coll.query(query_texts=terms, n_results=4)
+            batched.append(time.perf_counter() - t)
+        store.close()
+    print(f"{backend:>6}: {n} chunks ingested at {n / ingest:,.0f} chunks/s; "
+          f"1 term p50 {percentile(single, .5) * 1e3:.1f} ms p95 {percentile(single, .95) * 1e3:.1f} ms; "
+          f"10 terms p50 {percentile(batched, .5) * 1e3:.1f} ms p95 {percentile(batched, .95) * 1e3:.1f} ms")
+
+
+def main():
+    ap = argparse.ArgumentParser(description=__doc__)
+    ap.add_argument("--chunks", type=int, default=100_000)
+    ap.add_argument("--queries", type=int, default=50)
+    ap.add_argument("--backends", default="local,chroma")
+    args = ap.parse_args()
+    for backend in args.backends.split(","):
+        if backend not in BACKENDS:
+            sys.exit(f"unknown backend {backend}")
+        try:
+            run(backend, args.chunks, args.queries)
+        except ImportError as e:
+            print(f"{backend:>6}: skipped ({e})")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,73 @@
+#!/usr/bin/env python3
+"""
+Benchmark the validation rules on a large entity set: serial, one thread per
+rule, and one process per rule (including the cost of shipping the entities).
+"""
+
+import argparse
+import pickle
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from pathlib import Path
+
+# Add project root to Python path
+project_root = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(project_root))
+
+from core.models import ParsedEntities
+from rules.validator import RULES, run_rules
+
+
+def make_entities(n: int) -> ParsedEntities:
+    return ParsedEntities(
+        title="Bench",
+        rails=[{"name": f"R{i}", "voltage": 1.0 + (i % 400) * 0.01, "tolerance_mv": 20} for i in range(n)],
+        oscillators=[{"ref": f"Y{i}", "frequency_hz": 1e6 + i, "tolerance_hz": 50} for i in range(n)],
+        functional_tests=[{"name": f"T{i}", "command": "run" if i % 2 else ""} for i in range(n)],
+    )
+
+
+def _one_rule(args):
+    ent, name = args
+    return run_rules(ent, rules=[name]).issues
+
+
+def best_of(fn, repeat: int) -> float:
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        times.append(time.perf_counter() - start)
+    return min(times)
+
+
+def main():
+    ap = argparse.ArgumentParser(description=__doc__)
+    ap.add_argument("--entities", type=int, default=50_000, help="rails, oscillators and tests each")
+    ap.add_argument("--workers", type=int, default=4)
+    ap.add_argument("--repeat", type=int, default=3)
+    args = ap.parse_args()
+
+    ent = make_entities(args.entities)
+    names = list(RULES)
+    print(f"{args.entities} of each entity kind, {len(names)} rules")
+
+    def threaded():
+        with ThreadPoolExecutor(max_workers=args.workers) as pool:
+            list(pool.map(lambda n: run_rules(ent, rules=[n]), names))
+
+    with ProcessPoolExecutor(max_workers=args.workers) as procs:
+        list(procs.map(_one_rule, [(ent, names[0])]))  # warm the workers
+
+        def processes():
+            list(procs.map(_one_rule, [(ent, n) for n in names]))
+
+        print(f"serial:    {best_of(lambda: run_rules(ent), args.repeat) * 1000:7.0f} ms")
+        print(f"threads:   {best_of(threaded, args.repeat) * 1000:7.0f} ms")
+        print(f"processes: {best_of(processes, args.repeat) * 1000:7.0f} ms")
+    print(f"pickle:    {best_of(lambda: pickle.dumps(ent), args.repeat) * 1000:7.0f} ms (entities, once)")
+
+
+if __name__ == "__main__":
+    main()
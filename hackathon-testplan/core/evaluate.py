@@ -0,0 +1,110 @@
+from __future__ import annotations
+from dataclasses import dataclass
+from typing import Dict, List, Sequence, Union
+
+import numpy as np
+
+from core.models import TestPlan, TestStep
+
+
+@dataclass
+class LimitTable:
+    """Column-oriented limits for every step of a plan that has numeric limits."""
+    step_ids: List[str]
+    units: List[str]
+    nominal: np.ndarray
+    low: np.ndarray   # -inf where a step has no lower limit
+    high: np.ndarray  # +inf where a step has no upper limit
+
+    def __len__(self) -> int:
+        return len(self.step_ids)
+
+
+@dataclass
+class Evaluation:
+    """Per-board, per-step results; every array is shaped (boards, steps)."""
+    step_ids: List[str]
+    measured: np.ndarray  # False where the measurement is NaN (not taken)
+    passed: np.ndarray
+    margin: np.ndarray  # distance to the nearest limit in the step's unit, < 0 when out of limits
+    margin_ratio: np.ndarray  # margin / half the window width, NaN for one-sided limits
+
+    @property
+    def failed(self) -> np.ndarray:
+        return self.measured & ~self.passed
+
+    @property
+    def board_passed(self) -> np.ndarray:
+        """A board passes only if every step was measured and is within limits."""
+        return self.passed.all(axis=1)
+
+    def step_yield(self) -> Dict[str, float]:
+        counts = self.measured.sum(axis=0)
+        passes = self.passed.sum(axis=0)
+        with np.errstate(invalid="ignore", divide="ignore"):
+            rates = np.where(counts > 0, passes / counts, np.nan)
+        return dict(zip(self.step_ids, rates.tolist()))
+
+    def summary(self) -> Dict[str, float]:
+        boards = self.passed.shape[0]
+        return {
+            "boards": boards,
+            "steps": len(self.step_ids),
+            "boards_passed": int(self.board_passed.sum()),
+            "failures": int(self.failed.sum()),
+            "missing": int((~self.measured).sum()),
+            "worst_margin_ratio": float(np.nanmin(self.margin_ratio)) if np.isfinite(self.margin_ratio).any() else float("nan"),
+        }
+
+
+def limit_table(source: Union[TestPlan, Sequence[TestStep]]) -> LimitTable:
+    steps = source.steps if isinstance(source, TestPlan) else source
+    limited = [s for s in steps if s.has_limits]
+    n = len(limited)
+    nominal = np.full(n, np.nan)
+    low = np.full(n, -np.inf)
+    high = np.full(n, np.inf)
+    for i, s in enumerate(limited):
+        if s.nominal is not None:
+            nominal[i] = s.nominal
+        if s.low is not None:
+            low[i] = s.low
+        if s.high is not None:
+            high[i] = s.high
+    return LimitTable(
+        step_ids=[s.id for s in limited],
+        units=[s.unit or "" for s in limited],
+        nominal=nominal,
+        low=low,
+        high=high,
+    )
+
+
+def evaluate_measurements(limits: Union[LimitTable, TestPlan, Sequence[TestStep]], measurements) -> Evaluation:
+    """Judge a (boards, steps) measurement matrix against the plan limits in one pass.
+
+    Columns follow limit_table(plan).step_ids; use NaN for readings that were
+    not taken. A 1-D array is treated as a single board.
+    """
+    if not isinstance(limits, LimitTable):
+        limits = limit_table(limits)
+    x = np.asarray(measurements, dtype=np.float64)
+    if x.ndim == 1:
+        x = x[np.newaxis, :]
+    if x.ndim != 2 or x.shape[1] != len(limits):
+        raise ValueError(f"Expected measurements shaped (boards, {len(limits)}), got {x.shape}")
+
+    measured = ~np.isnan(x)
+    # NaN compares False, so unmeasured cells never pass
+    passed = (x >= limits.low) & (x <= limits.high)
+    margin = np.minimum(x - limits.low, limits.high - x)
+    half_width = (limits.high - limits.low) / 2.0
+    with np.errstate(invalid="ignore", divide="ignore"):
+        margin_ratio = np.where(np.isfinite(half_width) & (half_width > 0), margin / half_width, np.nan)
+    return Evaluation(
+        step_ids=list(limits.step_ids),
+        measured=measured,
+        passed=passed,
+        margin=margin,
+        margin_ratio=margin_ratio,
+    )
@@ -1,7 +1,14 @@
 from __future__ import annotations
-from typing import List
+from typing import Any, Callable, Dict, List, Tuple
+from core.cache import LRUCache, fingerprint
 from core.models import ParsedEntities, TestPlan, TestStep
 
+# Plans and per-section step lists are memoized by content fingerprint, so an
+# unchanged board (or one where a single section changed) skips rebuilding.
+ENTITY_SECTIONS = ("rails", "oscillators", "functional_tests")
+_PLAN_CACHE = LRUCache(maxsize=64)
+_SECTION_CACHE = LRUCache(maxsize=256)
+
 BASE_SETUP_STEPS = [
     TestStep(id="S0", section="Setup", description="Quick continuity check: GND vs +5V/+3V3 not shorted", equipment="DMM (diode/continuity)", expected="Rails not shorted to GND"),
     TestStep(id="S1", section="Setup", description="ESD precautions; connect board to bench PSU and GND mat.", equipment="ESD strap, bench PSU"),
@@ -21,7 +28,11 @@ def _voltage_steps(entities: ParsedEntities) -> List[TestStep]:
             section="Voltage Rail Checks",
             description=f"Measure rail {r.name}",
             equipment="DMM",
-            expected=f"{r.voltage:.2f} V (allowed: {lo:.2f}–{hi:.2f} V)"
+            expected=f"{r.voltage:.2f} V (allowed: {lo:.2f}–{hi:.2f} V)",
+            nominal=r.voltage,
+            low=round(lo, 6),
+            high=round(hi, 6),
+            unit="V",
         ))
     return steps
 
@@ -37,7 +48,11 @@ def _osc_steps(entities: ParsedEntities) -> List[TestStep]:
             section="Oscillator Checks",
             description=f"Probe oscillator {o.ref}",
             equipment="Oscilloscope",
-            expected=f"~{mhz:.3f} MHz (allowed: {lo/1e6:.3f}–{hi/1e6:.3f} MHz)"
+            expected=f"~{mhz:.3f} MHz (allowed: {lo/1e6:.3f}–{hi/1e6:.3f} MHz)",
+            nominal=o.frequency_hz,
+            low=lo,
+            high=hi,
+            unit="Hz",
         ))
     return steps
 
@@ -92,17 +107,51 @@ def _negative_tests(entities: ParsedEntities) -> List[TestStep]:
     return steps
 
 
+def section_fingerprints(entities: ParsedEntities) -> Dict[str, str]:
+    """Fingerprint of each entity list, e.g. {"rails": "<sha1>", ...}."""
+    return {
+        name: fingerprint(name, entities.model_dump_json(include={name}))
+        for name in ENTITY_SECTIONS
+    }
+
+
+def entities_fingerprint(entities: ParsedEntities) -> str:
+    """Stable content hash of ParsedEntities, independent of object identity."""
+    return fingerprint(entities.title, *section_fingerprints(entities).values())
+
+
+def _cached_steps(name: str, key: str, build: Callable[[ParsedEntities], List[TestStep]], entities: ParsedEntities) -> Tuple[TestStep, ...]:
+    return _SECTION_CACHE.get_or_compute((name, key), lambda: tuple(build(entities)))
+
+
+def plan_cache_info() -> Dict[str, Dict[str, Any]]:
+    return {"plans": _PLAN_CACHE.info(), "sections": _SECTION_CACHE.info()}
+
+
+def clear_plan_cache() -> None:
+    _PLAN_CACHE.clear()
+    _SECTION_CACHE.clear()
+
+
 def generate_plan_offline(entities: ParsedEntities) -> TestPlan:
+    sections = section_fingerprints(entities)
+    key = fingerprint(entities.title, *sections.values())
+    plan = _PLAN_CACHE.get_or_compute(key, lambda: _build_plan(entities, sections))
+    # Callers annotate plan.notes in place, so never hand out the cached object
+    return plan.model_copy(update={"steps": list(plan.steps)})
+
+
+def _build_plan(entities: ParsedEntities, sections: Dict[str, str]) -> TestPlan:
     steps: List[TestStep] = []
     steps.extend(BASE_SETUP_STEPS)
     steps.append(TestStep(id="V0", section="Visual Inspection", description="Check component orientation, solder bridges, missing parts.", equipment="Loupe", expected="IPC-610 Class 2 acceptable"))
-    steps.extend(_voltage_steps(entities))
-    steps.extend(_osc_steps(entities))
+    steps.extend(_cached_steps("voltage", sections["rails"], _voltage_steps, entities))
+    steps.extend(_cached_steps("oscillator", sections["oscillators"], _osc_steps, entities))
     steps.append(TestStep(id="P1", section="Firmware Programming", description="Flash firmware and open serial console @115200 baud.", equipment="Programmer, USB cable", expected="Device boots without faults; serial console opens at 115200 baud"))
-    steps.extend(_functional_steps(entities))
+    steps.extend(_cached_steps("functional", sections["functional_tests"], _functional_steps, entities))
     
     # Add negative/edge tests
-    steps.extend(_negative_tests(entities))
+    steps.extend(_cached_steps("negative", sections["functional_tests"], _negative_tests, entities))
     
     steps.append(TestStep(id="C1", section="Close-out", description="Power-down and disconnect all equipment.", equipment="None", expected="Board safely powered off, all connections removed"))
     
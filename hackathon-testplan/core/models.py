@@ -1,5 +1,5 @@
 from __future__ import annotations
-from typing import List, Optional
+from typing import Iterator, List, Optional
 from pydantic import BaseModel, Field
 
 class PowerRail(BaseModel):
@@ -29,25 +29,43 @@ class TestStep(BaseModel):
     description: str
     equipment: Optional[str] = None
     expected: Optional[str] = None
+    # Machine-readable limits for measurement steps (None for manual steps)
+    nominal: Optional[float] = None
+    low: Optional[float] = None
+    high: Optional[float] = None
+    unit: Optional[str] = None
+
+    @property
+    def has_limits(self) -> bool:
+        return self.low is not None or self.high is not None
+
+    def markdown_lines(self) -> Iterator[str]:
+        yield f"**{self.id}. {self.description}**"
+        if self.equipment:
+            yield f"- Equipment: {self.equipment}"
+        if self.expected:
+            yield f"- Expected: {self.expected}"
 
 class TestPlan(BaseModel):
     title: str
     steps: List[TestStep]
     notes: Optional[str] = None
 
-    def to_markdown(self) -> str:
-        lines = [f"# {self.title}", ""]
+    def iter_markdown(self) -> Iterator[str]:
+        """Yield the Markdown rendering line by line (without newlines)."""
+        yield f"# {self.title}"
+        yield ""
         current = None
         for s in self.steps:
             if s.section != current:
-                lines.append(f"## {s.section}")
+                yield f"## {s.section}"
                 current = s.section
-            lines.append(f"**{s.id}. {s.description}**")
-            if s.equipment:
-                lines.append(f"- Equipment: {s.equipment}")
-            if s.expected:
-                lines.append(f"- Expected: {s.expected}")
-            lines.append("")
+            yield from s.markdown_lines()
+            yield ""
         if self.notes:
-            lines += ["---", "### Notes", self.notes]
-        return "\n".join(lines)
+            yield "---"
+            yield "### Notes"
+            yield self.notes
+
+    def to_markdown(self) -> str:
+        return "\n".join(self.iter_markdown())
@@ -0,0 +1,61 @@
+"""
+Browse a large TestPlan a page at a time
+
+The web plan tab renders only the steps on the current page, grouped by
+section, and searches the structured steps rather than the Markdown.
+A PlanIndex is built once per plan and shared read-only.
+"""
+from __future__ import annotations
+from typing import Dict, List, Tuple
+
+from core.models import TestPlan, TestStep
+
+PAGE_SIZES = (10, 25, 50, 100)
+
+
+def step_markdown(step: TestStep) -> str:
+    """One step as it appears in plan.to_markdown()."""
+    return "\n".join(step.markdown_lines())
+
+
+class PlanIndex:
+    def __init__(self, plan: TestPlan):
+        self.plan = plan
+        self.sections: Dict[str, List[int]] = {}
+        for i, s in enumerate(plan.steps):
+            self.sections.setdefault(s.section, []).append(i)
+        # Lower-cased searchable text per step
+        self._text = [
+            " ".join(v for v in (s.id, s.section, s.description, s.equipment, s.expected) if v).lower()
+            for s in plan.steps
+        ]
+
+    def __len__(self) -> int:
+        return len(self.plan.steps)
+
+    def search(self, query: str) -> List[int]:
+        """Indices of the steps containing every word of query, in plan order."""
+        terms = query.lower().split()
+        if not terms:
+            return list(range(len(self)))
+        return [i for i, text in enumerate(self._text) if all(t in text for t in terms)]
+
+    @staticmethod
+    def page_count(n: int, page_size: int) -> int:
+        return max(1, -(-n // page_size))
+
+    @staticmethod
+    def page(indices: List[int], page: int, page_size: int) -> List[int]:
+        """The 1-based page of indices; out-of-range pages are clamped."""
+        page = min(max(1, page), PlanIndex.page_count(len(indices), page_size))
+        return indices[(page - 1) * page_size:page * page_size]
+
+    def grouped(self, indices: List[int]) -> List[Tuple[str, List[TestStep]]]:
+        """Consecutive runs of steps by section, for collapsible rendering."""
+        groups: List[Tuple[str, List[TestStep]]] = []
+        for i in indices:
+            step = self.plan.steps[i]
+            if not groups or groups[-1][0] != step.section:
+                groups.append((step.section, []))
+            groups[-1][1].append(step)
+        return groups
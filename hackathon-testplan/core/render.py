@@ -0,0 +1,129 @@
+from __future__ import annotations
+import csv
+import json
+import re
+from pathlib import Path
+from typing import Callable, Dict, Optional, TextIO
+from xml.sax.saxutils import escape, quoteattr
+
+from core.models import TestPlan
+
+# Every writer makes a single pass over plan.steps and writes each step as soon
+# as it is formatted, so memory stays bounded by the largest single step.
+
+CSV_FIELDS = ["id", "section", "description", "equipment", "expected", "nominal", "low", "high", "unit"]
+LIMIT_FIELDS = ("nominal", "low", "high", "unit")
+
+# Characters that are not allowed anywhere in an XML 1.0 document
+_XML_INVALID = re.compile("[\x00-\x08\x0b\x0c\x0e-\x1f]")
+
+
+def write_markdown(plan: TestPlan, fp: TextIO) -> None:
+    """Write the same text as plan.to_markdown() without building it in memory."""
+    if not plan.steps:
+        # Mirrors the CLI behaviour: a plan without steps is just its notes
+        fp.write(plan.notes or "")
+        return
+    first = True
+    for line in plan.iter_markdown():
+        if not first:
+            fp.write("\n")
+        fp.write(line)
+        first = False
+
+
+def write_csv(plan: TestPlan, fp: TextIO) -> None:
+    """One row per step; open fp with newline="" as the csv module expects."""
+    writer = csv.writer(fp)
+    writer.writerow(CSV_FIELDS)
+    for s in plan.steps:
+        row = s.model_dump(include=set(CSV_FIELDS))
+        writer.writerow(["" if row[f] is None else row[f] for f in CSV_FIELDS])
+
+
+def write_jsonl(plan: TestPlan, fp: TextIO) -> None:
+    """One JSON object per step, tagged with the plan title."""
+    title = json.dumps(plan.title, ensure_ascii=False)
+    for s in plan.steps:
+        fp.write(f'{{"plan":{title},"step":{s.model_dump_json()}}}\n')
+
+
+def _xml_text(value: str) -> str:
+    return escape(_XML_INVALID.sub("", value))
+
+
+def _xml_attr(value: str) -> str:
+    return quoteattr(_XML_INVALID.sub("", value))
+
+
+def write_junit(plan: TestPlan, fp: TextIO) -> None:
+    """JUnit-style XML: one <testsuite> per plan section, one <testcase> per step.
+
+    Equipment, expected values and numeric limits are emitted as testcase
+    properties so MES importers can pick them up without parsing free text.
+    """
+    fp.write('<?xml version="1.0" encoding="UTF-8"?>\n')
+    fp.write(f"<testsuites name={_xml_attr(plan.title)} tests=\"{len(plan.steps)}\">\n")
+    current = None
+    for s in plan.steps:
+        if s.section != current:
+            if current is not None:
+                fp.write("  </testsuite>\n")
+            fp.write(f"  <testsuite name={_xml_attr(s.section)}>\n")
+            current = s.section
+        fp.write(f"    <testcase classname={_xml_attr(s.section)} name={_xml_attr(f'{s.id}. {s.description}')}")
+        props = [(k, v) for k, v in (("equipment", s.equipment), ("expected", s.expected)) if v]
+        props += [(k, getattr(s, k)) for k in LIMIT_FIELDS if getattr(s, k) is not None]
+        if not props:
+            fp.write("/>\n")
+            continue
+        fp.write(">\n      <properties>\n")
+        for k, v in props:
+            fp.write(f"        <property name=\"{k}\" value={_xml_attr(str(v))}/>\n")
+        fp.write("      </properties>\n    </testcase>\n")
+    if current is not None:
+        fp.write("  </testsuite>\n")
+    if plan.notes:
+        fp.write('  <testsuite name="Notes" tests="0">\n')
+        fp.write(f"    <system-out>{_xml_text(plan.notes)}</system-out>\n")
+        fp.write("  </testsuite>\n")
+    fp.write("</testsuites>\n")
+
+
+RENDERERS: Dict[str, Callable[[TestPlan, TextIO], None]] = {
+    "md": write_markdown,
+    "csv": write_csv,
+    "jsonl": write_jsonl,
+    "junit": write_junit,
+}
+
+SUFFIX_FORMATS = {
+    ".md": "md",
+    ".markdown": "md",
+    ".csv": "csv",
+    ".jsonl": "jsonl",
+    ".ndjson": "jsonl",
+    ".xml": "junit",
+}
+
+
+def format_for_path(path: Path, default: str = "md") -> str:
+    return SUFFIX_FORMATS.get(Path(path).suffix.lower(), default)
+
+
+def render_plan(plan: TestPlan, fp: TextIO, fmt: str = "md") -> None:
+    try:
+        writer = RENDERERS[fmt]
+    except KeyError:
+        raise ValueError(f"Unknown plan format: {fmt} (expected one of {', '.join(RENDERERS)})") from None
+    writer(plan, fp)
+
+
+def write_plan(plan: TestPlan, path: Path, fmt: Optional[str] = None) -> str:
+    """Stream the plan to path; fmt defaults to the one implied by the suffix."""
+    fmt = fmt or format_for_path(path)
+    path = Path(path)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    with open(path, "w", encoding="utf-8", newline="") as fp:
+        render_plan(plan, fp, fmt)
+    return fmt
@@ -9,7 +9,7 @@ from pathlib import Path
 project_root = Path(__file__).parent
 sys.path.insert(0, str(project_root))
 
-from app.web import infer_entities_from_text
+from ingest.infer import infer_entities_from_text
 
 def demo_file_merging():
     print("🔄 FILE MERGING DEMO")
@@ -1,31 +1,43 @@
 from __future__ import annotations
-from typing import List, Tuple
+import csv
+import io
+from typing import List, Optional, Tuple
 from pathlib import Path
 
+from ingest.source import Source, is_path, read_bytes, source_suffix
+
 try:
     import openpyxl  # type: ignore
 except Exception:
     openpyxl = None
 
 
-def parse_bom(path: str) -> List[Tuple[str, str]]:
-    """Return list of (refdes, value) if possible. Otherwise empty.
-    Accepts .xlsx or .csv (very simple)."""
-    p = Path(path)
-    if not p.exists():
-        return []
+def _csv_rows(f) -> List[Tuple[str, str]]:
+    return [(r[0].strip(), r[1].strip()) for r in csv.reader(f) if len(r) >= 2]
 
-    if p.suffix.lower() == ".csv":
-        rows = []
-        import csv
-        with open(p, newline="", encoding="utf-8", errors="ignore") as f:
-            for r in csv.reader(f):
-                if len(r) >= 2:
-                    rows.append((r[0].strip(), r[1].strip()))
-        return rows
 
-    if p.suffix.lower() in (".xlsx", ".xlsm") and openpyxl is not None:
-        wb = openpyxl.load_workbook(p)
+def parse_bom(source: Source, suffix: Optional[str] = None) -> List[Tuple[str, str]]:
+    """Return list of (refdes, value) if possible. Otherwise empty.
+    Accepts .xlsx or .csv (very simple) as a path, bytes or a binary file
+    object. In-memory input takes its format from suffix or its name, and
+    unnamed bytes are sniffed (a zip container is a workbook)."""
+    if is_path(source):
+        p = Path(source)
+        if not p.exists():
+            return []
+        suffix, workbook = p.suffix.lower(), p
+        if suffix == ".csv":
+            with open(p, newline="", encoding="utf-8", errors="ignore") as f:
+                return _csv_rows(f)
+    else:
+        data = read_bytes(source)
+        suffix = (suffix or source_suffix(source) or (".xlsx" if data[:2] == b"PK" else ".csv")).lower()
+        if suffix == ".csv":
+            return _csv_rows(io.StringIO(data.decode("utf-8", errors="ignore"), newline=""))
+        workbook = io.BytesIO(data)
+
+    if suffix in (".xlsx", ".xlsm") and openpyxl is not None:
+        wb = openpyxl.load_workbook(workbook)
         ws = wb.active
         rows = []
         for row in ws.iter_rows(values_only=True):
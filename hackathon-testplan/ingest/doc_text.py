@@ -0,0 +1,37 @@
+from __future__ import annotations
+import re
+import zipfile
+from html import unescape
+from pathlib import Path
+
+LIBRARY_SUFFIXES = (".pdf", ".docx", ".txt", ".md")
+
+_PARAGRAPH = re.compile(r"<w:p[ >].*?</w:p>|<w:p/>", re.S)
+_RUN_TEXT = re.compile(r"<w:t(?: [^>]*)?>([^<]*)</w:t>|<w:tab/>|<w:br/>")
+
+
+def docx_text(path: str | Path) -> str:
+    """Paragraph text of a .docx, one paragraph per line (stdlib only)."""
+    with zipfile.ZipFile(path) as zf:
+        xml = zf.read("word/document.xml").decode("utf-8", errors="ignore")
+    lines = []
+    for para in _PARAGRAPH.findall(xml):
+        parts = [m.group(1) if m.group(1) is not None else ("\t" if m.group(0) == "<w:tab/>" else "\n")
+                 for m in _RUN_TEXT.finditer(para)]
+        lines.append(unescape("".join(parts)))
+    return "\n".join(lines)
+
+
+def extract_document_text(path: str | Path) -> str:
+    """Full text of a library document (PDF, .docx, text or Markdown); "" if unreadable."""
+    p = Path(path)
+    suffix = p.suffix.lower()
+    try:
+        if suffix == ".pdf":
+            from pdfminer.high_level import extract_text
+            return extract_text(str(p))
+        if suffix == ".docx":
+            return docx_text(p)
+        return p.read_text(encoding="utf-8", errors="ignore")
+    except Exception:
+        return ""
@@ -0,0 +1,63 @@
+from __future__ import annotations
+import re
+
+from core.models import FunctionalTest, ParsedEntities, PowerRail
+
+
+def infer_entities_from_text(text: str, title: str = "Design", defaults: bool = True) -> ParsedEntities:
+    """Heuristically infer entities from text content
+
+    With defaults=False nothing is invented when the text names no rails
+    or tests, so results from several sources can be merged first.
+    """
+    T = text.upper()
+    
+    # Rails - look for voltage patterns
+    rails = []
+    voltage_patterns = [
+        (r"\+?5V", 5.0), (r"\+?3V3", 3.3), (r"\+?3\.3V", 3.3),
+        (r"VCC5", 5.0), (r"VCC3V3", 3.3), (r"PWR_JACK", 5.0)
+    ]
+    
+    seen_voltages = set()
+    for pattern, voltage in voltage_patterns:
+        if re.search(pattern, T) and voltage not in seen_voltages:
+            rails.append({"name": f"+{voltage:g}V" if voltage == 5.0 else f"+{voltage:g}V", 
+                         "voltage": voltage, "tolerance_mv": 100})
+            seen_voltages.add(voltage)
+    
+    # Oscillators - look for crystal references
+    oscillators = []
+    if "Y1" in T or "16MHZ" in T:
+        oscillators.append({"ref": "Y1", "frequency_hz": 16000000, "tolerance_hz": 100000})
+    if "Y2" in T or "32MHZ" in T:
+        oscillators.append({"ref": "Y2", "frequency_hz": 32000000, "tolerance_hz": 100000})
+    
+    # Functional tests - infer from components
+    functional_tests = []
+    if "LORA" in T or "SX1276" in T:
+        functional_tests.append({"name": "LoRa BIT", "command": "bit.lora", "expected": "PASS"})
+    if "GPS" in T or "MAX-M10S" in T:
+        functional_tests.append({"name": "GPS BIT", "command": "bit.gps", "expected": "PASS"})
+    if "IMU" in T or "LSM6DSOX" in T:
+        functional_tests.append({"name": "IMU BIT", "command": "bit.imu", "expected": "PASS"})
+    if "I2C" in T:
+        functional_tests.append({"name": "I2C BIT", "command": "bit.i2c", "expected": "PASS"})
+    
+    ent = ParsedEntities.model_validate({
+        "title": title,
+        "rails": rails,
+        "oscillators": oscillators,
+        "functional_tests": functional_tests
+    })
+    return with_defaults(ent) if defaults else ent
+
+
+def with_defaults(ent: ParsedEntities) -> ParsedEntities:
+    """Generic rails and a full BIT where the design names none."""
+    if not ent.rails:
+        ent.rails = [PowerRail(name="+5V", voltage=5.0, tolerance_mv=100),
+                     PowerRail(name="+3V3", voltage=3.3, tolerance_mv=100)]
+    if not ent.functional_tests:
+        ent.functional_tests = [FunctionalTest(name="Full BIT", command="bit", expected="PASS")]
+    return ent
@@ -0,0 +1,132 @@
+"""
+Merge entities from several design sources into one ParsedEntities
+
+Each entity kind is deduplicated through a dict keyed on a normalized
+name (rails), refdes (oscillators) or test name, so a merge is one pass
+over all entities. Sources are taken in the order given, which is their
+priority: the first source to name an entity decides its values, later
+sources only fill in fields it left empty. Every disagreement is
+reported as a Conflict rather than silently dropped.
+"""
+from __future__ import annotations
+import re
+from dataclasses import dataclass, field
+from typing import Any, Dict, List, Optional, Tuple
+
+from pydantic import BaseModel
+
+from core.models import ParsedEntities
+
+DEFAULT_TITLES = {"", "Untitled Board", "Unknown Board", "Design"}
+
+_RAIL_VOLTAGE = re.compile(r"(\d+)(?:[.V](\d+))?V?")
+
+
+def rail_key(name: str) -> str:
+    """'+3V3', '3.3V' and '3V30' share a key, as do 'VCC_AUX' and 'vcc aux'."""
+    n = re.sub(r"[\s_\-]", "", name.upper()).lstrip("+")
+    m = _RAIL_VOLTAGE.fullmatch(n)
+    if m:
+        frac = (m.group(2) or "").rstrip("0")
+        return f"{int(m.group(1))}V{frac}"
+    return n
+
+
+def ref_key(ref: str) -> str:
+    return ref.strip().upper()
+
+
+def functional_test_key(name: str) -> str:
+    return " ".join(name.split()).casefold()
+
+
+@dataclass
+class Conflict:
+    kind: str    # "rail", "oscillator" or "functional_test"
+    key: str
+    field: str
+    kept: Any
+    kept_source: str
+    other: Any
+    other_source: str
+
+    def message(self) -> str:
+        return (f"{self.kind} {self.key}: {self.field} {self.kept!r} from {self.kept_source} "
+                f"kept over {self.other!r} from {self.other_source}")
+
+
+@dataclass
+class MergeResult:
+    entities: ParsedEntities
+    conflicts: List[Conflict] = field(default_factory=list)
+    duplicates: int = 0  # entities named by more than one source that agreed
+    sources: Dict[str, int] = field(default_factory=dict)  # entities contributed per source
+
+
+def _same(a: Any, b: Any) -> bool:
+    if isinstance(a, float) or isinstance(b, float):
+        return abs(float(a) - float(b)) <= 1e-9 * max(1.0, abs(float(a)))
+    return a == b
+
+
+class _Index:
+    """One entity kind: normalized key -> (kept entity, its source)."""
+
+    def __init__(self, kind: str, key_field: str, normalize):
+        self.kind = kind
+        self.key_field = key_field
+        self.normalize = normalize
+        self.items: Dict[str, Tuple[BaseModel, str]] = {}
+
+    def add(self, item: BaseModel, source: str, result: MergeResult) -> None:
+        key = self.normalize(getattr(item, self.key_field))
+        existing = self.items.get(key)
+        if existing is None:
+            self.items[key] = (item.model_copy(), source)
+            result.sources[source] = result.sources.get(source, 0) + 1
+            return
+        kept, kept_source = existing
+        clash = False
+        for name in type(item).model_fields:
+            if name == self.key_field:
+                continue
+            ours, theirs = getattr(kept, name), getattr(item, name)
+            if theirs is None or _same(ours, theirs):
+                continue
+            if ours is None:
+                setattr(kept, name, theirs)  # fill in what the first source left out
+                continue
+            clash = True
+            result.conflicts.append(Conflict(self.kind, key, name, ours, kept_source, theirs, source))
+        if not clash:
+            result.duplicates += 1
+
+    def values(self) -> List[BaseModel]:
+        return [item for item, _ in self.items.values()]
+
+
+def merge_entities(sources: List[Tuple[str, ParsedEntities]], title: Optional[str] = None) -> MergeResult:
+    """Merge (source name, entities) pairs, highest priority first.
+
+    The title is the given one, else the first non-placeholder source
+    title, else the source names joined with " | ".
+    """
+    result = MergeResult(ParsedEntities())
+    rails = _Index("rail", "name", rail_key)
+    oscillators = _Index("oscillator", "ref", ref_key)
+    tests = _Index("functional_test", "name", functional_test_key)
+    for source, ent in sources:
+        result.sources.setdefault(source, 0)
+        for rail in ent.rails:
+            rails.add(rail, source, result)
+        for osc in ent.oscillators:
+            oscillators.add(osc, source, result)
+        for test in ent.functional_tests:
+            tests.add(test, source, result)
+    if title is None:
+        named = [ent.title for _, ent in sources if ent.title not in DEFAULT_TITLES]
+        title = named[0] if named else " | ".join(dict.fromkeys(s for s, _ in sources)) or ParsedEntities().title
+    result.entities = ParsedEntities(
+        title=title, rails=rails.values(), oscillators=oscillators.values(), functional_tests=tests.values()
+    )
+    return result
@@ -1,41 +1,107 @@
 from __future__ import annotations
 import re
+from dataclasses import dataclass, field
+from functools import cached_property
 from pathlib import Path
-from typing import List, Dict, Set, Tuple
+from typing import List, Dict, Optional, Set, Tuple
 from core.models import ParsedEntities, PowerRail, Oscillator, FunctionalTest
+from ingest.source import Source, is_path, read_text
 
+POWER_NET_NAMES = ["VCC", "VDD", "PWR", "POWER"]
+_POWER_VOLTAGE = re.compile(r"\d+(?:\.\d+)?V")
 
-def parse_netlist(netlist_path: str) -> ParsedEntities:
-    """Parse IPC-D-356A netlist format to extract hardware entities."""
-    p = Path(netlist_path)
+
+def looks_like_power_net(net_name: str) -> bool:
+    """Same heuristic parse_netlist uses to pick power rails out of the net list."""
+    upper = net_name.upper()
+    if "GND" in upper:
+        return False
+    return bool(_POWER_VOLTAGE.search(net_name)) or any(k in upper for k in POWER_NET_NAMES)
+
+
+def _refdes(pin: str) -> str:
+    """'U1-3' -> 'U1'; plain refdes records are returned unchanged."""
+    return pin.split("-", 1)[0]
+
+
+@dataclass
+class NetlistIndex:
+    """Connectivity of a netlist: net name -> one entry per pin record on that net."""
+    title: str = "Unknown Board"
+    nets: Dict[str, List[str]] = field(default_factory=dict)
+
+    @cached_property
+    def nets_by_ref(self) -> Dict[str, Set[str]]:
+        out: Dict[str, Set[str]] = {}
+        for net, pins in self.nets.items():
+            for pin in pins:
+                out.setdefault(_refdes(pin), set()).add(net)
+        return out
+
+    def pin_count(self, net: str) -> int:
+        return len(self.nets.get(net, ()))
+
+    def refs_on(self, net: str) -> Set[str]:
+        return {_refdes(p) for p in self.nets.get(net, ())}
+
+    @property
+    def total_pins(self) -> int:
+        return sum(len(pins) for pins in self.nets.values())
+
+
+def _read_lines(netlist: Source) -> List[str]:
+    if not is_path(netlist):
+        return read_text(netlist).splitlines()
+    p = Path(netlist)
     if not p.exists():
-        raise FileNotFoundError(f"Netlist file not found: {netlist_path}")
-    
-    content = p.read_text()
-    lines = content.splitlines()
-    
-    # Extract project info
-    title = "Unknown Board"
+        raise FileNotFoundError(f"Netlist file not found: {netlist}")
+    return p.read_text().splitlines()
+
+
+def _netlist_title(lines: List[str]) -> str:
     for line in lines:
         if line.startswith("C  Project Name :"):
-            title = line.split(":", 1)[1].strip()
-            break
+            return line.split(":", 1)[1].strip()
         elif line.startswith("C  Board Name :"):
-            title = line.split(":", 1)[1].strip()
-            break
-    
-    # Parse nets (lines starting with 327 or 317)
-    nets = {}
+            return line.split(":", 1)[1].strip()
+    return "Unknown Board"
+
+
+def _index_lines(lines: List[str]) -> NetlistIndex:
+    nets: Dict[str, List[str]] = {}
     for line in lines:
         if line.startswith(("327", "317")):
             parts = line.split()
             if len(parts) >= 3:
-                net_name = parts[1]  # Net name is the second field
-                component_ref = parts[2]  # Component ref is the third field
-                
-                if net_name not in nets:
-                    nets[net_name] = []
-                nets[net_name].append(component_ref)
+                nets.setdefault(parts[1], []).append(parts[2])
+    return NetlistIndex(title=_netlist_title(lines), nets=nets)
+
+
+def index_netlist(netlist: Source) -> NetlistIndex:
+    """Build the connectivity index used by the netlist validators."""
+    return _index_lines(_read_lines(netlist))
+
+
+def load_netlist(netlist: Source) -> Tuple[ParsedEntities, NetlistIndex]:
+    """Parse entities and build the connectivity index from a single read."""
+    lines = _read_lines(netlist)
+    index = _index_lines(lines)
+    return _entities_from_lines(lines, index), index
+
+
+def parse_netlist(netlist: Source) -> ParsedEntities:
+    """Parse IPC-D-356A netlist format to extract hardware entities.
+
+    Takes a path, the file's bytes, or a binary file object.
+    """
+    return _entities_from_lines(_read_lines(netlist))
+    
+    
+def _entities_from_lines(lines: List[str], index: Optional[NetlistIndex] = None) -> ParsedEntities:
+    # Extract project info and nets (lines starting with 327 or 317)
+    index = index or _index_lines(lines)
+    title = index.title
+    nets = index.nets
     
     # Extract power rails
     rails = []
@@ -62,11 +128,11 @@ def parse_netlist(netlist_path: str) -> ParsedEntities:
                 try:
                     voltage = float(match.group(1))
                     break
-                except ValueError:
+                except (ValueError, IndexError):
                     pass
         
         # Also check for common power rail names
-        if any(power_name in net_name.upper() for power_name in ["VCC", "VDD", "PWR", "POWER"]):
+        if any(power_name in net_name.upper() for power_name in POWER_NET_NAMES):
             is_power = True
             # Try to extract voltage from net name
             voltage_match = re.search(r"(\d+(?:\.\d+)?)", net_name)
@@ -161,14 +227,12 @@ def parse_netlist(netlist_path: str) -> ParsedEntities:
     )
 
 
-def extract_test_points(netlist_path: str) -> List[Dict]:
+def extract_test_points(netlist: Source) -> List[Dict]:
     """Extract test point information from netlist."""
-    p = Path(netlist_path)
-    if not p.exists():
+    if is_path(netlist) and not Path(netlist).exists():
         return []
     
-    content = p.read_text()
-    lines = content.splitlines()
+    lines = _read_lines(netlist)
     
     test_points = []
     for line in lines:
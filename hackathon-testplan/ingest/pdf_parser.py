@@ -4,15 +4,17 @@ from typing import List
 
 from pdfminer.high_level import extract_text
 
+from ingest.source import Source, binary_stream, is_path
+
 KEY_SECTIONS = ["Voltage", "Oscillator", "Programming", "Functional", "BIT", "Test"]
 
 
-def extract_pdf_hints(pdf_path: str) -> List[str]:
-    p = Path(pdf_path)
-    if not p.exists():
+def extract_pdf_hints(pdf: Source) -> List[str]:
+    """Lines mentioning a key section, from a PDF path, its bytes or a binary file object."""
+    if is_path(pdf) and not Path(pdf).exists():
         return []
     try:
-        text = extract_text(pdf_path)
+        text = extract_text(pdf if is_path(pdf) else binary_stream(pdf))
     except Exception:
         return []
     lines = [ln.strip() for ln in text.splitlines() if ln.strip()]
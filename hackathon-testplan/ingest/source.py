@@ -0,0 +1,48 @@
+from __future__ import annotations
+import io
+import os
+from pathlib import Path
+from typing import BinaryIO, Union
+
+# Anything an ingest function reads from: a path, raw bytes, or a binary file object
+Source = Union[str, os.PathLike, bytes, bytearray, memoryview, BinaryIO]
+
+
+def is_path(source: Source) -> bool:
+    return isinstance(source, (str, os.PathLike))
+
+
+def source_name(source: Source) -> str:
+    """File name of a path or named file object (an upload, an open file); "" for raw bytes."""
+    if is_path(source):
+        return Path(source).name
+    name = getattr(source, "name", "")
+    return Path(name).name if isinstance(name, str) else ""
+
+
+def source_suffix(source: Source) -> str:
+    return Path(source_name(source)).suffix.lower()
+
+
+def read_bytes(source: Source) -> bytes:
+    """Whole content; a file object is read from its current position."""
+    if is_path(source):
+        return Path(source).read_bytes()
+    if isinstance(source, bytes):
+        return source
+    if isinstance(source, (bytearray, memoryview)):
+        return bytes(source)
+    return source.read()
+
+
+def read_text(source: Source, encoding: str = "utf-8") -> str:
+    if is_path(source):
+        return Path(source).read_text(encoding=encoding, errors="ignore")
+    return read_bytes(source).decode(encoding, errors="ignore")
+
+
+def binary_stream(source: Source) -> BinaryIO:
+    """A readable binary stream over in-memory content, for libraries that take file objects."""
+    if isinstance(source, (bytes, bytearray, memoryview)):
+        return io.BytesIO(source)
+    return source
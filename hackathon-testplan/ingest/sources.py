@@ -0,0 +1,90 @@
+"""
+Parse uploaded design files into pieces
+
+A piece is a plain dict so it crosses process boundaries: kind "entities"
+carries complete ParsedEntities (from JSON or a netlist), kind "text"
+carries text to infer entities from, kind "note" only a message. Zip
+archives are split into one task per member so they can be parsed in
+parallel and report progress.
+"""
+from __future__ import annotations
+import json
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Tuple
+
+from core.models import ParsedEntities
+from ingest.bom_parser import parse_bom
+from ingest.netlist_parser import parse_netlist
+from ingest.pdf_parser import extract_pdf_hints
+from ingest.zip_loader import iter_zip
+
+NETLIST_EXTS = ("txt", "net", "ipc")
+BOM_EXTS = ("xlsx", "xlsm", "csv")
+ALTIUM_EXTS = ("schdoc", "pcbdoc", "prjpcb", "bomdoc")
+PARSED_EXTS = NETLIST_EXTS + ("json", "pdf") + BOM_EXTS + ALTIUM_EXTS  # what parse_file reads
+
+Piece = Dict[str, Any]
+# (file name, content, label shown to the user, inside an archive)
+SourceTask = Tuple[str, bytes, str, bool]
+
+
+def entities_summary(ent: ParsedEntities) -> str:
+    return f"{len(ent.rails)} rails, {len(ent.oscillators)} oscillators, {len(ent.functional_tests)} tests"
+
+
+def parse_file(name: str, data: bytes, label: str, in_zip: bool = False) -> Optional[Piece]:
+    """One parsed piece, or None for a file type we do not read."""
+    file_name = Path(name).name
+    ext = Path(name).suffix.lower().lstrip('.')
+    if ext in NETLIST_EXTS:
+        ent = parse_netlist(data)
+        return {"name": label, "kind": "entities", "entities": ent,
+                "message": f"✅ Parsed netlist {file_name}: {entities_summary(ent)}"}
+    if ext == 'json':
+        ent = ParsedEntities.model_validate(json.loads(data))
+        return {"name": label, "kind": "entities", "entities": ent,
+                "message": f"✅ Loaded JSON {file_name}: {entities_summary(ent)}"}
+    if ext == 'pdf':
+        hints = extract_pdf_hints(data)
+        return {"name": label, "kind": "text", "text": "\n".join(hints),
+                "message": f"📄 Processed PDF {file_name}: {len(hints)} text hints" if in_zip else ""}
+    if ext in BOM_EXTS:
+        rows = parse_bom(data, suffix=f".{ext}")
+        return {"name": label, "kind": "text", "text": "\n".join([f"{r} {v}" for r, v in rows]),
+                "message": f"📊 Processed BOM {file_name}: {len(rows)} components" if in_zip else ""}
+    if ext in ALTIUM_EXTS:
+        text = data.decode("utf-8", errors="ignore")
+        return {"name": label, "kind": "text", "text": text,
+                "message": f"🔧 Processed Altium {file_name}: {len(text)} characters" if in_zip else ""}
+    return None
+
+
+def source_tasks(name: str, data: bytes) -> List[SourceTask]:
+    """The files to parse for one upload: itself, or each member of a zip we can read.
+
+    Raises ValueError for an archive over the ZIP_MAX_MB size cap.
+    """
+    if not name.lower().endswith(".zip"):
+        return [(name, data, name, False)]
+    return [(member, content, f"{name}/{Path(member).name}", True) for member, content in iter_zip(data, PARSED_EXTS)]
+
+
+def run_task(task: SourceTask) -> Optional[Piece]:
+    return parse_file(*task)
+
+
+def assemble_pieces(name: str, parsed: List[Optional[Piece]], is_zip: bool) -> List[Piece]:
+    """Pieces in upload order; a zip is framed by notes on how many members it had and how many were read."""
+    pieces = [piece for piece in parsed if piece]
+    if not is_zip:
+        return pieces
+    notes = [{"name": name, "kind": "note", "message": f"📦 Extracted {len(parsed)} files from {name}"}]
+    if pieces:
+        notes.append({"name": name, "kind": "note", "message": f"🎯 Successfully processed {len(pieces)} files from {name}"})
+    return notes[:1] + pieces + notes[1:]
+
+
+def parse_source(name: str, data: bytes) -> List[Piece]:
+    """Parsed pieces of one upload, in this process."""
+    parsed = [run_task(task) for task in source_tasks(name, data)]
+    return assemble_pieces(name, parsed, name.lower().endswith(".zip"))
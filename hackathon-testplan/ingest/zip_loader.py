@@ -1,12 +1,56 @@
 from __future__ import annotations
+import os
 import zipfile
 from pathlib import Path
-from typing import List
+from typing import Iterable, Iterator, List, Optional, Tuple
 
+from ingest.source import Source, binary_stream, is_path
 
-def extract_zip(zip_path: str, out_dir: str) -> List[str]:
+# Cap on the uncompressed size of the members read from one archive
+ZIP_MAX_MB = float(os.getenv("ZIP_MAX_MB", "256"))
+
+
+def _zipfile(source: Source) -> zipfile.ZipFile:
+    return zipfile.ZipFile(source if is_path(source) else binary_stream(source), 'r')
+
+
+def extract_zip(zip_source: Source, out_dir: str) -> List[str]:
     out = Path(out_dir)
     out.mkdir(parents=True, exist_ok=True)
-    with zipfile.ZipFile(zip_path, 'r') as zf:
+    with _zipfile(zip_source) as zf:
         zf.extractall(out)
         return [str(out / n) for n in zf.namelist()]
+
+
+def zip_members(zip_source: Source, exts: Optional[Iterable[str]] = None, max_mb: Optional[float] = None) -> List[zipfile.ZipInfo]:
+    """Files in the archive with one of exts (all files if None), checked against the size cap.
+
+    Only the central directory is read. Raises ValueError when the members'
+    uncompressed sizes add up to more than max_mb (ZIP_MAX_MB by default).
+    """
+    wanted = None if exts is None else {e.lower().lstrip('.') for e in exts}
+    with _zipfile(zip_source) as zf:
+        members = [
+            info for info in zf.infolist()
+            if not info.is_dir() and (wanted is None or Path(info.filename).suffix.lower().lstrip('.') in wanted)
+        ]
+    _check_size(members, ZIP_MAX_MB if max_mb is None else max_mb)
+    return members
+
+
+def _check_size(members: List[zipfile.ZipInfo], max_mb: float) -> None:
+    total = sum(info.file_size for info in members)
+    if total > max_mb * 1024 * 1024:
+        raise ValueError(f"archive expands to {total / 1024 / 1024:.0f} MB, over the {max_mb:g} MB limit (ZIP_MAX_MB)")
+
+
+def iter_zip(zip_source: Source, exts: Optional[Iterable[str]] = None, max_mb: Optional[float] = None) -> Iterator[Tuple[str, bytes]]:
+    """(member name, content) of each file with one of exts, in order, without touching disk.
+
+    The size cap is checked before any member is read; zipfile stops a
+    member at its declared size, so the cap also bounds what is read.
+    """
+    members = zip_members(zip_source, exts, max_mb)
+    with _zipfile(zip_source) as zf:
+        for info in members:
+            yield info.filename, zf.read(info)
@@ -0,0 +1,153 @@
+from __future__ import annotations
+import asyncio
+import os
+import time
+from dataclasses import dataclass, field
+from typing import List, Optional, Sequence
+
+try:
+    from openai import AsyncOpenAI  # type: ignore
+except Exception:
+    AsyncOpenAI = None  # library not installed; every board falls back
+
+from core.generator import generate_plan_offline
+from core.models import ParsedEntities, TestPlan
+from nlp.prompting import SYSTEM_PROMPT
+from nlp.llm_client import (
+    EnhancementReport, active_response_cache, append_enhancements, prepare_enhancement_prompt,
+    chat_messages, llm_cache_key, llm_settings,
+)
+
+DEFAULT_CONCURRENCY = int(os.getenv("LLM_CONCURRENCY", "8"))
+DEFAULT_TIMEOUT_S = float(os.getenv("LLM_TIMEOUT_S", "60"))
+
+
+class AsyncRateLimiter:
+    """Token bucket: at most `rate` acquisitions per second, bursts up to `burst`."""
+
+    def __init__(self, rate: float, burst: int = 1):
+        if rate <= 0:
+            raise ValueError("rate must be > 0")
+        self.rate = rate
+        self.burst = max(1, burst)
+        self._tokens = float(self.burst)
+        self._updated: Optional[float] = None
+        self._lock = asyncio.Lock()
+
+    async def acquire(self) -> None:
+        async with self._lock:
+            loop = asyncio.get_running_loop()
+            while True:
+                now = loop.time()
+                if self._updated is not None:
+                    self._tokens = min(self.burst, self._tokens + (now - self._updated) * self.rate)
+                self._updated = now
+                if self._tokens >= 1:
+                    self._tokens -= 1
+                    return
+                await asyncio.sleep((1 - self._tokens) / self.rate)
+
+
+@dataclass
+class BoardResult:
+    plan: TestPlan
+    report: EnhancementReport = field(default_factory=EnhancementReport)
+
+
+def create_async_client(api_key: Optional[str] = None, base_url: Optional[str] = None, max_connections: int = DEFAULT_CONCURRENCY):
+    """One pooled client for a whole batch; retries are left to the caller."""
+    import httpx
+
+    return AsyncOpenAI(
+        api_key=api_key or os.getenv("OPENAI_API_KEY"),
+        base_url=base_url or os.getenv("OPENAI_BASE_URL") or None,
+        max_retries=0,
+        http_client=httpx.AsyncClient(limits=httpx.Limits(max_connections=max_connections, max_keepalive_connections=max_connections)),
+    )
+
+
+async def enhance_plan_async(
+    entities: ParsedEntities,
+    client,
+    semaphore: asyncio.Semaphore,
+    limiter: Optional[AsyncRateLimiter] = None,
+    timeout: float = DEFAULT_TIMEOUT_S,
+    use_cache: bool = True,
+) -> BoardResult:
+    """Enhance one board; any failure returns its deterministic plan instead."""
+    base = generate_plan_offline(entities)
+    report = EnhancementReport()
+    start = time.perf_counter()
+    try:
+        # Retrieval talks to the vector store synchronously; keep it off the loop
+        compaction = await asyncio.to_thread(prepare_enhancement_prompt, entities)
+        report.stages["retrieval"] = time.perf_counter() - start
+        user_prompt = compaction.prompt
+        report.prompt_tokens, report.trimmed_tokens = compaction.tokens_after, compaction.trimmed_tokens
+
+        settings = llm_settings()
+        cache = active_response_cache(use_cache)
+        key = llm_cache_key(settings["model"], settings["temperature"], SYSTEM_PROMPT, user_prompt)
+        md = cache.get(key) if cache is not None else None
+        if md is not None:
+            report.status = "cached"
+            return BoardResult(append_enhancements(base, md), report)
+
+        async with semaphore:
+            if limiter is not None:
+                await limiter.acquire()
+            sent = time.perf_counter()
+            resp = await asyncio.wait_for(
+                client.chat.completions.create(
+                    model=settings["model"],
+                    messages=chat_messages(user_prompt),
+                    temperature=settings["temperature"],
+                    timeout=timeout,
+                ),
+                timeout,
+            )
+            report.stages["completion"] = time.perf_counter() - sent
+        md = resp.choices[0].message.content or ""
+        if cache is not None and md:
+            cache.put(key, md)
+        report.status = "enhanced"
+        return BoardResult(append_enhancements(base, md), report)
+    except asyncio.TimeoutError:
+        report.status, report.reason = "failed", f"timed out after {timeout:g}s"
+    except Exception as e:
+        report.status, report.reason = "failed", f"{type(e).__name__}: {e}"
+    finally:
+        report.stages["total"] = time.perf_counter() - start
+    return BoardResult(base, report)
+
+
+async def enhance_plans_async(
+    boards: Sequence[ParsedEntities],
+    concurrency: int = DEFAULT_CONCURRENCY,
+    rate_per_sec: Optional[float] = None,
+    timeout: float = DEFAULT_TIMEOUT_S,
+    client=None,
+    use_cache: bool = True,
+) -> List[BoardResult]:
+    """Enhance many boards concurrently; results keep the input order."""
+    if AsyncOpenAI is None or not (os.getenv("OPENAI_API_KEY") or client is not None):
+        reason = "openai not installed" if AsyncOpenAI is None else "OPENAI_API_KEY not set"
+        return [BoardResult(generate_plan_offline(e), EnhancementReport(reason=reason)) for e in boards]
+
+    own_client = client is None
+    if own_client:
+        client = create_async_client(max_connections=concurrency)
+    semaphore = asyncio.Semaphore(concurrency)
+    limiter = AsyncRateLimiter(rate_per_sec, burst=concurrency) if rate_per_sec else None
+    try:
+        return list(await asyncio.gather(*(
+            enhance_plan_async(e, client, semaphore, limiter, timeout, use_cache) for e in boards
+        )))
+    finally:
+        if own_client:
+            await client.close()
+
+
+def enhance_plans(boards: Sequence[ParsedEntities], **kwargs) -> List[BoardResult]:
+    """Blocking wrapper around enhance_plans_async for CLI and scripts."""
+    return asyncio.run(enhance_plans_async(boards, **kwargs))
@@ -0,0 +1,193 @@
+from __future__ import annotations
+import asyncio
+import os
+import re
+import time
+from typing import Dict, List, Optional, Sequence
+
+from core.generator import generate_plan_offline
+from core.models import ParsedEntities
+from nlp.prompting import SYSTEM_PROMPT, compact_entity_summary, estimate_tokens
+from nlp.llm_client import (
+    EnhancementReport, active_response_cache, append_enhancements, llm_cache_key, llm_settings,
+    search_context_for_entities,
+)
+from nlp.llm_async import (
+    DEFAULT_CONCURRENCY, DEFAULT_TIMEOUT_S, AsyncOpenAI, AsyncRateLimiter, BoardResult, create_async_client,
+)
+
+# Several boards share one request: one system prompt, one RAG lookup and one
+# instruction block instead of one of each per board.
+BATCH_MAX_BOARDS = int(os.getenv("LLM_BATCH_MAX_BOARDS", "8"))
+BATCH_MAX_PROMPT_TOKENS = int(os.getenv("LLM_BATCH_MAX_PROMPT_TOKENS", "6000"))
+BATCH_CONTEXT_TOKENS = 800  # RAG context shared by every board in a request
+
+BATCH_SYSTEM_PROMPT = SYSTEM_PROMPT + (
+    " You will receive several boards. For each board, reply with a section that starts with the exact "
+    "line `=== BOARD <id> ===` followed by concise Markdown notes for that board only."
+)
+BATCH_INSTRUCTION = (
+    "For every board above, improve clarity and add short safety/DFT notes. Keep each section concise "
+    "and answer every board id exactly once."
+)
+
+_SECTION = re.compile(r"^=== BOARD (\S+) ===[ \t]*$", re.MULTILINE)
+
+
+def group_boards(summaries: Sequence[str], max_boards: int = BATCH_MAX_BOARDS, max_tokens: int = BATCH_MAX_PROMPT_TOKENS) -> List[List[int]]:
+    """Pack boards into requests in input order, bounded by count and estimated tokens.
+
+    A board whose summary alone exceeds max_tokens still gets a request of its own.
+    """
+    groups: List[List[int]] = []
+    current: List[int] = []
+    used = 0
+    for i, summary in enumerate(summaries):
+        cost = estimate_tokens(summary) + 8  # board header
+        if current and (len(current) >= max_boards or used + cost > max_tokens):
+            groups.append(current)
+            current, used = [], 0
+        current.append(i)
+        used += cost
+    if current:
+        groups.append(current)
+    return groups
+
+
+def build_batch_prompt(ids: Sequence[str], summaries: Sequence[str], context: str = "") -> str:
+    parts = [f"### Board {bid}\n{summary}" for bid, summary in zip(ids, summaries)]
+    prompt = "\n\n".join(parts)
+    if context:
+        prompt += f"\n\nRelevant Context from Library:\n{context}"
+    return prompt + f"\n\n{BATCH_INSTRUCTION}"
+
+
+def split_batch_response(text: str, ids: Sequence[str]) -> Dict[str, str]:
+    """Map board id -> its section of a batched response; unknown ids are ignored."""
+    wanted = set(ids)
+    out: Dict[str, str] = {}
+    matches = list(_SECTION.finditer(text))
+    for m, nxt in zip(matches, matches[1:] + [None]):
+        bid = m.group(1)
+        body = text[m.end():nxt.start() if nxt else len(text)].strip()
+        if bid in wanted and body and bid not in out:
+            out[bid] = body
+    return out
+
+
+def _shared_context(boards: Sequence[ParsedEntities]) -> str:
+    context = search_context_for_entities("\n".join(b.model_dump_json() for b in boards))
+    kept, used = [], 0
+    for line in context.splitlines():
+        cost = estimate_tokens(line) + 1
+        if used + cost > BATCH_CONTEXT_TOKENS:
+            break
+        kept.append(line)
+        used += cost
+    return "\n".join(kept)
+
+
+async def _run_group(
+    boards: Sequence[ParsedEntities],
+    summaries: Sequence[str],
+    client,
+    semaphore: asyncio.Semaphore,
+    limiter: Optional[AsyncRateLimiter],
+    timeout: float,
+    use_cache: bool,
+) -> List[BoardResult]:
+    ids = [f"B{i + 1}" for i in range(len(boards))]
+    results = [BoardResult(generate_plan_offline(b)) for b in boards]
+    start = time.perf_counter()
+    try:
+        context = await asyncio.to_thread(_shared_context, boards)
+        retrieval = time.perf_counter() - start
+        user_prompt = build_batch_prompt(ids, summaries, context)
+        settings = llm_settings()
+        cache = active_response_cache(use_cache)
+        key = llm_cache_key(settings["model"], settings["temperature"], BATCH_SYSTEM_PROMPT, user_prompt)
+        text = cache.get(key) if cache is not None else None
+        status = "cached"
+        completion = 0.0
+        if text is None:
+            async with semaphore:
+                if limiter is not None:
+                    await limiter.acquire()
+                sent = time.perf_counter()
+                resp = await asyncio.wait_for(
+                    client.chat.completions.create(
+                        model=settings["model"],
+                        messages=[
+                            {"role": "system", "content": BATCH_SYSTEM_PROMPT},
+                            {"role": "user", "content": user_prompt},
+                        ],
+                        temperature=settings["temperature"],
+                        timeout=timeout,
+                    ),
+                    timeout,
+                )
+                completion = time.perf_counter() - sent
+            text = resp.choices[0].message.content or ""
+            status = "enhanced"
+        sections = split_batch_response(text, ids)
+        if cache is not None and status == "enhanced" and len(sections) == len(ids):
+            cache.put(key, text)
+        share = estimate_tokens(user_prompt) // len(ids)
+        for bid, result in zip(ids, results):
+            result.report.stages.update(retrieval=retrieval, completion=completion, total=time.perf_counter() - start)
+            result.report.prompt_tokens = share
+            if bid in sections:
+                append_enhancements(result.plan, sections[bid])
+                result.report.status = status
+            else:
+                result.report.status, result.report.reason = "failed", "board missing from batched response"
+    except asyncio.TimeoutError:
+        for result in results:
+            result.report.status, result.report.reason = "failed", f"batched request timed out after {timeout:g}s"
+    except Exception as e:
+        for result in results:
+            result.report.status, result.report.reason = "failed", f"{type(e).__name__}: {e}"
+    return results
+
+
+async def generate_plans_llm_batch_async(
+    boards: Sequence[ParsedEntities],
+    max_boards: int = BATCH_MAX_BOARDS,
+    max_prompt_tokens: int = BATCH_MAX_PROMPT_TOKENS,
+    concurrency: int = DEFAULT_CONCURRENCY,
+    rate_per_sec: Optional[float] = None,
+    timeout: float = DEFAULT_TIMEOUT_S,
+    client=None,
+    use_cache: bool = True,
+) -> List[BoardResult]:
+    """Enhance a product family with several boards per request; results keep input order."""
+    if AsyncOpenAI is None or not (os.getenv("OPENAI_API_KEY") or client is not None):
+        reason = "openai not installed" if AsyncOpenAI is None else "OPENAI_API_KEY not set"
+        return [BoardResult(generate_plan_offline(b), EnhancementReport(reason=reason)) for b in boards]
+
+    summaries = [compact_entity_summary(b) for b in boards]
+    groups = group_boards(summaries, max_boards, max_prompt_tokens)
+    own_client = client is None
+    if own_client:
+        client = create_async_client(max_connections=concurrency)
+    semaphore = asyncio.Semaphore(concurrency)
+    limiter = AsyncRateLimiter(rate_per_sec, burst=concurrency) if rate_per_sec else None
+    try:
+        grouped = await asyncio.gather(*(
+            _run_group([boards[i] for i in g], [summaries[i] for i in g], client, semaphore, limiter, timeout, use_cache)
+            for g in groups
+        ))
+    finally:
+        if own_client:
+            await client.close()
+
+    results: List[Optional[BoardResult]] = [None] * len(boards)
+    for g, group_results in zip(groups, grouped):
+        for i, result in zip(g, group_results):
+            results[i] = result
+    return results  # type: ignore[return-value]
+
+
+def generate_plans_llm_batch(boards: Sequence[ParsedEntities], **kwargs) -> List[BoardResult]:
+    """Blocking wrapper around generate_plans_llm_batch_async."""
+    return asyncio.run(generate_plans_llm_batch_async(boards, **kwargs))
@@ -1,15 +1,25 @@
 from __future__ import annotations
+import hashlib
+import json
 import os
-from typing import Optional
+import random
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, TimeoutError as FutureTimeout
+from dataclasses import dataclass, field
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+from core.cache import DiskCache
 from core.models import ParsedEntities, TestPlan
 from core.generator import generate_plan_offline
 
 try:
+    import openai  # type: ignore
     from openai import OpenAI  # type: ignore
 except Exception:
+    openai = None
     OpenAI = None  # library not installed; we'll fall back
 
-from nlp.prompting import SYSTEM_PROMPT, build_user_prompt
+from nlp.prompting import SYSTEM_PROMPT, PromptCompaction, compact_user_prompt
 
 try:
     from storage.vectorstore import search_context_for_entities
@@ -18,46 +28,345 @@ except ImportError:
     def search_context_for_entities(entities_text: str) -> str:
         return ""
 
+# Completions are cached on disk, keyed by everything that determines them.
+# LLM_CACHE=off disables the cache entirely.
+LLM_CACHE_DIR = os.getenv("LLM_CACHE_DIR", "out/llm_cache")
+LLM_CACHE_TTL = float(os.getenv("LLM_CACHE_TTL", str(7 * 24 * 3600)))  # seconds, 0 = never expire
+LLM_CACHE_MAX_ENTRIES = int(os.getenv("LLM_CACHE_MAX_ENTRIES", "2000"))
+LLM_CACHE_MAX_MB = float(os.getenv("LLM_CACHE_MAX_MB", "64"))
+
+# Latency budget per plan (retrieval + completion) and retry policy inside it
+LLM_BUDGET_S = float(os.getenv("LLM_BUDGET_S", "30"))
+LLM_MAX_RETRIES = int(os.getenv("LLM_MAX_RETRIES", "2"))
+LLM_BACKOFF_BASE_S = 0.5
+LLM_BACKOFF_CAP_S = 8.0
+LLM_MIN_ATTEMPT_S = 0.5  # not worth starting a request with less time left
+LLM_PROMPT_TOKENS = int(os.getenv("LLM_PROMPT_TOKENS", "3000"))  # user prompt budget, 0 = unlimited
+LLM_RETRIEVAL_WORKERS = int(os.getenv("LLM_RETRIEVAL_WORKERS", "4"))  # retrievals in flight, hung ones included
+
+_response_cache: Optional[DiskCache] = None
+_clients: Dict[Tuple[Optional[str], Optional[str]], Any] = {}
+_clients_lock = threading.Lock()
+_retrieval_pool: Optional[ThreadPoolExecutor] = None
+_retrieval_slots: Optional[threading.BoundedSemaphore] = None
+_retrieval_lock = threading.Lock()
+
+
+@dataclass
+class EnhancementReport:
+    """What happened to one LLM enhancement attempt."""
+    status: str = "skipped"  # "enhanced", "cached", "skipped" or "failed"
+    reason: Optional[str] = None
+    stages: Dict[str, float] = field(default_factory=dict)  # seconds per stage
+    attempts: int = 0
+    prompt_tokens: int = 0
+    trimmed_tokens: int = 0
+
+    @property
+    def enhanced(self) -> bool:
+        return self.status in ("enhanced", "cached")
+
+
+def _cache_enabled() -> bool:
+    return os.getenv("LLM_CACHE", "on").lower() not in ("0", "off", "false", "no")
+
+
+def get_response_cache() -> DiskCache:
+    global _response_cache
+    if _response_cache is None:
+        _response_cache = DiskCache(
+            os.path.join(LLM_CACHE_DIR, "responses.sqlite3"),
+            ttl=LLM_CACHE_TTL or None,
+            max_entries=LLM_CACHE_MAX_ENTRIES,
+            max_bytes=int(LLM_CACHE_MAX_MB * 1024 * 1024),
+        )
+    return _response_cache
+
+
+def active_response_cache(use_cache: bool = True) -> Optional[DiskCache]:
+    """The shared response cache, or None when disabled by argument or LLM_CACHE."""
+    return get_response_cache() if (use_cache and _cache_enabled()) else None
+
+
+def llm_cache_key(model: str, temperature: float, system_prompt: str, user_prompt: str) -> str:
+    payload = json.dumps(
+        {"model": model, "temperature": temperature, "system": system_prompt, "user": user_prompt},
+        sort_keys=True,
+        ensure_ascii=False,
+    )
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+def llm_cache_stats() -> Dict[str, Any]:
+    if not _cache_enabled():
+        return {"enabled": False}
+    return {"enabled": True, **get_response_cache().info()}
+
+
+def llm_settings() -> Dict[str, Any]:
+    return {
+        "model": os.getenv("OPENAI_MODEL", "gpt-4o-mini"),
+        "temperature": float(os.getenv("OPENAI_TEMPERATURE", "0.2")),
+    }
+
+
+def chat_messages(user_prompt: str) -> List[Dict[str, str]]:
+    return [
+        {"role": "system", "content": SYSTEM_PROMPT},
+        {"role": "user", "content": user_prompt}
+    ]
+
+
+def append_enhancements(plan: TestPlan, md: str) -> TestPlan:
+    plan.notes = (plan.notes or "") + "\n\nLLM Enhancements:\n" + md
+    return plan
+
+
+def prepare_enhancement_prompt(entities: ParsedEntities, budget_tokens: Optional[int] = None) -> PromptCompaction:
+    """Final user prompt (entities, RAG context and the ask), fitted to the token budget."""
+    # Get RAG context from library
+    entities_text = entities.model_dump_json()
+    context = search_context_for_entities(entities_text)
+    budget = LLM_PROMPT_TOKENS if budget_tokens is None else budget_tokens
+    return compact_user_prompt(entities, context, budget or None)
+
+
+def build_enhancement_prompt(entities: ParsedEntities) -> str:
+    return prepare_enhancement_prompt(entities).prompt
+
+
+def get_client(api_key: Optional[str] = None, base_url: Optional[str] = None):
+    """Shared sync client per (key, base URL) so connections are pooled across calls.
+
+    Retries are disabled here; generate_plan_llm_report retries within its budget.
+    """
+    api_key = api_key or os.getenv("OPENAI_API_KEY")
+    base_url = base_url or os.getenv("OPENAI_BASE_URL") or None
+    with _clients_lock:
+        client = _clients.get((api_key, base_url))
+        if client is None:
+            client = OpenAI(api_key=api_key, base_url=base_url, max_retries=0)
+            _clients[(api_key, base_url)] = client
+        return client
+
+
+def _is_retryable(exc: Exception) -> bool:
+    if openai is None:
+        return False
+    if isinstance(exc, (openai.APITimeoutError, openai.APIConnectionError, openai.RateLimitError)):
+        return True
+    return isinstance(exc, openai.APIStatusError) and exc.status_code >= 500
+
+
+def _backoff(attempt: int) -> float:
+    """Exponential backoff with full ±50 % jitter."""
+    return min(LLM_BACKOFF_CAP_S, LLM_BACKOFF_BASE_S * 2 ** attempt) * random.uniform(0.5, 1.5)
+
+
+def _retrieval_executor() -> Tuple[ThreadPoolExecutor, threading.BoundedSemaphore]:
+    """Shared retrieval pool, started on first use, and the slots bounding retrievals in flight."""
+    global _retrieval_pool, _retrieval_slots
+    with _retrieval_lock:
+        if _retrieval_pool is None:
+            workers = max(1, LLM_RETRIEVAL_WORKERS)
+            _retrieval_pool = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="rag-retrieval")
+            _retrieval_slots = threading.BoundedSemaphore(workers)
+        return _retrieval_pool, _retrieval_slots
+
+
+def _prompt_before(entities: ParsedEntities, deadline: float, report: EnhancementReport) -> Optional[str]:
+    """The enhancement prompt, or None if retrieval is still running at the deadline."""
+    # Retrieval can hang on a cold vector store; stop waiting at the deadline.
+    # A slot stays taken until the retrieval really ends, so once every
+    # worker is stuck new calls say so instead of queueing behind them.
+    pool, slots = _retrieval_executor()
+    if not slots.acquire(timeout=max(0.0, deadline - time.perf_counter())):
+        report.reason = f"all {LLM_RETRIEVAL_WORKERS} retrieval workers are still busy with earlier retrievals"
+        return None
+    try:
+        future = pool.submit(prepare_enhancement_prompt, entities)
+    except BaseException:
+        slots.release()
+        raise
+    future.add_done_callback(lambda _: slots.release())
+    try:
+        compaction = future.result(timeout=max(0.0, deadline - time.perf_counter()))
+    except FutureTimeout:
+        future.cancel()
+        return None
+    report.prompt_tokens = compaction.tokens_after
+    report.trimmed_tokens = compaction.trimmed_tokens
+    return compaction.prompt
+
+
+def generate_plan_llm_report(
+    entities: ParsedEntities,
+    budget_s: Optional[float] = None,
+    use_cache: bool = True,
+    refresh: bool = False,
+) -> Tuple[TestPlan, EnhancementReport]:
+    """Deterministic plan plus LLM notes, within a latency budget.
+
+    The budget covers retrieval and completion. When it runs out, or the
+    API fails for good, the offline plan is returned at once and the report
+    says why; per-stage latency is recorded in report.stages.
+    """
+    budget_s = LLM_BUDGET_S if budget_s is None else budget_s
+    report = EnhancementReport()
+    start = time.perf_counter()
+    deadline = start + budget_s
+
+    def stage(name: str, since: float) -> float:
+        now = time.perf_counter()
+        report.stages[name] = report.stages.get(name, 0.0) + (now - since)
+        return now
 
-def generate_plan_llm(entities: ParsedEntities) -> TestPlan:
-    """Generate base plan and enhance with LLM commentary."""
     base = generate_plan_offline(entities)  # keep deterministic steps
+    t = stage("offline", start)
     api_key = os.getenv("OPENAI_API_KEY")
     
-    try:
-        from openai import OpenAI
-    except Exception:
-        return base
+    if OpenAI is None or not api_key:
+        report.reason = "openai not installed" if OpenAI is None else "OPENAI_API_KEY not set"
+        stage("total", start)
+        return base, report
     
-    if not api_key:
-        return base
-
-    client = OpenAI(api_key=api_key)
-    model = os.getenv("OPENAI_MODEL", "gpt-4o-mini")
-    temperature = float(os.getenv("OPENAI_TEMPERATURE", "0.2"))
+    settings = llm_settings()
+    model, temperature = settings["model"], settings["temperature"]
 
     try:
-        # Get RAG context from library
-        entities_text = entities.model_dump_json()
-        context = search_context_for_entities(entities_text)
+        user_prompt = _prompt_before(entities, deadline, report)
+        t = stage("retrieval", t)
+        if user_prompt is None:
+            report.reason = report.reason or f"retrieval exceeded the {budget_s:g}s budget"
+            return base, report
         
-        # Build enhanced prompt with context
-        user_prompt = build_user_prompt(entities)
-        if context:
-            user_prompt += f"\n\nRelevant Context from Library:\n{context}"
-        user_prompt += "\n\nImprove clarity and add short safety/DFT notes. Keep it concise."
+        cache = active_response_cache(use_cache)
+        key = llm_cache_key(model, temperature, SYSTEM_PROMPT, user_prompt)
+        md = cache.get(key) if (cache is not None and not refresh) else None
+        t = stage("cache", t)
+        if md is not None:
+            report.status = "cached"
+            return append_enhancements(base, md), report
         
-        resp = client.chat.completions.create(
-            model=model,
-            messages=[
-                {"role": "system", "content": SYSTEM_PROMPT},
-                {"role": "user", "content": user_prompt}
-            ],
-            temperature=temperature,
-        )
+        client = get_client(api_key)
+        attempt = 0
+        while True:
+            remaining = deadline - time.perf_counter()
+            if remaining < LLM_MIN_ATTEMPT_S:
+                report.reason = f"budget of {budget_s:g}s exhausted after {report.attempts} attempt(s)"
+                return base, report
+            report.attempts += 1
+            try:
+                resp = client.chat.completions.create(
+                    model=model,
+                    messages=chat_messages(user_prompt),
+                    temperature=temperature,
+                    timeout=remaining,
+                )
+                break
+            except Exception as e:
+                t = stage("completion", t)
+                delay = _backoff(attempt)
+                attempt += 1
+                if not _is_retryable(e) or attempt > LLM_MAX_RETRIES or time.perf_counter() + delay + LLM_MIN_ATTEMPT_S > deadline:
+                    report.status, report.reason = "failed", f"{type(e).__name__}: {e}"
+                    return base, report
+                time.sleep(delay)
+                t = stage("backoff", t)
+        t = stage("completion", t)
+
         md = resp.choices[0].message.content or ""
-        base.notes = (base.notes or "") + "\n\nLLM Enhancements:\n" + md
-        return base
-    except Exception:
-        # Any error -> return base plan
-        return base
+        if cache is not None and md:
+            cache.put(key, md)
+        report.status = "enhanced"
+        return append_enhancements(base, md), report
+    except Exception as e:
+        # Any other error -> return base plan, but say why
+        report.status, report.reason = "failed", f"{type(e).__name__}: {e}"
+        return base, report
+    finally:
+        stage("total", start)
+
+
+def generate_plan_llm(entities: ParsedEntities, use_cache: bool = True, refresh: bool = False, budget_s: Optional[float] = None) -> TestPlan:
+    """Generate base plan and enhance with LLM commentary.
+
+    use_cache=False bypasses the response cache; refresh=True skips the
+    lookup but stores the fresh completion. See generate_plan_llm_report
+    for the latency budget and the reason enhancement was skipped.
+    """
+    plan, _ = generate_plan_llm_report(entities, budget_s=budget_s, use_cache=use_cache, refresh=refresh)
+    return plan
+
+
+def stream_enhancement(
+    entities: ParsedEntities,
+    report: Optional[EnhancementReport] = None,
+    budget_s: Optional[float] = None,
+    use_cache: bool = True,
+    refresh: bool = False,
+) -> Iterator[str]:
+    """Yield the LLM section text as tokens arrive.
+
+    Render generate_plan_offline(entities) first and append what this yields.
+    Pass a report to learn whether (and why not) the section was produced;
+    a stream that overruns the budget stops where it is. Completed
+    responses go into the same cache as generate_plan_llm.
+    """
+    report = report if report is not None else EnhancementReport()
+    budget_s = LLM_BUDGET_S if budget_s is None else budget_s
+    start = time.perf_counter()
+    deadline = start + budget_s
+    api_key = os.getenv("OPENAI_API_KEY")
+    if OpenAI is None or not api_key:
+        report.reason = "openai not installed" if OpenAI is None else "OPENAI_API_KEY not set"
+        return
+
+    settings = llm_settings()
+    stream = None
+    try:
+        user_prompt = _prompt_before(entities, deadline, report)
+        report.stages["retrieval"] = time.perf_counter() - start
+        if user_prompt is None:
+            report.reason = report.reason or f"retrieval exceeded the {budget_s:g}s budget"
+            return
+
+        cache = active_response_cache(use_cache)
+        key = llm_cache_key(settings["model"], settings["temperature"], SYSTEM_PROMPT, user_prompt)
+        md = cache.get(key) if (cache is not None and not refresh) else None
+        if md is not None:
+            report.status = "cached"
+            yield md
+            return
+
+        sent = time.perf_counter()
+        report.attempts += 1
+        stream = get_client(api_key).chat.completions.create(
+            model=settings["model"],
+            messages=chat_messages(user_prompt),
+            temperature=settings["temperature"],
+            timeout=max(0.0, deadline - sent),
+            stream=True,
+        )
+        parts: List[str] = []
+        for chunk in stream:
+            if "first_token" not in report.stages:
+                report.stages["first_token"] = time.perf_counter() - sent
+            delta = chunk.choices[0].delta.content if chunk.choices else None
+            if delta:
+                parts.append(delta)
+                yield delta
+            if time.perf_counter() > deadline:
+                report.status, report.reason = "failed", f"stream exceeded the {budget_s:g}s budget"
+                return
+        report.stages["completion"] = time.perf_counter() - sent
+        md = "".join(parts)
+        if cache is not None and md:
+            cache.put(key, md)
+        report.status = "enhanced"
+    except Exception as e:
+        report.status, report.reason = "failed", f"{type(e).__name__}: {e}"
+    finally:
+        if stream is not None:
+            stream.close()
+        report.stages["total"] = time.perf_counter() - start
@@ -1,4 +1,7 @@
 from __future__ import annotations
+import re
+from dataclasses import dataclass
+from typing import Dict, List, Optional, Tuple
 from core.models import ParsedEntities
 
 SYSTEM_PROMPT = (
@@ -6,6 +9,15 @@ SYSTEM_PROMPT = (
     "procedure. Include setup, equipment, expected values (with tolerances), and clear pass/fail criteria."
 )
 
+ENHANCE_INSTRUCTION = "Improve clarity and add short safety/DFT notes. Keep it concise."
+
+OUTPUT_INSTRUCTION = (
+    "\nOutput a Markdown document with sections: Setup, Visual Inspection, Voltage Rail Checks, "
+    "Oscillator Checks, Firmware Programming, Functional Tests, and short Notes."
+)
+
+MAX_NAMES_PER_GROUP = 8  # names quoted per grouped rail/oscillator line once compacted
+
 
 def build_user_prompt(entities: ParsedEntities) -> str:
     lines = [
@@ -22,8 +34,161 @@ def build_user_prompt(entities: ParsedEntities) -> str:
     for t in entities.functional_tests:
         lines.append(f"  - {t.name}: cmd={t.command}")
 
-    lines.append(
-        "\nOutput a Markdown document with sections: Setup, Visual Inspection, Voltage Rail Checks, "
-        "Oscillator Checks, Firmware Programming, Functional Tests, and short Notes."
-    )
+    lines.append(OUTPUT_INSTRUCTION)
     return "\n".join(lines)
+
+
+# Rough BPE-like pieces: short letter runs, up to 3 digits, single symbols.
+_TOKEN_PIECES = re.compile(r"[A-Za-z]{1,6}|\d{1,3}|[^\sA-Za-z\d]")
+
+
+def estimate_tokens(text: str) -> int:
+    """Fast local token estimate; errs on the high side for symbol-heavy text."""
+    return len(_TOKEN_PIECES.findall(text))
+
+
+@dataclass
+class PromptCompaction:
+    prompt: str
+    budget: Optional[int]
+    tokens_before: int
+    tokens_after: int
+    rails_in: int = 0
+    rail_lines: int = 0
+    tests_in: int = 0
+    tests_deduped: int = 0
+    snippets_in: int = 0
+    snippets_kept: int = 0
+    truncated_lines: int = 0
+
+    @property
+    def compacted(self) -> bool:
+        return self.tokens_after < self.tokens_before
+
+    @property
+    def trimmed_tokens(self) -> int:
+        return self.tokens_before - self.tokens_after
+
+
+def _assemble(entity_text: str, context: str, instruction: str) -> str:
+    prompt = entity_text
+    if context:
+        prompt += f"\n\nRelevant Context from Library:\n{context}"
+    if instruction:
+        prompt += f"\n\n{instruction}"
+    return prompt
+
+
+def _names(names: List[str]) -> str:
+    shown = ", ".join(names[:MAX_NAMES_PER_GROUP])
+    extra = len(names) - MAX_NAMES_PER_GROUP
+    return shown + (f", … (+{extra})" if extra > 0 else "")
+
+
+def _test_key(name: str, command: Optional[str]) -> Tuple[str, str]:
+    """Tests that differ only in case, digits or punctuation are treated as one."""
+    return re.sub(r"[^a-z]", "", name.lower()), re.sub(r"[^a-z.]", "", (command or "").lower())
+
+
+def _compact_entity_lines(entities: ParsedEntities, report: Optional[PromptCompaction] = None) -> List[str]:
+    rail_groups: Dict[Tuple[float, int], List[str]] = {}
+    for r in entities.rails:
+        rail_groups.setdefault((r.voltage, r.tolerance_mv), []).append(r.name)
+    osc_groups: Dict[Tuple[float, int], List[str]] = {}
+    for o in entities.oscillators:
+        osc_groups.setdefault((o.frequency_hz, o.tolerance_hz), []).append(o.ref)
+    tests: Dict[Tuple[str, str], List] = {}
+    for t in entities.functional_tests:
+        tests.setdefault(_test_key(t.name, t.command), []).append(t)
+
+    lines = ["Parsed Entities:", f"- title: {entities.title}", "- rails (grouped by voltage):"]
+    for (volts, tol), names in rail_groups.items():
+        count = f" ({len(names)} rails)" if len(names) > 1 else ""
+        lines.append(f"  - {volts} V ±{tol} mV{count}: {_names(names)}")
+    lines.append("- oscillators:")
+    for (freq, tol), refs in osc_groups.items():
+        lines.append(f"  - {_names(refs)}: {freq} Hz ±{tol} Hz")
+    lines.append("- functional_tests:")
+    for group in tests.values():
+        t = group[0]
+        dup = f" (×{len(group)})" if len(group) > 1 else ""
+        lines.append(f"  - {t.name}: cmd={t.command}{dup}")
+
+    if report is not None:
+        report.rails_in = len(entities.rails)
+        report.rail_lines = len(rail_groups)
+        report.tests_in = len(entities.functional_tests)
+        report.tests_deduped = len(entities.functional_tests) - len(tests)
+    return lines
+
+
+def compact_entity_summary(entities: ParsedEntities) -> str:
+    """Grouped, de-duplicated entity listing without the output instructions."""
+    return "\n".join(_compact_entity_lines(entities)[1:])
+
+
+def _rank_snippets(snippets: List[str], entities: ParsedEntities) -> List[str]:
+    """Order snippets by density of entity terms; exact repeats are dropped."""
+    terms = set()
+    for r in entities.rails:
+        terms.add(r.name.upper())
+    for o in entities.oscillators:
+        terms.add(o.ref.upper())
+    for t in entities.functional_tests:
+        terms.update(w.upper() for w in re.findall(r"[A-Za-z0-9_.+]{2,}", f"{t.name} {t.command or ''}"))
+    unique = list(dict.fromkeys(s for s in snippets if s.strip()))
+
+    def score(item: Tuple[int, str]) -> Tuple[float, int]:
+        idx, snippet = item
+        words = set(re.findall(r"[A-Za-z0-9_.+]{2,}", snippet.upper()))
+        hits = len(words & terms)
+        return (-hits / max(1, estimate_tokens(snippet)) ** 0.5, idx)
+
+    return [s for _, s in sorted(enumerate(unique), key=score)]
+
+
+def compact_user_prompt(
+    entities: ParsedEntities,
+    context: str = "",
+    budget_tokens: Optional[int] = None,
+    instruction: str = ENHANCE_INSTRUCTION,
+) -> PromptCompaction:
+    """Full prompt when it fits the budget, otherwise a compacted one.
+
+    Stages, applied only until the prompt fits: group rails and oscillators
+    by value and merge near-identical tests; keep the highest-ranked RAG
+    snippets that still fit; finally cut entity lines from the end.
+    """
+    full = _assemble(build_user_prompt(entities), context, instruction)
+    before = estimate_tokens(full)
+    report = PromptCompaction(prompt=full, budget=budget_tokens, tokens_before=before, tokens_after=before)
+    snippets = context.splitlines() if context else []
+    report.snippets_in = report.snippets_kept = len(snippets)
+    if budget_tokens is None or before <= budget_tokens:
+        return report
+
+    lines = _compact_entity_lines(entities, report) + [OUTPUT_INSTRUCTION]
+    entity_text = "\n".join(lines)
+    fixed = estimate_tokens(entity_text) + estimate_tokens(instruction) + 16  # headers and separators
+
+    # Cut entity lines from the end (keeping the output instruction) if they alone overflow
+    while fixed > budget_tokens and len(lines) > 4:
+        dropped = lines.pop(-2)
+        report.truncated_lines += 1
+        fixed -= estimate_tokens(dropped)
+    if report.truncated_lines:
+        lines.insert(-1, f"  - … {report.truncated_lines} more entries omitted for length")
+        entity_text = "\n".join(lines)
+
+    kept: List[str] = []
+    room = budget_tokens - fixed
+    for snippet in _rank_snippets(snippets, entities):
+        cost = estimate_tokens(snippet) + 1
+        if cost <= room:
+            kept.append(snippet)
+            room -= cost
+    report.snippets_kept = len(kept)
+
+    report.prompt = _assemble(entity_text, "\n".join(kept), instruction)
+    report.tokens_after = estimate_tokens(report.prompt)
+    return report
@@ -12,9 +12,9 @@ from pathlib import Path
 project_root = Path(__file__).parent
 sys.path.insert(0, str(project_root))
 
-from ingest.netlist_parser import parse_netlist, extract_test_points
+from ingest.netlist_parser import load_netlist, extract_test_points
 from core.generator import generate_plan_offline
-from rules.validator import validate_entities, annotate_plan
+from rules.validator import validate_entities, validate_against_netlist, annotate_plan
 
 def main():
     if len(sys.argv) < 2:
@@ -29,7 +29,7 @@ def main():
     
     try:
         # Parse the netlist
-        entities = parse_netlist(netlist_file)
+        entities, netlist = load_netlist(netlist_file)
         print(f"📋 Extracted entities:")
         print(f"   - Title: {entities.title}")
         print(f"   - Power rails: {len(entities.rails)}")
@@ -50,7 +50,7 @@ def main():
                 print(f"     ... and {len(test_points) - 5} more")
         
         # Generate test plan
-        issues = validate_entities(entities)
+        issues = validate_entities(entities) + validate_against_netlist(entities, netlist)
         plan = generate_plan_offline(entities)
         plan = annotate_plan(plan, issues)
         
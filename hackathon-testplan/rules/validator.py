@@ -1,21 +1,332 @@
 from __future__ import annotations
-from typing import List
+import heapq
+import time
+from dataclasses import dataclass, field
+from functools import cached_property
+from typing import Callable, Dict, Iterable, List, Optional, Tuple
 from core.models import ParsedEntities, TestPlan
+from ingest.netlist_parser import NetlistIndex, looks_like_power_net
 
+# Plausibility limits used by the rules below
+MAX_RAIL_VOLTAGE = 60.0   # above SELV; almost certainly a parse error on a bring-up board
+MAX_RAIL_TOLERANCE_RATIO = 0.5  # window wider than ±50 % of nominal
+MAX_OSC_PPM = 10_000      # looser than 1 % cannot catch a wrong-frequency part
+MIN_OSC_PPM = 1           # tighter than a bench scope can resolve
+MAX_SIGNAL_FANOUT = 64    # signal nets wider than this are usually misnamed power nets
+MAX_LISTED_NETS = 10      # cap on net names quoted in one aggregated issue
 
-def validate_entities(ent: ParsedEntities) -> List[str]:
+
+class EntityIndex:
+    """Lookup tables shared by all rules, built lazily and at most once per run."""
+
+    def __init__(self, ent: ParsedEntities):
+        self.ent = ent
+
+    @cached_property
+    def rails_by_key(self) -> Dict[Tuple[str, float], List[int]]:
+        out: Dict[Tuple[str, float], List[int]] = {}
+        for i, r in enumerate(self.ent.rails):
+            out.setdefault((r.name.lower(), round(r.voltage, 3)), []).append(i)
+        return out
+
+    @cached_property
+    def rails_by_name(self) -> Dict[str, List[int]]:
+        out: Dict[str, List[int]] = {}
+        for i, r in enumerate(self.ent.rails):
+            out.setdefault(r.name.lower(), []).append(i)
+        return out
+
+    @cached_property
+    def rail_windows(self) -> List[Tuple[float, float, int]]:
+        """(low, high, rail index) sorted by low edge, in volts."""
+        return sorted(
+            (r.voltage - r.tolerance_mv / 1000, r.voltage + r.tolerance_mv / 1000, i)
+            for i, r in enumerate(self.ent.rails)
+        )
+
+    @cached_property
+    def oscillators_by_ref(self) -> Dict[str, List[int]]:
+        out: Dict[str, List[int]] = {}
+        for i, o in enumerate(self.ent.oscillators):
+            out.setdefault(o.ref.upper(), []).append(i)
+        return out
+
+    @cached_property
+    def tests_by_name(self) -> Dict[str, List[int]]:
+        out: Dict[str, List[int]] = {}
+        for i, t in enumerate(self.ent.functional_tests):
+            out.setdefault(t.name.strip().lower(), []).append(i)
+        return out
+
+
+Rule = Callable[[EntityIndex], List[str]]
+
+# Registration order is report order
+RULES: Dict[str, Rule] = {}
+
+
+def rule(name: str) -> Callable[[Rule], Rule]:
+    """Register a validation rule; rules take an EntityIndex and return issue strings."""
+    def register(fn: Rule) -> Rule:
+        RULES[name] = fn
+        return fn
+    return register
+
+
+@dataclass
+class ValidationReport:
+    issues: List[str] = field(default_factory=list)
+    by_rule: Dict[str, List[str]] = field(default_factory=dict)
+    timings: Dict[str, float] = field(default_factory=dict)  # seconds per rule
+
+
+def _extras(groups: Iterable[List[int]]) -> List[int]:
+    """Indexes of every entry after the first in each group, in input order."""
+    return sorted(i for idxs in groups if len(idxs) > 1 for i in idxs[1:])
+
+
+@rule("no_rails")
+def _no_rails(ix: EntityIndex) -> List[str]:
+    return [] if ix.ent.rails else ["No rails found; add at least one power rail."]
+
+
+@rule("duplicate_rails")
+def _duplicate_rails(ix: EntityIndex) -> List[str]:
+    rails = ix.ent.rails
+    return [f"Duplicate rail entry: {rails[i].name} {rails[i].voltage}V" for i in _extras(ix.rails_by_key.values())]
+
+
+@rule("conflicting_rail_voltages")
+def _conflicting_rail_voltages(ix: EntityIndex) -> List[str]:
+    issues = []
+    for idxs in ix.rails_by_name.values():
+        volts = sorted({round(ix.ent.rails[i].voltage, 3) for i in idxs})
+        if len(volts) > 1:
+            name = ix.ent.rails[idxs[0]].name
+            issues.append(f"Rail {name} listed with conflicting voltages: {', '.join(f'{v:g}V' for v in volts)}")
+    return issues
+
+
+@rule("implausible_rail_voltage")
+def _implausible_rail_voltage(ix: EntityIndex) -> List[str]:
+    return [
+        f"Rail {r.name} voltage {r.voltage}V is implausible (expected 0 < |V| ≤ {MAX_RAIL_VOLTAGE:g}V)"
+        for r in ix.ent.rails
+        if r.voltage == 0 or abs(r.voltage) > MAX_RAIL_VOLTAGE
+    ]
+
+
+@rule("rail_tolerance")
+def _rail_tolerance(ix: EntityIndex) -> List[str]:
+    issues = []
+    for r in ix.ent.rails:
+        if r.tolerance_mv <= 0:
+            issues.append(f"Rail {r.name} has no tolerance window (±{r.tolerance_mv} mV)")
+        elif r.voltage and r.tolerance_mv / 1000 >= abs(r.voltage) * MAX_RAIL_TOLERANCE_RATIO:
+            issues.append(f"Rail {r.name} tolerance ±{r.tolerance_mv} mV is wider than {MAX_RAIL_TOLERANCE_RATIO:.0%} of {r.voltage}V")
+    return issues
+
+
+@rule("overlapping_rail_windows")
+def _overlapping_rail_windows(ix: EntityIndex) -> List[str]:
+    # One sweep over windows sorted by low edge groups them into clusters of
+    # chained overlaps; each cluster is reported once, so the rule stays
+    # O(n log n) even when thousands of rails share a voltage.
+    rails = ix.ent.rails
+    clusters: List[List[Tuple[float, float, int]]] = []
+    reach = 0.0
+    for lo, hi, i in ix.rail_windows:
+        if not clusters or lo > reach:
+            clusters.append([])
+            reach = hi
+        clusters[-1].append((lo, hi, i))
+        reach = max(reach, hi)
+    return [issue for issue in (_overlap_issue(c, rails) for c in clusters) if issue]
+
+
+def _overlap_issue(cluster: List[Tuple[float, float, int]], rails) -> Optional[str]:
+    """One issue for a cluster of overlapping windows, or None if they all belong to one rail name."""
+    names = list({rails[i].name.lower(): rails[i].name for _, _, i in cluster}.values())
+    if len(names) < 2:
+        return None
+    # Points covered by at least two windows lie between the second-lowest
+    # low edge and the second-highest high edge
+    lo = heapq.nsmallest(2, (w[0] for w in cluster))[1]
+    hi = heapq.nlargest(2, (w[1] for w in cluster))[1]
+    shown = " and ".join(names) if len(names) == 2 else _net_list(names)
+    return (f"Rails {shown} have overlapping tolerance windows ({lo:.2f}–{hi:.2f} V); "
+            f"confirm test points so readings cannot be swapped")
+
+
+@rule("oscillator_frequency")
+def _oscillator_frequency(ix: EntityIndex) -> List[str]:
+    return [f"Oscillator {o.ref} has non-positive frequency {o.frequency_hz} Hz" for o in ix.ent.oscillators if o.frequency_hz <= 0]
+
+
+@rule("oscillator_ppm")
+def _oscillator_ppm(ix: EntityIndex) -> List[str]:
     issues = []
-    if not ent.rails:
-        issues.append("No rails found; add at least one power rail.")
-    seen = set()
-    for r in ent.rails:
-        key = (r.name.lower(), round(r.voltage, 3))
-        if key in seen:
-            issues.append(f"Duplicate rail entry: {r.name} {r.voltage}V")
-        seen.add(key)
+    for o in ix.ent.oscillators:
+        if o.frequency_hz <= 0:
+            continue
+        ppm = o.tolerance_hz / o.frequency_hz * 1e6
+        if ppm > MAX_OSC_PPM:
+            issues.append(f"Oscillator {o.ref} tolerance ±{o.tolerance_hz} Hz is {ppm:,.0f} ppm; too loose to catch a wrong-frequency part")
+        elif ppm < MIN_OSC_PPM:
+            issues.append(f"Oscillator {o.ref} tolerance ±{o.tolerance_hz} Hz is {ppm:.2f} ppm; tighter than bench equipment can verify")
     return issues
 
 
+@rule("duplicate_oscillators")
+def _duplicate_oscillators(ix: EntityIndex) -> List[str]:
+    oscs = ix.ent.oscillators
+    return [f"Duplicate oscillator entry: {oscs[i].ref}" for i in _extras(ix.oscillators_by_ref.values())]
+
+
+@rule("functional_test_command")
+def _functional_test_command(ix: EntityIndex) -> List[str]:
+    return [
+        f"Functional test '{t.name}' has no command; the operator has no way to run it"
+        for t in ix.ent.functional_tests
+        if not (t.command or "").strip()
+    ]
+
+
+@rule("duplicate_functional_tests")
+def _duplicate_functional_tests(ix: EntityIndex) -> List[str]:
+    tests = ix.ent.functional_tests
+    return [f"Duplicate functional test: {tests[i].name}" for i in _extras(ix.tests_by_name.values())]
+
+
+def _timed(name: str, fn: Rule, ix: EntityIndex) -> Tuple[List[str], float]:
+    start = time.perf_counter()
+    issues = fn(ix)
+    return issues, time.perf_counter() - start
+
+
+def run_rules(ent: ParsedEntities, rules: Optional[Iterable[str]] = None) -> ValidationReport:
+    """Run the selected rules (default: all registered) and time each one.
+
+    Rules run one after another: each is a single pass over shared indexes,
+    and pure-Python rules gain nothing from threads (bench/bench_rules.py).
+    Issue order is registration order.
+    """
+    names = list(rules) if rules is not None else list(RULES)
+    unknown = [n for n in names if n not in RULES]
+    if unknown:
+        raise KeyError(f"Unknown validation rule(s): {', '.join(unknown)}")
+
+    ix = EntityIndex(ent)
+    report = ValidationReport()
+    for name in names:
+        issues, elapsed = _timed(name, RULES[name], ix)
+        report.by_rule[name] = issues
+        report.timings[name] = elapsed
+        report.issues.extend(issues)
+    return report
+
+
+NetlistRule = Callable[[EntityIndex, NetlistIndex], List[str]]
+
+# Rules that need connectivity; each makes a single pass over rails or nets
+NETLIST_RULES: Dict[str, NetlistRule] = {}
+
+
+def netlist_rule(name: str) -> Callable[[NetlistRule], NetlistRule]:
+    def register(fn: NetlistRule) -> NetlistRule:
+        NETLIST_RULES[name] = fn
+        return fn
+    return register
+
+
+def _net_list(names: List[str]) -> str:
+    shown = ", ".join(names[:MAX_LISTED_NETS])
+    return shown + (f" … (+{len(names) - MAX_LISTED_NETS} more)" if len(names) > MAX_LISTED_NETS else "")
+
+
+@netlist_rule("rail_loads")
+def _rail_loads(ix: EntityIndex, net: NetlistIndex) -> List[str]:
+    issues = []
+    for r in ix.ent.rails:
+        pins = net.pin_count(r.name)
+        if pins == 0:
+            issues.append(f"Rail {r.name} does not appear in the netlist")
+        elif pins == 1:
+            issues.append(f"Rail {r.name} connects only one pin; it has no loads")
+    return issues
+
+
+@netlist_rule("rail_test_points")
+def _rail_test_points(ix: EntityIndex, net: NetlistIndex) -> List[str]:
+    return [
+        f"Rail {r.name} has no test point (TP*) on its net"
+        for r in ix.ent.rails
+        if net.pin_count(r.name) and not any(ref.upper().startswith("TP") for ref in net.refs_on(r.name))
+    ]
+
+
+def _is_ic(ref: str) -> bool:
+    return ref.upper().startswith(("U", "IC"))
+
+
+@netlist_rule("crystal_connectivity")
+def _crystal_connectivity(ix: EntityIndex, net: NetlistIndex) -> List[str]:
+    issues = []
+    for o in ix.ent.oscillators:
+        if o.ref in net.nets_by_ref:
+            # Crystal as a component: look for an IC on any of its non-ground nets
+            nets = [n for n in net.nets_by_ref[o.ref] if "GND" not in n.upper()]
+            refs = {ref for n in nets for ref in net.refs_on(n)}
+        elif o.ref in net.nets:
+            refs = net.refs_on(o.ref)
+        else:
+            issues.append(f"Oscillator {o.ref} does not appear in the netlist")
+            continue
+        if not any(_is_ic(ref) for ref in refs if ref != o.ref):
+            issues.append(f"Oscillator {o.ref} is not connected to any IC")
+    return issues
+
+
+@netlist_rule("orphan_nets")
+def _orphan_nets(ix: EntityIndex, net: NetlistIndex) -> List[str]:
+    names = [n for n, pins in net.nets.items() if len(pins) == 1 and not looks_like_power_net(n)]
+    return [f"{len(names)} orphan net(s) connect only one pin: {_net_list(names)}"] if names else []
+
+
+@netlist_rule("signal_fanout")
+def _signal_fanout(ix: EntityIndex, net: NetlistIndex) -> List[str]:
+    return [
+        f"Net {n} fans out to {len(pins)} pins; check whether it is an unnamed power net"
+        for n, pins in net.nets.items()
+        if len(pins) > MAX_SIGNAL_FANOUT and "GND" not in n.upper() and not looks_like_power_net(n)
+    ]
+
+
+def run_netlist_rules(ent: ParsedEntities, netlist: NetlistIndex, rules: Optional[Iterable[str]] = None) -> ValidationReport:
+    """Cross-check entities against netlist connectivity; linear in pins."""
+    names = list(rules) if rules is not None else list(NETLIST_RULES)
+    unknown = [n for n in names if n not in NETLIST_RULES]
+    if unknown:
+        raise KeyError(f"Unknown netlist rule(s): {', '.join(unknown)}")
+    ix = EntityIndex(ent)
+    report = ValidationReport()
+    for name in names:
+        start = time.perf_counter()
+        issues = NETLIST_RULES[name](ix, netlist)
+        report.timings[name] = time.perf_counter() - start
+        report.by_rule[name] = issues
+        report.issues.extend(issues)
+    return report
+
+
+def validate_against_netlist(ent: ParsedEntities, netlist: NetlistIndex) -> List[str]:
+    return run_netlist_rules(ent, netlist).issues
+
+
+def validate_entities(ent: ParsedEntities) -> List[str]:
+    return run_rules(ent).issues
+
+
 def annotate_plan(plan: TestPlan, issues: List[str]) -> TestPlan:
     if not issues:
         return plan
@@ -0,0 +1,134 @@
+"""
+Split design documents into retrieval-sized chunks
+
+Documents are cut at section headings first, then each section is cut into
+overlapping windows of whitespace-delimited tokens. Chunk ids are the SHA1 of
+the chunk text, so repeated boilerplate (headers, legal notices, identical
+sections across datasheet revisions) is stored once. Its "sources" metadata
+lists every document the text came from; name, doc_id and section describe
+the first of them.
+"""
+import hashlib
+import json
+import re
+from dataclasses import dataclass, field
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+CHUNK_TOKENS = 200
+CHUNK_OVERLAP = 40
+
+# Markdown headings, numbered headings ("3.2 Power Supply") and short ALL-CAPS lines
+_HEADING = re.compile(
+    r"^(?:#{1,6}\s+\S.*|\d+(?:\.\d+)*\.?\s+[A-Z][^\n]{0,80}|[A-Z][A-Z0-9 /&\-]{3,60})\s*$",
+    re.MULTILINE,
+)
+_TOKEN = re.compile(r"\S+")
+
+
+@dataclass
+class Chunk:
+    id: str
+    text: str
+    meta: Dict[str, Any] = field(default_factory=dict)
+
+
+def chunk_id(text: str) -> str:
+    return hashlib.sha1(text.encode("utf-8")).hexdigest()
+
+
+def split_sections(text: str) -> List[Tuple[str, str]]:
+    """(heading, body) pairs in document order; text before the first heading has heading ""."""
+    sections = []
+    starts = [(m.start(), m.group(0).strip().lstrip("#").strip()) for m in _HEADING.finditer(text)]
+    prev_pos, prev_title = 0, ""
+    for pos, title in starts:
+        body = text[prev_pos:pos]
+        if body.strip():
+            sections.append((prev_title, body))
+        prev_pos, prev_title = pos, title
+    body = text[prev_pos:]
+    if body.strip():
+        sections.append((prev_title, body))
+    return sections
+
+
+def token_windows(text: str, max_tokens: int = CHUNK_TOKENS, overlap: int = CHUNK_OVERLAP) -> Iterator[str]:
+    """Overlapping windows of at most max_tokens tokens, sliced from the original text."""
+    if overlap >= max_tokens:
+        raise ValueError("overlap must be smaller than max_tokens")
+    spans = [m.span() for m in _TOKEN.finditer(text)]
+    step = max_tokens - overlap
+    for start in range(0, len(spans), step):
+        window = spans[start:start + max_tokens]
+        yield text[window[0][0]:window[-1][1]]
+        if start + max_tokens >= len(spans):
+            break
+
+
+def chunk_document(
+    name: str,
+    text: str,
+    meta: Optional[Dict[str, Any]] = None,
+    max_tokens: int = CHUNK_TOKENS,
+    overlap: int = CHUNK_OVERLAP,
+) -> List[Chunk]:
+    """Section-aware chunks of one document, duplicates within it removed."""
+    doc_id = chunk_id(text)
+    chunks: List[Chunk] = []
+    seen = set()
+    for section, body in split_sections(text):
+        for piece in token_windows(body, max_tokens, overlap):
+            cid = chunk_id(piece)
+            if cid in seen:
+                continue
+            seen.add(cid)
+            chunk_meta = {"name": name, "type": "design_doc", "doc_id": doc_id, "section": section[:120], "chunk": len(chunks)}
+            if meta:
+                chunk_meta.update(meta)
+            chunk_meta["sources"] = json.dumps([_source(chunk_meta)])
+            chunks.append(Chunk(cid, piece, chunk_meta))
+    return chunks
+
+
+_SOURCE_FIELDS = ("name", "doc_id", "section", "path")
+
+
+def _source(meta: Dict[str, Any]) -> Dict[str, Any]:
+    return {k: meta[k] for k in _SOURCE_FIELDS if k in meta}
+
+
+def source_key(source: Dict[str, Any]) -> str:
+    """What identifies a document among a chunk's sources: its path if synced, else its name."""
+    return str(source.get("path") or source.get("name", ""))
+
+
+def chunk_sources(meta: Dict[str, Any]) -> List[Dict[str, Any]]:
+    """The documents a stored chunk came from (chunks written before sources were kept have one)."""
+    try:
+        return json.loads(meta["sources"])
+    except (KeyError, TypeError, ValueError):
+        return [_source(meta)]
+
+
+def _with_sources(meta: Dict[str, Any], sources: List[Dict[str, Any]]) -> Dict[str, Any]:
+    out = {k: v for k, v in meta.items() if k not in _SOURCE_FIELDS}
+    out.update(sources[0])
+    out["sources"] = json.dumps(sources)
+    return out
+
+
+def merge_sources(meta: Dict[str, Any], other: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+    """meta with other's sources added, or None if it already lists them all."""
+    sources = chunk_sources(meta)
+    keys = {source_key(s) for s in sources}
+    new = [s for s in chunk_sources(other) if source_key(s) not in keys]
+    return _with_sources(meta, sources + new) if new else None
+
+
+def drop_source(meta: Dict[str, Any], key: str) -> Tuple[bool, Optional[Dict[str, Any]]]:
+    """(whether key was a source, meta without it or None once no source is left)."""
+    sources = chunk_sources(meta)
+    kept = [s for s in sources if source_key(s) != key]
+    if len(kept) == len(sources):
+        return False, meta
+    return True, _with_sources(meta, kept) if kept else None
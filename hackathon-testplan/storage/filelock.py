@@ -0,0 +1,75 @@
+"""
+Inter-process write lock for the library directory
+
+An exclusive advisory lock on a file (flock on POSIX, msvcrt on Windows),
+combined with a thread lock so threads of one process queue up as well.
+Only writers take it; readers never wait on it.
+"""
+import os
+import threading
+import time
+from pathlib import Path
+from typing import Optional
+
+try:
+    import fcntl
+except ImportError:  # Windows
+    fcntl = None
+    import msvcrt
+
+
+class FileLock:
+    def __init__(self, path: Path, timeout: Optional[float] = 60.0, poll: float = 0.01):
+        self.path = Path(path)
+        self.timeout = timeout
+        self.poll = poll
+        self._thread_lock = threading.Lock()
+        self._fd: Optional[int] = None
+        self.waited = 0.0  # total seconds spent waiting, for diagnostics
+
+    def _try_lock(self, fd: int) -> bool:
+        try:
+            if fcntl is not None:
+                fcntl.flock(fd, fcntl.LOCK_EX | fcntl.LOCK_NB)
+            else:
+                msvcrt.locking(fd, msvcrt.LK_NBLCK, 1)
+            return True
+        except OSError:
+            return False
+
+    def acquire(self) -> None:
+        start = time.perf_counter()
+        if not self._thread_lock.acquire(timeout=-1 if self.timeout is None else self.timeout):
+            raise TimeoutError(f"Timed out waiting for {self.path}")
+        try:
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            fd = os.open(self.path, os.O_RDWR | os.O_CREAT, 0o644)
+            while not self._try_lock(fd):
+                if self.timeout is not None and time.perf_counter() - start > self.timeout:
+                    os.close(fd)
+                    raise TimeoutError(f"Timed out waiting for {self.path}")
+                time.sleep(self.poll)
+            self._fd = fd
+            self.waited += time.perf_counter() - start
+        except BaseException:
+            self._thread_lock.release()
+            raise
+
+    def release(self) -> None:
+        fd, self._fd = self._fd, None
+        if fd is not None:
+            try:
+                if fcntl is not None:
+                    fcntl.flock(fd, fcntl.LOCK_UN)
+                else:
+                    msvcrt.locking(fd, msvcrt.LK_UNLCK, 1)
+            finally:
+                os.close(fd)
+        self._thread_lock.release()
+
+    def __enter__(self) -> "FileLock":
+        self.acquire()
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.release()
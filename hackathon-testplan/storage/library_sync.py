@@ -0,0 +1,224 @@
+"""
+Incremental sync of a directory of design documents into the library
+
+Files are extracted and chunked in a process pool. A manifest maps each
+file's absolute path to its content hash and chunk ids, so a re-run only
+touches new or changed files, and files that disappeared are pruned.
+Chunks are shared between documents (ids are content hashes), so pruning
+only removes a file from its chunks' sources; a chunk is deleted once no
+document, synced or added with add_doc, lists it any more.
+"""
+import hashlib
+import json
+import os
+import time
+from concurrent.futures import Future, ProcessPoolExecutor, as_completed
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from ingest.doc_text import LIBRARY_SUFFIXES, extract_document_text
+from storage.chunking import CHUNK_OVERLAP, CHUNK_TOKENS, Chunk, chunk_document
+from storage.vectorstore import MANIFEST_NAME, UPSERT_BATCH, IngestStats, VectorStore, get_store
+
+ProgressFn = Callable[[int, int, str], None]
+
+
+@dataclass
+class SyncStats:
+    scanned: int = 0
+    unchanged: int = 0
+    added: int = 0
+    updated: int = 0
+    removed: int = 0
+    failed: int = 0
+    bytes_read: int = 0
+    chunks_deleted: int = 0
+    seconds: float = 0.0
+    ingest: IngestStats = field(default_factory=IngestStats)
+    errors: List[str] = field(default_factory=list)
+
+    @property
+    def files_per_s(self) -> float:
+        processed = self.added + self.updated + self.unchanged + self.failed
+        return processed / self.seconds if self.seconds > 0 else 0.0
+
+    @property
+    def mb_per_s(self) -> float:
+        return self.bytes_read / 1e6 / self.seconds if self.seconds > 0 else 0.0
+
+    def summary(self) -> str:
+        return (f"{self.scanned} files: {self.added} added, {self.updated} updated, {self.unchanged} unchanged, "
+                f"{self.removed} removed, {self.failed} failed; {self.ingest.upserted} chunks upserted, "
+                f"{self.chunks_deleted} deleted; {self.files_per_s:.1f} files/s, {self.mb_per_s:.1f} MB/s "
+                f"in {self.seconds:.1f}s")
+
+
+def file_hash(path: Path) -> str:
+    h = hashlib.sha1()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(1 << 20), b""):
+            h.update(block)
+    return h.hexdigest()
+
+
+def _extract(path: str, known_hash: Optional[str], max_tokens: int, overlap: int) -> Dict[str, Any]:
+    """Worker: hash the file and, if its content changed, extract and chunk it."""
+    p = Path(path)
+    result: Dict[str, Any] = {"path": path, "size": 0}
+    try:
+        result["size"] = p.stat().st_size
+        result["hash"] = file_hash(p)
+        if result["hash"] == known_hash:
+            result["unchanged"] = True
+            return result
+        text = extract_document_text(p)
+        if not text.strip():
+            result["error"] = "no extractable text"
+            return result
+        result["chunks"] = chunk_document(p.name, text, {"path": path}, max_tokens, overlap)
+    except Exception as e:
+        result["error"] = f"{type(e).__name__}: {e}"
+    return result
+
+
+def load_manifest(path: Path) -> Dict[str, Dict[str, Any]]:
+    try:
+        return json.loads(path.read_text())["files"]
+    except (OSError, ValueError, KeyError):
+        return {}
+
+
+def save_manifest(path: Path, files: Dict[str, Dict[str, Any]]) -> None:
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp = path.with_name(f"{path.name}.{os.getpid()}.tmp")
+    tmp.write_text(json.dumps({"files": files}))
+    os.replace(tmp, path)
+
+
+def scan_directory(root: Path) -> List[Path]:
+    return sorted(p for p in root.rglob("*") if p.is_file() and p.suffix.lower() in LIBRARY_SUFFIXES)
+
+
+def sync_library(
+    root: Path,
+    store: Optional[VectorStore] = None,
+    manifest_path: Optional[Path] = None,
+    workers: Optional[int] = None,
+    prune: bool = True,
+    batch_size: int = UPSERT_BATCH,
+    max_tokens: int = CHUNK_TOKENS,
+    overlap: int = CHUNK_OVERLAP,
+    progress: Optional[ProgressFn] = None,
+) -> SyncStats:
+    """Bring the library in line with the documents under root.
+
+    workers=0 extracts in this process; None uses one worker per CPU.
+    """
+    start = time.perf_counter()
+    store = store or get_store()
+    root = Path(root).resolve()
+    manifest_path = Path(manifest_path) if manifest_path else store.path / MANIFEST_NAME
+    files = load_manifest(manifest_path)
+    if files and store.count() == 0:
+        files = {}  # the library was cleared or replaced since the manifest was written
+
+    stats = SyncStats()
+    released: Dict[str, List[str]] = {}  # path -> chunk ids it no longer has
+
+    paths = scan_directory(root)
+    stats.scanned = len(paths)
+    todo = []
+    for p in paths:
+        key = str(p)
+        st = p.stat()
+        entry = files.get(key)
+        if entry and entry.get("size") == st.st_size and entry.get("mtime_ns") == st.st_mtime_ns:
+            stats.unchanged += 1
+        else:
+            todo.append((key, st.st_mtime_ns))
+
+    pending: List[Chunk] = []
+    staged: Dict[str, Tuple[Dict[str, Any], List[str]]] = {}  # path -> (new manifest entry, old chunk ids)
+
+    def flush() -> None:
+        # A file enters the manifest only once all of its chunks are stored;
+        # otherwise its old entry and chunks stay, and the next sync retries it
+        mark = len(stats.ingest.failed_ids)
+        store.add_chunks(pending, batch_size, stats.ingest)
+        failed = set(stats.ingest.failed_ids[mark:])
+        for key, (entry, old) in staged.items():
+            if failed.intersection(entry["chunks"]):
+                stats.failed += 1
+                stats.errors.append(f"{key}: chunks could not be written to the library")
+                continue
+            if key in files:
+                stats.updated += 1
+            else:
+                stats.added += 1
+            keep = set(entry["chunks"])
+            released[key] = [cid for cid in old if cid not in keep]
+            files[key] = entry
+        pending.clear()
+        staged.clear()
+
+    def apply(result: Dict[str, Any], mtime_ns: int) -> None:
+        key = result["path"]
+        entry = files.get(key)
+        stats.bytes_read += result["size"]
+        if "error" in result:
+            stats.failed += 1
+            stats.errors.append(f"{key}: {result['error']}")
+            return
+        if result.get("unchanged"):
+            stats.unchanged += 1
+            entry.update(size=result["size"], mtime_ns=mtime_ns)
+            return
+        chunks: List[Chunk] = result["chunks"]
+        old = entry.get("chunks", []) if entry else []
+        pending.extend(chunks)
+        stats.ingest.docs += 1
+        staged[key] = ({"hash": result["hash"], "size": result["size"], "mtime_ns": mtime_ns, "chunks": [c.id for c in chunks]}, old)
+        if len(pending) >= batch_size:
+            flush()
+
+    workers = (os.cpu_count() or 1) if workers is None else workers
+    known = {key: files[key].get("hash") if key in files else None for key, _ in todo}
+    mtimes = dict(todo)
+    done = 0
+    if workers > 0 and len(todo) > 1:
+        with ProcessPoolExecutor(max_workers=min(workers, len(todo))) as pool:
+            futures: Dict[Future, str] = {
+                pool.submit(_extract, key, known[key], max_tokens, overlap): key for key, _ in todo
+            }
+            for future in as_completed(futures):
+                key = futures[future]
+                try:
+                    result = future.result()
+                except Exception as e:  # worker died
+                    result = {"path": key, "size": 0, "error": f"{type(e).__name__}: {e}"}
+                apply(result, mtimes[key])
+                done += 1
+                if progress:
+                    progress(done, len(todo), key)
+    else:
+        for key, mtime_ns in todo:
+            apply(_extract(key, known[key], max_tokens, overlap), mtime_ns)
+            done += 1
+            if progress:
+                progress(done, len(todo), key)
+    if staged:
+        flush()
+
+    if prune:
+        seen = {str(p) for p in paths}
+        prefix = str(root) + os.sep
+        for key in [k for k in files if k.startswith(prefix) and k not in seen]:
+            released[key] = files.pop(key).get("chunks", [])
+            stats.removed += 1
+
+    # Releases run last, so a chunk that moved to another file is never deleted and re-embedded
+    stats.chunks_deleted = sum(store.release_chunks(ids, key) for key, ids in released.items())
+    save_manifest(manifest_path, files)
+    stats.seconds = time.perf_counter() - start
+    return stats
@@ -0,0 +1,491 @@
+"""
+Local retrieval engine: BM25 over an inverted index, optionally blended with
+hashed-feature vectors, kept in NumPy arrays that are memory-mapped from disk.
+
+It speaks the part of the Chroma client/collection API that the vector store
+uses, so it can replace Chroma where chromadb is unavailable or too heavy.
+
+Layout of one collection directory:
+    manifest.json                 segments, doc count, vocabulary size, vector dim
+    vocab.txt / ids.txt           term and chunk id per line (line number = index)
+    docs.jsonl                    {"text", "meta"} per doc, read by byte span
+    live.npy                      False for deleted or replaced docs
+    seg_NNNNNN/*.npy              immutable CSR postings for one upsert batch
+
+Every upsert writes one segment; segments are merged once there are more
+than MAX_SEGMENTS of them.
+"""
+import json
+import math
+import os
+import re
+import shutil
+import threading
+import time
+import zlib
+from collections import Counter
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Tuple
+
+import numpy as np
+
+BM25_K1 = 1.2
+BM25_B = 0.75
+VECTOR_DIM = 256
+VECTOR_WEIGHT = 0.3  # share of the blended score taken by vector similarity
+MAX_SEGMENTS = 16
+
+_TERM = re.compile(r"[a-z0-9]+(?:[._][a-z0-9]+)*")
+
+
+def tokenize(text: str) -> List[str]:
+    """Lowercased words; dotted and underscored names (3.3v, bit.radio, vdd_3v3) stay whole."""
+    return _TERM.findall(text.lower())
+
+
+class HashedFeatures:
+    """Signed feature hashing of terms and their character trigrams into `dim` buckets."""
+
+    def __init__(self, dim: int = VECTOR_DIM):
+        self.dim = dim
+        self._memo: Dict[str, List[tuple]] = {}
+
+    def _features(self, term: str) -> List[tuple]:
+        feats = self._memo.get(term)
+        if feats is None:
+            padded = f"<{term}>"
+            grams = [(padded[i:i + 3], 0.5) for i in range(len(padded) - 2)]
+            feats = []
+            for piece, weight in [(term, 1.0)] + grams:
+                h = zlib.crc32(piece.encode("utf-8"))
+                feats.append((h % self.dim, weight if h & 0x80000000 else -weight))
+            self._memo[term] = feats
+        return feats
+
+    def vector(self, terms: Counter) -> np.ndarray:
+        v = np.zeros(self.dim, dtype=np.float32)
+        for term, tf in terms.items():
+            scale = 1.0 + math.log(tf)
+            for idx, weight in self._features(term):
+                v[idx] += weight * scale
+        norm = float(np.linalg.norm(v))
+        return v / norm if norm else v
+
+
+@dataclass
+class _Segment:
+    name: str
+    doc_start: int
+    offsets: np.ndarray    # int64, vocab size at write time + 1
+    postings: np.ndarray   # int32 global doc index, grouped by term
+    tfs: np.ndarray        # float32 term frequency per posting
+    lengths: np.ndarray    # float32 tokens per doc
+    spans: np.ndarray      # int64 (n, 2) byte span of each doc in docs.jsonl
+    vectors: Optional[np.ndarray] = None  # float32 (n, dim)
+
+    @property
+    def size(self) -> int:
+        return len(self.lengths)
+
+    def term_postings(self, term_id: int):
+        if term_id + 1 >= len(self.offsets):
+            return None
+        lo, hi = int(self.offsets[term_id]), int(self.offsets[term_id + 1])
+        if lo == hi:
+            return None
+        return self.postings[lo:hi], self.tfs[lo:hi]
+
+    @classmethod
+    def load(cls, root: Path, name: str, doc_start: int) -> "_Segment":
+        d = root / name
+        vectors = d / "vectors.npy"
+        return cls(
+            name=name,
+            doc_start=doc_start,
+            offsets=_load_array(d / "offsets.npy"),
+            postings=_load_array(d / "postings.npy"),
+            tfs=_load_array(d / "tfs.npy"),
+            lengths=_load_array(d / "lengths.npy"),
+            spans=_load_array(d / "spans.npy"),
+            vectors=_load_array(vectors) if vectors.exists() else None,
+        )
+
+    def save(self, root: Path) -> None:
+        d = root / self.name
+        d.mkdir(parents=True, exist_ok=True)
+        for field in ("offsets", "postings", "tfs", "lengths", "spans", "vectors"):
+            arr = getattr(self, field)
+            if arr is not None:
+                np.save(d / f"{field}.npy", arr)
+
+
+def _load_array(path: Path) -> np.ndarray:
+    try:
+        return np.load(path, mmap_mode="r")
+    except ValueError:  # zero-size arrays cannot be mapped
+        return np.load(path)
+
+
+def _csr(term_ids: np.ndarray, docs: np.ndarray, tfs: np.ndarray, vocab_size: int):
+    order = np.lexsort((docs, term_ids))
+    offsets = np.zeros(vocab_size + 1, dtype=np.int64)
+    np.cumsum(np.bincount(term_ids, minlength=vocab_size), out=offsets[1:])
+    return offsets, docs[order].astype(np.int32), tfs[order].astype(np.float32)
+
+
+class LocalCollection:
+    def __init__(self, path: Path, name: str, vectors: bool = False):
+        self.path = Path(path)
+        self.name = name
+        self._lock = threading.RLock()
+        self._features = HashedFeatures(VECTOR_DIM) if vectors else None
+        self._manifest_key: Optional[Tuple[int, int, int]] = None
+        self._docs_file = None
+        self._load()
+
+    # ---- persistence -------------------------------------------------
+
+    def _stat_manifest(self) -> Optional[Tuple[int, int, int]]:
+        # The manifest is replaced, never rewritten in place, so a new inode
+        # flags a change even where timestamps are coarse
+        try:
+            st = (self.path / "manifest.json").stat()
+        except OSError:
+            return None
+        return (st.st_ino, st.st_mtime_ns, st.st_size)
+
+    def _load(self, attempts: int = 5) -> None:
+        # A writer in another process may merge segments away while we read;
+        # the manifest it leaves behind then names files that exist
+        for attempt in range(attempts):
+            try:
+                return self._load_once()
+            except (FileNotFoundError, ValueError):
+                if attempt == attempts - 1:
+                    raise
+                time.sleep(0.01 * (attempt + 1))
+
+    def _load_once(self) -> None:
+        manifest_path = self.path / "manifest.json"
+        self._manifest_key = self._stat_manifest()
+        manifest = json.loads(manifest_path.read_text()) if self._manifest_key else {}
+        n_docs = manifest.get("docs", 0)
+        vocab_size = manifest.get("vocab", 0)
+        if n_docs:
+            # Existing data decides whether vectors are kept, whatever the caller asked for
+            dim = manifest.get("vector_dim", 0)
+            self._features = HashedFeatures(dim) if dim else None
+        self._next_segment = manifest.get("next_segment", 0)
+        self._file_sizes = manifest.get("file_sizes", {})
+
+        self._vocab_list = self._read_lines("vocab.txt", vocab_size)
+        self._vocab = {t: i for i, t in enumerate(self._vocab_list)}
+        self._ids = self._read_lines("ids.txt", n_docs)
+        live_path = self.path / "live.npy"
+        self._live = np.load(live_path)[:n_docs].copy() if live_path.exists() else np.zeros(0, dtype=bool)
+        self._id_to_doc = {doc_id: i for i, doc_id in enumerate(self._ids) if self._live[i]}
+        self._segments = [_Segment.load(self.path, s["name"], s["doc_start"]) for s in manifest.get("segments", [])]
+        self._derive()
+
+    def _read_lines(self, name: str, count: int) -> List[str]:
+        p = self.path / name
+        if not p.exists() or count == 0:
+            return []
+        return p.read_text(encoding="utf-8").split("\n")[:count]
+
+    def _derive(self) -> None:
+        """Whole-collection arrays rebuilt after every change."""
+        if self._segments:
+            self._lengths = np.concatenate([np.asarray(s.lengths) for s in self._segments])
+        else:
+            self._lengths = np.zeros(0, dtype=np.float32)
+        live_lengths = self._lengths[self._live[:len(self._lengths)]]
+        self._avgdl = float(live_lengths.mean()) if len(live_lengths) else 1.0
+        self._n_live = int(self._live.sum())
+
+    def _append_lines(self, name: str, lines: List[str]) -> None:
+        if lines:
+            with open(self.path / name, "a", encoding="utf-8") as f:
+                f.write("".join(line + "\n" for line in lines))
+
+    def _truncate_appends(self) -> None:
+        """Drop bytes an interrupted upsert appended after the last saved manifest."""
+        for name in ("vocab.txt", "ids.txt", "docs.jsonl"):
+            p = self.path / name
+            if p.exists() and p.stat().st_size > self._file_sizes.get(name, 0):
+                with open(p, "r+b") as f:
+                    f.truncate(self._file_sizes.get(name, 0))
+
+    def _save_state(self) -> None:
+        tmp = self.path / f"live.{os.getpid()}.npy"
+        np.save(tmp, self._live)
+        os.replace(tmp, self.path / "live.npy")
+        self._file_sizes = {
+            name: (self.path / name).stat().st_size
+            for name in ("vocab.txt", "ids.txt", "docs.jsonl") if (self.path / name).exists()
+        }
+        manifest = {
+            "file_sizes": self._file_sizes,
+            "docs": len(self._ids),
+            "vocab": len(self._vocab_list),
+            "vector_dim": self._features.dim if self._features else 0,
+            "next_segment": self._next_segment,
+            "segments": [{"name": s.name, "doc_start": s.doc_start} for s in self._segments],
+        }
+        tmp = self.path / f"manifest.{os.getpid()}.json"
+        tmp.write_text(json.dumps(manifest))
+        os.replace(tmp, self.path / "manifest.json")
+        self._manifest_key = self._stat_manifest()
+
+    def refresh(self) -> None:
+        """Pick up writes made by another process since this collection was loaded."""
+        if self._stat_manifest() != self._manifest_key:
+            with self._lock:
+                self._close_docs()
+                self._load()
+
+    def _docs(self):
+        if self._docs_file is None:
+            self._docs_file = open(self.path / "docs.jsonl", "rb")
+        return self._docs_file
+
+    def _close_docs(self) -> None:
+        if self._docs_file is not None:
+            self._docs_file.close()
+            self._docs_file = None
+
+    def close(self) -> None:
+        with self._lock:
+            self._close_docs()
+
+    # ---- Chroma-compatible API ----------------------------------------
+
+    def count(self) -> int:
+        self.refresh()
+        return self._n_live
+
+    def upsert(self, ids: List[str], documents: List[str], metadatas: Optional[List[dict]] = None, **_) -> None:
+        if not ids:
+            return
+        metadatas = metadatas or [{} for _ in ids]
+        self.refresh()
+        with self._lock:
+            self.path.mkdir(parents=True, exist_ok=True)
+            self._truncate_appends()
+            doc_start = len(self._ids)
+            term_ids: List[int] = []
+            post_docs: List[int] = []
+            post_tfs: List[float] = []
+            lengths: List[float] = []
+            vectors: List[np.ndarray] = []
+            new_terms: List[str] = []
+            for i, text in enumerate(documents):
+                counts = Counter(tokenize(text))
+                for term, tf in counts.items():
+                    tid = self._vocab.get(term)
+                    if tid is None:
+                        tid = self._vocab[term] = len(self._vocab_list)
+                        self._vocab_list.append(term)
+                        new_terms.append(term)
+                    term_ids.append(tid)
+                    post_docs.append(doc_start + i)
+                    post_tfs.append(tf)
+                lengths.append(sum(counts.values()))
+                if self._features is not None:
+                    vectors.append(self._features.vector(counts))
+
+            # docs.jsonl: remember each line's byte span for random access
+            lines = [json.dumps({"text": t, "meta": m}, ensure_ascii=False).encode("utf-8") + b"\n"
+                     for t, m in zip(documents, metadatas)]
+            docs_path = self.path / "docs.jsonl"
+            base = docs_path.stat().st_size if docs_path.exists() else 0
+            ends = base + np.cumsum([len(line) for line in lines], dtype=np.int64)
+            spans = np.stack([ends - [len(line) for line in lines], ends], axis=1) if lines else np.zeros((0, 2), np.int64)
+            with open(docs_path, "ab") as f:
+                f.write(b"".join(lines))
+            self._close_docs()
+
+            offsets, postings, tfs = _csr(
+                np.asarray(term_ids, dtype=np.int64), np.asarray(post_docs, dtype=np.int32),
+                np.asarray(post_tfs, dtype=np.float32), len(self._vocab_list),
+            )
+            segment = _Segment(
+                name=f"seg_{self._next_segment:06d}", doc_start=doc_start, offsets=offsets, postings=postings,
+                tfs=tfs, lengths=np.asarray(lengths, dtype=np.float32), spans=spans.astype(np.int64),
+                vectors=np.stack(vectors) if vectors else (np.zeros((0, self._features.dim), np.float32) if self._features else None),
+            )
+            self._next_segment += 1
+            segment.save(self.path)
+            self._segments.append(_Segment.load(self.path, segment.name, doc_start))
+
+            self._append_lines("vocab.txt", new_terms)
+            self._append_lines("ids.txt", list(ids))
+            self._live = np.concatenate([self._live, np.ones(len(ids), dtype=bool)])
+            for i, doc_id in enumerate(ids):
+                old = self._id_to_doc.get(doc_id)
+                if old is not None:
+                    self._live[old] = False  # replaced
+                self._id_to_doc[doc_id] = doc_start + i
+            self._ids.extend(ids)
+            if len(self._segments) > MAX_SEGMENTS:
+                self._merge_segments()
+            self._derive()
+            self._save_state()
+
+    def delete(self, ids: List[str], **_) -> None:
+        self.refresh()
+        with self._lock:
+            for doc_id in ids:
+                idx = self._id_to_doc.pop(doc_id, None)
+                if idx is not None:
+                    self._live[idx] = False
+            self._derive()
+            self._save_state()
+
+    def update(self, ids: List[str], metadatas: List[dict], **_) -> None:
+        """Replace the metadata of stored documents (rewritten as new rows, like upsert)."""
+        found = self.get(ids=ids)
+        meta = dict(zip(ids, metadatas))
+        self.upsert(found["ids"], found["documents"], [meta[i] for i in found["ids"]])
+
+    def get(self, ids: Optional[List[str]] = None, include: Optional[list] = None, **_) -> Dict[str, list]:
+        self.refresh()
+        with self._lock:
+            wanted = list(self._id_to_doc) if ids is None else [i for i in ids if i in self._id_to_doc]
+            out: Dict[str, list] = {"ids": wanted}
+            if include is None or include:
+                docs = [self._read_doc(self._id_to_doc[i]) for i in wanted]
+                out["documents"] = [d["text"] for d in docs]
+                out["metadatas"] = [d["meta"] for d in docs]
+            return out
+
+    def query(self, query_texts: List[str], n_results: int = 10, **_) -> Dict[str, list]:
+        self.refresh()
+        out: Dict[str, list] = {"ids": [], "documents": [], "metadatas": [], "distances": []}
+        with self._lock:
+            sims = self._similarities(query_texts)
+            for q, text in enumerate(query_texts):
+                docs, scores = self._rank(text, n_results, sims[q] if sims is not None else None)
+                found = [self._read_doc(int(d)) for d in docs]
+                out["ids"].append([self._ids[int(d)] for d in docs])
+                out["documents"].append([f["text"] for f in found])
+                out["metadatas"].append([f["meta"] for f in found])
+                out["distances"].append([1.0 / (1.0 + float(s)) for s in scores])
+        return out
+
+    # ---- scoring -----------------------------------------------------
+
+    def _similarities(self, query_texts: List[str]) -> Optional[np.ndarray]:
+        """Cosine similarity of every query to every doc, one pass over the vectors per batch."""
+        if self._features is None or not self._ids:
+            return None
+        q = np.stack([self._features.vector(Counter(tokenize(t))) for t in query_texts])
+        sims = np.zeros((len(query_texts), len(self._ids)), dtype=np.float32)
+        for s in self._segments:
+            if s.vectors is not None and s.size:
+                sims[:, s.doc_start:s.doc_start + s.size] = (np.asarray(s.vectors) @ q.T).T
+        return sims
+
+    def _rank(self, text: str, n_results: int, sims: Optional[np.ndarray] = None):
+        n = len(self._ids)
+        if n == 0 or self._n_live == 0:
+            return np.zeros(0, np.int64), np.zeros(0, np.float32)
+        counts = Counter(tokenize(text))
+        scores = np.zeros(n, dtype=np.float32)
+        for term in counts:
+            tid = self._vocab.get(term)
+            if tid is None:
+                continue
+            hits = [p for p in (s.term_postings(tid) for s in self._segments) if p is not None]
+            if not hits:
+                continue
+            docs = np.concatenate([h[0] for h in hits])
+            tfs = np.concatenate([h[1] for h in hits])
+            df = int(self._live[docs].sum())  # replaced and deleted rows keep their postings until a merge
+            if df == 0:
+                continue
+            idf = math.log(1.0 + (self._n_live - df + 0.5) / (df + 0.5))
+            norm = BM25_K1 * (1.0 - BM25_B + BM25_B * self._lengths[docs] / self._avgdl)
+            scores[docs] += idf * tfs * (BM25_K1 + 1.0) / (tfs + norm)
+
+        if sims is not None and counts:
+            top = float(scores.max())
+            if top > 0:
+                scores /= top
+            scores = (1.0 - VECTOR_WEIGHT) * scores + VECTOR_WEIGHT * np.clip(sims, 0.0, None)
+
+        scores[~self._live] = 0.0
+        candidates = np.flatnonzero(scores > 0)
+        if len(candidates) > n_results:
+            part = np.argpartition(-scores[candidates], n_results - 1)[:n_results]
+            candidates = candidates[part]
+        order = candidates[np.lexsort((candidates, -scores[candidates]))]
+        return order, scores[order]
+
+    def _read_doc(self, doc: int) -> Dict[str, Any]:
+        seg = next(s for s in reversed(self._segments) if s.doc_start <= doc)
+        start, end = (int(x) for x in seg.spans[doc - seg.doc_start])
+        f = self._docs()
+        f.seek(start)
+        return json.loads(f.read(end - start))
+
+    def _merge_segments(self) -> None:
+        """Fold every segment into one; postings of dead docs are dropped."""
+        vocab_size = len(self._vocab_list)
+        terms, docs, tfs = [], [], []
+        for s in self._segments:
+            counts = np.diff(np.asarray(s.offsets))
+            terms.append(np.repeat(np.arange(len(counts), dtype=np.int64), counts))
+            docs.append(np.asarray(s.postings))
+            tfs.append(np.asarray(s.tfs))
+        all_terms, all_docs, all_tfs = np.concatenate(terms), np.concatenate(docs), np.concatenate(tfs)
+        keep = self._live[all_docs]
+        offsets, postings, merged_tfs = _csr(all_terms[keep], all_docs[keep], all_tfs[keep], vocab_size)
+        vectors = None
+        if self._features is not None:
+            vectors = np.concatenate([np.asarray(s.vectors) for s in self._segments])
+        merged = _Segment(
+            name=f"seg_{self._next_segment:06d}", doc_start=self._segments[0].doc_start,
+            offsets=offsets, postings=postings, tfs=merged_tfs,
+            lengths=np.concatenate([np.asarray(s.lengths) for s in self._segments]),
+            spans=np.concatenate([np.asarray(s.spans) for s in self._segments]),
+            vectors=vectors,
+        )
+        self._next_segment += 1
+        merged.save(self.path)
+        old = self._segments
+        self._segments = [_Segment.load(self.path, merged.name, merged.doc_start)]
+        self._save_state()
+        for s in old:
+            shutil.rmtree(self.path / s.name, ignore_errors=True)
+
+
+class LocalIndexClient:
+    """Chroma-style client over a directory of LocalCollections."""
+
+    def __init__(self, path: Path, vectors: bool = False):
+        self.path = Path(path) / "local"
+        self.vectors = vectors
+        self._collections: Dict[str, LocalCollection] = {}
+        self._lock = threading.Lock()
+
+    def get_or_create_collection(self, name: str, metadata: Optional[dict] = None) -> LocalCollection:
+        with self._lock:
+            coll = self._collections.get(name)
+            if coll is None:
+                coll = self._collections[name] = LocalCollection(self.path / name, name, self.vectors)
+            return coll
+
+    def delete_collection(self, name: str) -> None:
+        with self._lock:
+            coll = self._collections.pop(name, None)
+            if coll is not None:
+                coll.close()
+            shutil.rmtree(self.path / name, ignore_errors=True)
+
+    def close(self) -> None:
+        with self._lock:
+            for coll in self._collections.values():
+                coll.close()
+            self._collections.clear()
@@ -0,0 +1,100 @@
+"""
+Pick non-redundant library snippets for a prompt
+
+Hits are chosen greedily by maximal marginal relevance: relevance from the
+retrieval score, redundancy as the MinHash estimate of word-shingle Jaccard
+similarity to the snippets already chosen. Near-duplicates (the same
+datasheet paragraph from another revision or an overlapping chunk) are
+dropped outright, and selection stops at a character budget.
+"""
+import os
+import re
+import zlib
+from dataclasses import dataclass, field
+from typing import Any, Dict, List
+
+import numpy as np
+
+CONTEXT_CHARS = int(os.getenv("RAG_CONTEXT_CHARS", "2400"))  # budget for the whole context blob
+SNIPPET_CHARS = 200
+MMR_LAMBDA = 0.7          # 1.0 = relevance only, 0.0 = diversity only
+DUPLICATE_JACCARD = 0.6   # estimated similarity at which a snippet counts as a repeat
+SHINGLE_WORDS = 3
+NUM_PERM = 64
+
+_MERSENNE = (1 << 61) - 1
+_rng = np.random.default_rng(0x5EED)
+_A = _rng.integers(1, 1 << 32, NUM_PERM, dtype=np.uint64)  # a * x stays below 2**64
+_B = _rng.integers(0, _MERSENNE, NUM_PERM, dtype=np.uint64)
+
+
+def shingles(text: str, k: int = SHINGLE_WORDS) -> np.ndarray:
+    """CRC32 of every k-word window of the normalized text."""
+    words = re.findall(r"[a-z0-9.+]+", text.lower())
+    if len(words) < k:
+        words = words + [""] * (k - len(words))
+    grams = {" ".join(words[i:i + k]) for i in range(len(words) - k + 1)}
+    return np.fromiter((zlib.crc32(g.encode("utf-8")) for g in grams), dtype=np.uint64, count=len(grams))
+
+
+def minhash(text: str) -> np.ndarray:
+    """NUM_PERM-value signature; equal positions estimate Jaccard similarity."""
+    x = shingles(text)
+    # (a*x + b) mod p with p = 2**61 - 1; x, a < 2**32 so nothing overflows uint64
+    hashed = (_A[:, None] * x[None, :] % _MERSENNE + _B[:, None]) % _MERSENNE
+    return hashed.min(axis=1)
+
+
+def similarity(sig_a: np.ndarray, sig_b: np.ndarray) -> float:
+    return float(np.mean(sig_a == sig_b))
+
+
+@dataclass
+class Selection:
+    hits: List[Dict[str, Any]] = field(default_factory=list)
+    chars: int = 0
+    duplicates: int = 0   # near-duplicates dropped
+    over_budget: int = 0  # relevant but did not fit
+
+
+def _snippet(hit: Dict[str, Any], max_chars: int) -> str:
+    text = hit["text"]
+    return text[:max_chars] + "..." if len(text) > max_chars else text
+
+
+def select_snippets(
+    hits: List[Dict[str, Any]],
+    budget_chars: int = CONTEXT_CHARS,
+    snippet_chars: int = SNIPPET_CHARS,
+    mmr_lambda: float = MMR_LAMBDA,
+    duplicate_jaccard: float = DUPLICATE_JACCARD,
+) -> Selection:
+    """Greedy MMR over hits (best first); each chosen hit gains a "snippet" key."""
+    out = Selection()
+    if not hits:
+        return out
+    rel = np.array([h.get("score", 1.0 / (1.0 + h.get("distance", 0.0))) for h in hits], dtype=np.float64)
+    if rel.max() > rel.min():
+        rel = (rel - rel.min()) / (rel.max() - rel.min())
+    else:
+        rel = np.ones(len(hits))
+    snippets = [_snippet(h, snippet_chars) for h in hits]
+    sigs = np.stack([minhash(s) for s in snippets])
+    max_sim = np.zeros(len(hits))
+    open_ = np.ones(len(hits), dtype=bool)
+
+    while open_.any():
+        score = np.where(open_, mmr_lambda * rel - (1.0 - mmr_lambda) * max_sim, -np.inf)
+        i = int(np.argmax(score))
+        open_[i] = False
+        if max_sim[i] >= duplicate_jaccard:
+            out.duplicates += 1
+            continue
+        line_chars = len(snippets[i]) + len(hits[i]["meta"].get("name", "")) + 4  # "[name] " and newline
+        if out.chars + line_chars > budget_chars:
+            out.over_budget += 1
+            continue
+        out.hits.append({**hits[i], "snippet": snippets[i]})
+        out.chars += line_chars
+        max_sim = np.maximum(max_sim, (sigs == sigs[i]).mean(axis=1))
+    return out
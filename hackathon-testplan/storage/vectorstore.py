@@ -1,33 +1,624 @@
 """
 RAG Vector Store using Chroma for persistent document storage and retrieval
+
+The store is opened lazily: importing this module does not import chromadb
+or touch the disk. The first call that needs the collection opens one
+process-wide client (thread-safe), which is then reused by every caller,
+including Streamlit reruns and CLI batch jobs, until close_store().
 """
+import atexit
 import hashlib
+import importlib.util
 import json
+import os
+import re
+import threading
+import time
+from concurrent.futures import Future
+from dataclasses import dataclass, field
 from pathlib import Path
-from typing import List, Dict, Any, Optional
-import chromadb
-from chromadb.config import Settings
-
-# Create storage directory
-STORAGE_DIR = Path("out/chroma")
-STORAGE_DIR.mkdir(parents=True, exist_ok=True)
-
-# Initialize Chroma client
-client = chromadb.PersistentClient(
-    path=str(STORAGE_DIR),
-    settings=Settings(anonymized_telemetry=False)
-)
-
-# Get or create collection
-collection = client.get_or_create_collection(
-    name="design_docs",
-    metadata={"description": "Hardware design documents and specifications"}
-)
+from typing import Any, Callable, Dict, Iterable, Iterator, List, Optional, Protocol, Tuple
+
+from core.cache import DiskCache, LRUCache, fingerprint
+from storage.chunking import CHUNK_OVERLAP, CHUNK_TOKENS, Chunk, chunk_document, drop_source, merge_sources
+from storage.filelock import FileLock
+from storage.selection import CONTEXT_CHARS, select_snippets
+
+# Storage location; override with CHROMA_PATH or configure_store(path=...)
+STORAGE_DIR = Path(os.getenv("CHROMA_PATH", "out/chroma"))
+COLLECTION_NAME = "design_docs"
+COLLECTION_META = {"description": "Hardware design documents and specifications"}
+UPSERT_BATCH = int(os.getenv("CHROMA_UPSERT_BATCH", "512"))  # chunks per upsert call
+
+# Retrieval backend: "chroma", "local" (BM25 + hashed vectors, NumPy only) or
+# "auto" (Chroma when installed, otherwise local)
+RAG_BACKEND = os.getenv("RAG_BACKEND", "auto").lower()
+LOCAL_VECTORS = os.getenv("RAG_LOCAL_VECTORS", "0") == "1"  # blend hashed vectors into BM25
+
+# Query -> hits cache (in-process LRU, optionally also on disk with
+# CHROMA_QUERY_CACHE=disk). Keys include the library version, which every
+# write bumps, so results never outlive the library they came from.
+QUERY_CACHE_SIZE = int(os.getenv("CHROMA_QUERY_CACHE_SIZE", "1024"))
+QUERY_CACHE_DISK = os.getenv("CHROMA_QUERY_CACHE", "").lower() == "disk"
+VERSION_FILE = "library.version"
+MANIFEST_NAME = "library_manifest.json"  # written by storage.library_sync
+LOCK_FILE = "write.lock"
+WRITE_LINGER_S = float(os.getenv("CHROMA_WRITE_LINGER_S", "0.05"))  # wait for more add_doc calls to batch
+
+
+@dataclass
+class IngestStats:
+    docs: int = 0
+    chunks: int = 0        # chunks produced by splitting
+    duplicates: int = 0    # skipped: repeated in this call or already stored
+    upserted: int = 0
+    failed: int = 0        # chunks whose batch could not be written
+    failed_ids: List[str] = field(default_factory=list)  # ids of those chunks
+    batches: int = 0
+    seconds: float = 0.0
+
+    @property
+    def chunks_per_s(self) -> float:
+        return self.chunks / self.seconds if self.seconds > 0 else 0.0
+
+    def summary(self) -> str:
+        return (f"{self.docs} docs, {self.chunks} chunks ({self.duplicates} duplicate), "
+                f"{self.upserted} upserted in {self.batches} batches, {self.chunks_per_s:.0f} chunks/s")
+
+
+class RetrievalCollection(Protocol):
+    """What the store needs from a backend collection (a subset of Chroma's API)."""
+
+    def upsert(self, ids: List[str], documents: List[str], metadatas: List[Dict[str, Any]]) -> None: ...
+    def update(self, ids: List[str], metadatas: List[Dict[str, Any]]) -> None: ...
+    def get(self, ids: Optional[List[str]] = None, include: Optional[List[str]] = None) -> Dict[str, list]: ...
+    def query(self, query_texts: List[str], n_results: int = 10) -> Dict[str, list]: ...
+    def delete(self, ids: List[str]) -> None: ...
+    def count(self) -> int: ...
+
+
+class RetrievalBackend(Protocol):
+    def get_or_create_collection(self, name: str, metadata: Optional[Dict[str, Any]] = None) -> RetrievalCollection: ...
+    def delete_collection(self, name: str) -> None: ...
+
+
+def _open_chroma(path: Path) -> RetrievalBackend:
+    """Chroma client factory; the only place chromadb is imported."""
+    import chromadb
+    from chromadb.config import Settings
+
+    path.mkdir(parents=True, exist_ok=True)
+    return chromadb.PersistentClient(path=str(path), settings=Settings(anonymized_telemetry=False))
+
+
+def _open_local(path: Path) -> RetrievalBackend:
+    from storage.local_index import LocalIndexClient
+
+    return LocalIndexClient(path, vectors=LOCAL_VECTORS)
+
+
+BACKENDS: Dict[str, Callable[[Path], RetrievalBackend]] = {
+    "chroma": _open_chroma,
+    "local": _open_local,
+}
+
+
+def resolve_backend(name: Optional[str] = None) -> str:
+    name = (name or RAG_BACKEND).lower()
+    if name == "auto":
+        # find_spec locates the package without importing it
+        return "chroma" if importlib.util.find_spec("chromadb") is not None else "local"
+    if name not in BACKENDS:
+        raise ValueError(f"Unknown retrieval backend {name!r}; expected one of: auto, {', '.join(BACKENDS)}")
+    return name
+
+
+class _WriteQueue:
+    """Coalesces concurrent add_doc calls into batched upserts on one writer thread.
+
+    The writer lingers for more documents only while another caller is still
+    chunking one or a queued caller did not block on its future; a serial
+    add_doc loop is written at once.
+    """
+
+    def __init__(self, store: "VectorStore", batch_size: int = UPSERT_BATCH, linger: float = WRITE_LINGER_S):
+        self.store = store
+        self.batch_size = batch_size
+        self.linger = linger
+        self._items: List[Tuple[List[Chunk], Future]] = []
+        self._pending = 0
+        self._arriving = 0  # callers between expect() and submit()
+        self._blocked = 0  # queued callers waiting on their future
+        self._cond = threading.Condition()
+        self._thread: Optional[threading.Thread] = None
+        self._closed = False
+        self.flushes = 0
+
+    def expect(self) -> None:
+        """Announce a submit(); the writer waits for it while lingering."""
+        with self._cond:
+            self._arriving += 1
+
+    def cancel(self) -> None:
+        """Withdraw an expect() that will not be followed by submit()."""
+        with self._cond:
+            self._arriving -= 1
+            self._cond.notify()
+
+    def submit(self, chunks: List[Chunk], blocking: bool = False) -> Future:
+        future: Future = Future()
+        with self._cond:
+            self._arriving -= 1
+            if self._closed:
+                self._cond.notify()
+                raise RuntimeError("write queue is closed")
+            self._items.append((chunks, future))
+            self._pending += len(chunks)
+            self._blocked += blocking
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name="library-writer", daemon=True)
+                self._thread.start()
+            self._cond.notify()
+        return future
+
+    def _lingering(self) -> bool:
+        more_coming = self._arriving > 0 or self._blocked < len(self._items)
+        return more_coming and self._pending < self.batch_size and not self._closed
+
+    def _run(self) -> None:
+        while True:
+            with self._cond:
+                while not self._items and not self._closed:
+                    self._cond.wait()
+                if not self._items:
+                    return
+                deadline = time.monotonic() + self.linger
+                while self._lingering():
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0:
+                        break
+                    self._cond.wait(remaining)
+                batch, self._items, self._pending, self._blocked = self._items, [], 0, 0
+            try:
+                self._flush(batch)
+            except Exception as e:
+                for _, future in batch:
+                    if not future.done():
+                        future.set_exception(e)
+
+    def _flush(self, batch: List[Tuple[List[Chunk], Future]]) -> None:
+        unique: Dict[str, Chunk] = {}
+        for chunks, _ in batch:
+            for chunk in chunks:
+                _add_unique(unique, chunk)
+        stats = IngestStats(chunks=sum(len(c) for c, _ in batch))
+        todo = list(unique.values())
+        for i in range(0, len(todo), self.batch_size):
+            self.store._upsert_new(todo[i:i + self.batch_size], stats)
+        self.flushes += 1
+        failed = set(stats.failed_ids)
+        if failed and len(batch) > 1:
+            # One bad document fails the whole upsert; retry each caller's chunks on their own
+            retry = IngestStats()
+            for chunks, _ in batch:
+                mine = {c.id: c for c in chunks if c.id in failed}
+                if mine:
+                    self.store._upsert_new(list(mine.values()), retry)
+            failed = set(retry.failed_ids)
+        for chunks, future in batch:
+            future.set_result([c.id for c in chunks if c.id in failed])
+
+    def close(self) -> None:
+        """Flush what is queued and stop the writer thread."""
+        with self._cond:
+            self._closed = True
+            self._cond.notify()
+            thread = self._thread
+        if thread is not None:
+            thread.join()
+
+
+class VectorStore:
+    """One library collection, opened on first use and shared across threads.
+
+    The backend is Chroma or the local index (see BACKENDS); tests pass a
+    client_factory instead.
+    """
+
+    def __init__(
+        self,
+        path: Optional[Path] = None,
+        collection_name: str = COLLECTION_NAME,
+        client_factory: Optional[Callable[[Path], RetrievalBackend]] = None,
+        disk_cache: bool = QUERY_CACHE_DISK,
+        backend: Optional[str] = None,
+    ):
+        self.path = Path(path) if path is not None else STORAGE_DIR
+        self.collection_name = collection_name
+        if client_factory is None:
+            self.backend = resolve_backend(backend)
+            self._client_factory = BACKENDS[self.backend]
+        else:
+            self.backend = getattr(client_factory, "__name__", "custom")
+            self._client_factory = client_factory
+        self._client = None
+        self._collection = None
+        self._lock = threading.RLock()
+        self.unavailable: Optional[str] = None  # set when chromadb cannot be imported
+        self.opened = 0  # how many times a client was created, for diagnostics
+        self.query_cache = LRUCache(QUERY_CACHE_SIZE)
+        self._use_disk_cache = disk_cache
+        self._disk_cache: Optional[DiskCache] = None
+        self.write_lock = FileLock(self.path / LOCK_FILE)
+        self._write_queue: Optional[_WriteQueue] = None
+
+    @property
+    def is_open(self) -> bool:
+        return self._collection is not None
+
+    @property
+    def collection(self):
+        """The collection, opening the client on first access."""
+        collection = self._collection
+        if collection is not None:
+            return collection
+        with self._lock:
+            if self._collection is None:
+                try:
+                    self._client = self._client_factory(self.path)
+                except ImportError as e:
+                    self.unavailable = str(e)
+                    raise
+                self.opened += 1
+                self._collection = self._client.get_or_create_collection(
+                    name=self.collection_name, metadata=COLLECTION_META
+                )
+            return self._collection
+
+    def _exists(self) -> bool:
+        """Read paths skip opening a store that was never created or cannot be."""
+        return self.is_open or (self.unavailable is None and self.path.exists())
+
+    def close(self) -> None:
+        with self._lock:
+            queue, self._write_queue = self._write_queue, None
+        if queue is not None:
+            queue.close()
+        with self._lock:
+            client, self._client, self._collection = self._client, None, None
+            disk, self._disk_cache = self._disk_cache, None
+        if disk is not None:
+            disk.close()
+        close = getattr(client, "close", None)
+        if callable(close):
+            try:
+                close()
+            except Exception as e:
+                print(f"Warning: Failed to close vector store at {self.path}: {e}")
+
+    @property
+    def version(self) -> str:
+        """Library version token, shared with other processes through a file next to the store."""
+        try:
+            return (self.path / VERSION_FILE).read_text().strip() or "0"
+        except OSError:
+            return "0"
+
+    def _bump_version(self) -> None:
+        self.path.mkdir(parents=True, exist_ok=True)
+        tmp = self.path / f"{VERSION_FILE}.{os.getpid()}.{threading.get_ident()}"
+        tmp.write_text(os.urandom(8).hex())
+        os.replace(tmp, self.path / VERSION_FILE)
+        # Old entries are unreachable now and age out of the LRU/disk caches
+
+    def _query_disk_cache(self) -> Optional[DiskCache]:
+        if not self._use_disk_cache or not self._exists():
+            return None
+        with self._lock:
+            if self._disk_cache is None:
+                self._disk_cache = DiskCache(self.path / "query_cache.sqlite", max_entries=QUERY_CACHE_SIZE * 8)
+            return self._disk_cache
+
+    def add_doc(self, name: str, text: str, meta: Optional[Dict[str, Any]] = None) -> str:
+        """Queue one document and wait until its batch is written.
+
+        Returns the document's fingerprint, the doc_id listed in its chunks'
+        sources, or "" if nothing was written.
+        """
+        future = self._submit_doc(name, text, meta, blocking=True)
+        if future is None:
+            return ""
+        return _hash(text) if not future.result() else ""
+
+    def queue_doc(self, name: str, text: str, meta: Optional[Dict[str, Any]] = None) -> Optional[Future]:
+        """Queue one document for the next batched write; the future yields the ids of its chunks that failed."""
+        return self._submit_doc(name, text, meta)
+
+    def _submit_doc(self, name: str, text: str, meta: Optional[Dict[str, Any]], blocking: bool = False) -> Optional[Future]:
+        if not text.strip():
+            return None
+        with self._lock:
+            if self._write_queue is None:
+                self._write_queue = _WriteQueue(self)
+            queue = self._write_queue
+        queue.expect()
+        try:
+            chunks = chunk_document(name, text, meta)
+        except BaseException:
+            queue.cancel()
+            raise
+        return queue.submit(chunks, blocking)
+
+    def add_docs(
+        self,
+        docs: Iterable[Tuple[str, str, Optional[Dict[str, Any]]]],
+        max_tokens: int = CHUNK_TOKENS,
+        overlap: int = CHUNK_OVERLAP,
+        batch_size: int = UPSERT_BATCH,
+    ) -> IngestStats:
+        """Chunk (name, text, meta) documents and upsert the chunks in batches."""
+        def chunks() -> Iterator[Chunk]:
+            for name, text, meta in docs:
+                if text.strip():
+                    stats.docs += 1
+                    yield from chunk_document(name, text, meta, max_tokens, overlap)
+
+        stats = IngestStats()
+        return self.add_chunks(chunks(), batch_size, stats)
+
+    def add_chunks(self, chunks: Iterable[Chunk], batch_size: int = UPSERT_BATCH, stats: Optional[IngestStats] = None) -> IngestStats:
+        """Upsert pre-chunked text in batches; chunks already stored are skipped."""
+        stats = stats or IngestStats()
+        start = time.perf_counter()
+        pending: Dict[str, Chunk] = {}
+        for chunk in chunks:
+            stats.chunks += 1
+            if _add_unique(pending, chunk):
+                stats.duplicates += 1
+                continue
+            if len(pending) >= batch_size:
+                self._upsert_new(list(pending.values()), stats)
+                pending.clear()
+        if pending:
+            self._upsert_new(list(pending.values()), stats)
+        stats.seconds += time.perf_counter() - start
+        return stats
+
+    def delete_chunks(self, ids: List[str]) -> int:
+        """Remove chunks by id; returns how many were asked for, 0 on failure."""
+        if not ids or not self._exists():
+            return 0
+        try:
+            with self.write_lock:
+                for i in range(0, len(ids), UPSERT_BATCH):
+                    self.collection.delete(ids=ids[i:i + UPSERT_BATCH])
+                self._bump_version()
+            return len(ids)
+        except Exception as e:
+            print(f"Warning: Failed to delete {len(ids)} chunks: {e}")
+            return 0
+
+    def release_chunks(self, ids: List[str], source: str) -> int:
+        """Drop source (a path or name, see source_key) from these chunks' sources.
+
+        A chunk is deleted once no source is left, so text another document
+        also added stays. Returns how many chunks were deleted.
+        """
+        if not ids or not self._exists():
+            return 0
+        deleted = 0
+        try:
+            with self.write_lock:
+                for i in range(0, len(ids), UPSERT_BATCH):
+                    found = self.collection.get(ids=ids[i:i + UPSERT_BATCH], include=["metadatas"])
+                    gone, kept = [], {}
+                    for cid, meta in zip(found["ids"], found["metadatas"]):
+                        listed, rest = drop_source(meta or {}, source)
+                        if not listed:
+                            continue
+                        if rest is None:
+                            gone.append(cid)
+                        else:
+                            kept[cid] = rest
+                    if kept:
+                        self.collection.update(ids=list(kept), metadatas=list(kept.values()))
+                    if gone:
+                        self.collection.delete(ids=gone)
+                    deleted += len(gone)
+                    if kept or gone:
+                        self._bump_version()
+            return deleted
+        except Exception as e:
+            print(f"Warning: Failed to release {len(ids)} chunks of {source}: {e}")
+            return deleted
+
+    def _upsert_new(self, chunks: List[Chunk], stats: IngestStats) -> None:
+        """Upsert the chunks not already stored; embedding is the expensive part.
+
+        A chunk already stored only gains the new documents in its sources.
+        Writers in every process take the store's file lock; readers never do.
+        """
+        try:
+            with self.write_lock:
+                found = self.collection.get(ids=[c.id for c in chunks], include=["metadatas"])
+                stored = dict(zip(found["ids"], found["metadatas"]))
+                fresh = [c for c in chunks if c.id not in stored]
+                stats.duplicates += len(chunks) - len(fresh)
+                merged = {c.id: merge_sources(stored[c.id] or {}, c.meta) for c in chunks if c.id in stored}
+                merged = {cid: meta for cid, meta in merged.items() if meta is not None}
+                if merged:
+                    self.collection.update(ids=list(merged), metadatas=list(merged.values()))
+                if fresh:
+                    self.collection.upsert(
+                        ids=[c.id for c in fresh],
+                        documents=[c.text for c in fresh],
+                        metadatas=[c.meta for c in fresh],
+                    )
+                    stats.upserted += len(fresh)
+                    stats.batches += 1
+                if fresh or merged:
+                    self._bump_version()
+        except Exception as e:
+            stats.failed += len(chunks)
+            stats.failed_ids.extend(c.id for c in chunks)
+            names = sorted({c.meta.get("name", "?") for c in chunks})
+            print(f"Warning: Failed to add {len(chunks)} chunks from {', '.join(names[:3])}: {e}")
+
+    def search(self, query: str, k: int = 5) -> List[Dict[str, Any]]:
+        return self.search_many([query], k)[0]
+
+    def search_many(self, queries: List[str], k: int = 5) -> List[List[Dict[str, Any]]]:
+        """Hits per query; cache misses go to the store in one batched collection.query call."""
+        if not queries or not self._exists():
+            return [[] for _ in queries]
+        n_results = min(k, 10)  # Cap at 10 results
+        version = self.version  # re-read each call: writes may come from other processes
+        disk = self._query_disk_cache()
+        keys = [fingerprint(version, str(n_results), q) for q in queries]
+
+        out: List[Optional[List[Dict[str, Any]]]] = []
+        for key in keys:
+            hits = self.query_cache.get(key)
+            if hits is None and disk is not None:
+                raw = disk.get(key)
+                if raw is not None:
+                    hits = json.loads(raw)
+                    self.query_cache.put(key, hits)
+            out.append(hits)
+
+        missing = list(dict.fromkeys(q for q, hits in zip(queries, out) if hits is None))
+        if missing:
+            fetched = dict(zip(missing, self._query(missing, n_results)))
+            for i, (q, key) in enumerate(zip(queries, keys)):
+                if out[i] is None:
+                    hits = fetched[q]
+                    out[i] = hits if hits is not None else []
+                    if hits is not None:
+                        self.query_cache.put(key, hits)
+                        if disk is not None:
+                            disk.put(key, json.dumps(hits))
+        return [[dict(h) for h in hits] for hits in out]
+
+    def _query(self, queries: List[str], n_results: int) -> List[Optional[List[Dict[str, Any]]]]:
+        """One batched query; None per query when it failed (failures are not cached)."""
+        try:
+            results = self.collection.query(query_texts=list(queries), n_results=n_results)
+        except Exception as e:
+            print(f"Warning: Search failed for {len(queries)} queries ({queries[0]!r}, ...): {e}")
+            return [None for _ in queries]
+
+        out: List[Optional[List[Dict[str, Any]]]] = []
+        for q in range(len(queries)):
+            ids = results["ids"][q] if results["ids"] and len(results["ids"]) > q else []
+            distances = results["distances"][q] if results.get("distances") else [0.0] * len(ids)
+            out.append([
+                {
+                    "id": ids[i],
+                    "text": results["documents"][q][i],
+                    "meta": results["metadatas"][q][i],
+                    "distance": distances[i],
+                }
+                for i in range(len(ids))
+            ])
+        return out
+
+    def count(self) -> int:
+        if not self._exists():
+            return 0
+        try:
+            return self.collection.count()
+        except Exception:
+            return 0
+
+    def clear(self) -> bool:
+        try:
+            with self.write_lock:
+                # Delete every document rather than the collection itself, so
+                # other processes' open handles stay valid
+                ids = self.collection.get(include=[])["ids"]
+                for i in range(0, len(ids), UPSERT_BATCH):
+                    self.collection.delete(ids=ids[i:i + UPSERT_BATCH])
+                self._bump_version()
+                (self.path / MANIFEST_NAME).unlink(missing_ok=True)
+            return True
+        except Exception as e:
+            print(f"Warning: Failed to clear library: {e}")
+            return False
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "total_docs": self.count(),
+            "storage_path": str(self.path),
+            "collection_name": self.collection_name,
+            "backend": self.backend,
+            "open": self.is_open,
+            "unavailable": self.unavailable,
+            "version": self.version,
+            "query_cache": self.query_cache.info(),
+            "query_disk_cache": self._disk_cache.info() if self._disk_cache is not None else None,
+            "write_lock_wait_s": round(self.write_lock.waited, 3),
+            "write_flushes": self._write_queue.flushes if self._write_queue is not None else 0,
+        }
+
+
+_store: Optional[VectorStore] = None
+_store_lock = threading.Lock()
+
+
+def get_store() -> VectorStore:
+    """The process-wide store; created (not opened) on first call."""
+    global _store
+    store = _store
+    if store is None:
+        with _store_lock:
+            if _store is None:
+                _store = VectorStore()
+            store = _store
+    return store
+
+
+def configure_store(
+    path: Optional[Path] = None,
+    client_factory: Optional[Callable[[Path], RetrievalBackend]] = None,
+    backend: Optional[str] = None,
+) -> VectorStore:
+    """Point the shared store somewhere else; the previous one is closed."""
+    global _store
+    with _store_lock:
+        old = _store
+        _store = VectorStore(path, client_factory=client_factory, backend=backend)
+        store = _store
+    if old is not None:
+        old.close()
+    return store
+
+
+def close_store() -> None:
+    """Close the shared store; the next use opens it again."""
+    if _store is not None:
+        _store.close()
+
+
+atexit.register(close_store)
+
+
+def _add_unique(pending: Dict[str, Chunk], chunk: Chunk) -> bool:
+    """Add chunk to pending by id; a repeat only adds its sources. Returns whether it was a repeat."""
+    first = pending.get(chunk.id)
+    if first is None:
+        pending[chunk.id] = chunk
+        return False
+    meta = merge_sources(first.meta, chunk.meta)
+    if meta is not None:
+        pending[chunk.id] = Chunk(chunk.id, first.text, meta)
+    return True
+
 
 def _hash(text: str) -> str:
     """Generate SHA1 hash for document ID"""
     return hashlib.sha1(text.encode('utf-8')).hexdigest()
 
+
 def add_doc(name: str, text: str, meta: Optional[Dict[str, Any]] = None) -> str:
     """
     Add a document to the vector store
@@ -38,26 +629,22 @@ def add_doc(name: str, text: str, meta: Optional[Dict[str, Any]] = None) -> str:
         meta: Additional metadata
     
     Returns:
-        Document ID
+        Document fingerprint (the doc_id in its chunks' sources), "" if nothing was written
     """
-    if not text.strip():
-        return ""
-    
-    doc_id = _hash(text)
-    metadata = {"name": name, "type": "design_doc"}
-    if meta:
-        metadata.update(meta)
-    
-    try:
-        collection.upsert(
-            ids=[doc_id],
-            documents=[text],
-            metadatas=[metadata]
-        )
-        return doc_id
-    except Exception as e:
-        print(f"Warning: Failed to add document {name}: {e}")
-        return ""
+    return get_store().add_doc(name, text, meta)
+
+def add_docs(docs: Iterable[Tuple[str, str, Optional[Dict[str, Any]]]], batch_size: int = UPSERT_BATCH) -> IngestStats:
+    """
+    Add many documents, chunked by section and token window
+
+    Args:
+        docs: (name, text, meta) tuples
+        batch_size: Chunks per upsert call
+
+    Returns:
+        Ingest statistics, including chunks/s
+    """
+    return get_store().add_docs(docs, batch_size=batch_size)
 
 def search(query: str, k: int = 5) -> List[Dict[str, Any]]:
     """
@@ -70,80 +657,47 @@ def search(query: str, k: int = 5) -> List[Dict[str, Any]]:
     Returns:
         List of search results with id, text, and metadata
     """
-    try:
-        results = collection.query(
-            query_texts=[query],
-            n_results=min(k, 10)  # Cap at 10 results
-        )
-        
-        hits = []
-        if results["ids"] and results["ids"][0]:
-            for i in range(len(results["ids"][0])):
-                hits.append({
-                    "id": results["ids"][0][i],
-                    "text": results["documents"][0][i],
-                    "meta": results["metadatas"][0][i],
-                    "distance": results["distances"][0][i] if results["distances"] else 0.0
-                })
-        
-        return hits
-    except Exception as e:
-        print(f"Warning: Search failed for query '{query}': {e}")
-        return []
+    return get_store().search(query, k)
 
 def get_doc_count() -> int:
     """Get total number of documents in the collection"""
-    try:
-        return collection.count()
-    except Exception:
-        return 0
+    return get_store().count()
 
 def clear_library() -> bool:
     """Clear all documents from the library"""
-    try:
-        # Delete and recreate collection
-        client.delete_collection("design_docs")
-        global collection
-        collection = client.get_or_create_collection(
-            name="design_docs",
-            metadata={"description": "Hardware design documents and specifications"}
-        )
-        return True
-    except Exception as e:
-        print(f"Warning: Failed to clear library: {e}")
-        return False
+    return get_store().clear()
 
 def get_library_stats() -> Dict[str, Any]:
     """Get library statistics"""
-    try:
-        count = collection.count()
-        return {
-            "total_docs": count,
-            "storage_path": str(STORAGE_DIR),
-            "collection_name": "design_docs"
-        }
-    except Exception:
-        return {
-            "total_docs": 0,
-            "storage_path": str(STORAGE_DIR),
-            "collection_name": "design_docs"
-        }
+    return get_store().stats()
+
+RRF_K = 60  # reciprocal rank fusion constant
 
-def search_context_for_entities(entities_text: str) -> str:
+
+def fuse_hits(results: List[List[Dict[str, Any]]], rrf_k: int = RRF_K) -> List[Dict[str, Any]]:
     """
-    Search for relevant context based on entities found in the design
-    
-    Args:
-        entities_text: Text containing detected entities
+    Merge per-query hit lists into one, deduplicated by id
     
-    Returns:
-        Context blob for LLM enhancement
+    Each hit scores 1 / (rrf_k + rank) per list it appears in, so documents
+    found by several terms rise to the top; ties keep first-seen order.
     """
-    # Extract key terms for search
+    fused: Dict[str, Dict[str, Any]] = {}
+    for hits in results:
+        for rank, hit in enumerate(hits):
+            entry = fused.get(hit["id"])
+            if entry is None:
+                entry = fused[hit["id"]] = {**hit, "score": 0.0, "matches": 0}
+            entry["score"] += 1.0 / (rrf_k + rank + 1)
+            entry["matches"] += 1
+            entry["distance"] = min(entry["distance"], hit["distance"])
+    return sorted(fused.values(), key=lambda h: -h["score"])
+    
+
+def extract_search_terms(entities_text: str) -> List[str]:
+    """Rails, part numbers, protocols and test commands worth looking up, in order"""
     search_terms = []
     
     # Look for voltage rails
-    import re
     voltage_matches = re.findall(r'\+?[0-9]+\.?[0-9]*V', entities_text.upper())
     search_terms.extend(voltage_matches)
     
@@ -156,18 +710,28 @@ def search_context_for_entities(entities_text: str) -> str:
     search_terms.extend(protocol_matches)
     
     # Look for test commands
-    test_matches = re.findall(r'\b(bit\.|test\.|check\.)\w+', entities_text.lower())
+    test_matches = re.findall(r'\b(?:bit\.|test\.|check\.)\w+', entities_text.lower())
     search_terms.extend(test_matches)
     
-    # Remove duplicates and search
-    unique_terms = list(set(search_terms))[:10]  # Limit to 10 unique terms
-    
-    context_parts = []
-    for term in unique_terms:
-        hits = search(term, k=2)
-        for hit in hits:
-            # Truncate long texts
-            text = hit["text"][:200] + "..." if len(hit["text"]) > 200 else hit["text"]
-            context_parts.append(f"[{hit['meta']['name']}] {text}")
-    
-    return "\n".join(context_parts[:20])  # Limit to 20 context items
+    # Remove duplicates, keeping first-seen order
+    return list(dict.fromkeys(search_terms))[:10]  # Limit to 10 unique terms
+
+
+def search_context_for_entities(entities_text: str, budget_chars: int = CONTEXT_CHARS) -> str:
+    """
+    Search for relevant context based on entities found in the design
+
+    All terms go to the store in one batched query; hits are fused by id,
+    then the most relevant non-redundant snippets are kept within the budget.
+
+    Args:
+        entities_text: Text containing detected entities
+        budget_chars: Size limit for the returned context
+
+    Returns:
+        Context blob for LLM enhancement
+    """
+    unique_terms = extract_search_terms(entities_text)
+    hits = fuse_hits(get_store().search_many(unique_terms, k=4))
+    selection = select_snippets(hits, budget_chars=budget_chars)
+    return "\n".join(f"[{hit['meta']['name']}] {hit['snippet']}" for hit in selection.hits)
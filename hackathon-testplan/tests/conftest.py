@@ -37,3 +37,16 @@ def sample_entities():
 def real_fixture(path_env: str) -> Path | None:
     p = os.getenv(path_env)
     return Path(p) if p and Path(p).exists() else None
+
+@pytest.fixture
+def fake_openai(monkeypatch):
+    """OpenAI-compatible stand-in server; the openai client is pointed at it."""
+    from tests.fake_openai import FakeOpenAIServer
+    server = FakeOpenAIServer().start()
+    monkeypatch.setenv("OPENAI_API_KEY", "test-key")
+    monkeypatch.setenv("OPENAI_BASE_URL", server.base_url)
+    monkeypatch.setenv("LLM_CACHE", "off")
+    import nlp.llm_client
+    monkeypatch.setattr(nlp.llm_client, "_clients", {})
+    yield server
+    server.stop()
@@ -0,0 +1,72 @@
+"""In-memory stand-in for a chromadb client, for tests without chromadb.
+
+Queries rank documents by shared words with the query; distance is
+1 / (1 + shared words), so lower is better as with Chroma.
+"""
+from __future__ import annotations
+import re
+from typing import Any, Dict, List, Optional
+
+
+def _words(text: str) -> set:
+    return set(re.findall(r"[a-z0-9.+]+", text.lower()))
+
+
+class FakeCollection:
+    def __init__(self, name: str):
+        self.name = name
+        self.docs: Dict[str, Dict[str, Any]] = {}
+        self.queries = 0  # query() calls, one per batch
+        self.upserts = 0
+
+    def upsert(self, ids: List[str], documents: List[str], metadatas: Optional[List[dict]] = None) -> None:
+        self.upserts += 1
+        metadatas = metadatas or [{} for _ in ids]
+        for doc_id, doc, meta in zip(ids, documents, metadatas):
+            self.docs[doc_id] = {"text": doc, "meta": dict(meta)}
+
+    def update(self, ids: List[str], metadatas: List[dict], **_) -> None:
+        for doc_id, meta in zip(ids, metadatas):
+            if doc_id in self.docs:
+                self.docs[doc_id]["meta"] = dict(meta)
+
+    def get(self, ids: Optional[List[str]] = None, include: Optional[list] = None, **_) -> Dict[str, list]:
+        found = [i for i in (ids if ids is not None else list(self.docs)) if i in self.docs]
+        return {"ids": found, "documents": [self.docs[i]["text"] for i in found], "metadatas": [self.docs[i]["meta"] for i in found]}
+
+    def delete(self, ids: List[str], **_) -> None:
+        for doc_id in ids:
+            self.docs.pop(doc_id, None)
+
+    def count(self) -> int:
+        return len(self.docs)
+
+    def query(self, query_texts: List[str], n_results: int = 10, **_) -> Dict[str, list]:
+        self.queries += 1
+        out: Dict[str, list] = {"ids": [], "documents": [], "metadatas": [], "distances": []}
+        for q in query_texts:
+            qw = _words(q)
+            ranked = sorted(
+                ((1.0 / (1 + len(qw & _words(d["text"]))), doc_id) for doc_id, d in self.docs.items()),
+            )[:n_results]
+            out["ids"].append([doc_id for _, doc_id in ranked])
+            out["documents"].append([self.docs[doc_id]["text"] for _, doc_id in ranked])
+            out["metadatas"].append([self.docs[doc_id]["meta"] for _, doc_id in ranked])
+            out["distances"].append([dist for dist, _ in ranked])
+        return out
+
+
+class FakeChromaClient:
+    def __init__(self, path=None):
+        self.path = path
+        self.collections: Dict[str, FakeCollection] = {}
+        self.closed = False
+
+    def get_or_create_collection(self, name: str, metadata: Optional[dict] = None) -> FakeCollection:
+        return self.collections.setdefault(name, FakeCollection(name))
+
+    def delete_collection(self, name: str) -> None:
+        self.collections.pop(name, None)
+
+    def close(self) -> None:
+        self.closed = True
@@ -0,0 +1,141 @@
+"""Local OpenAI-compatible stand-in server for tests and benchmarks.
+
+Serves POST /v1/chat/completions (plain and streamed) from a background
+thread. The reply echoes a short digest of the user prompt; prompts that
+contain FAIL get a 500 and prompts that contain SLOW sleep past most
+client timeouts.
+"""
+from __future__ import annotations
+import json
+import re
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Callable, List, Optional
+
+
+def default_reply(user_prompt: str) -> str:
+    first = user_prompt.splitlines()[0] if user_prompt else ""
+    return f"- Stand-in notes for: {first[:60]}"
+
+
+def batch_reply(user_prompt: str) -> str:
+    """One section per `### Board <id>` header; boards titled SKIP are left out."""
+    sections = []
+    for block in re.split(r"^### Board ", user_prompt, flags=re.MULTILINE)[1:]:
+        header, _, rest = block.partition("\n")
+        if "SKIP" in rest.split("\n\n")[0]:
+            continue
+        sections.append(f"=== BOARD {header.strip()} ===\n- Stand-in notes for board {header.strip()}")
+    return "\n\n".join(sections)
+
+
+class FakeOpenAIServer:
+    def __init__(self, delay: float = 0.0, slow_delay: float = 5.0, reply: Callable[[str], str] = default_reply):
+        self.delay = delay
+        self.slow_delay = slow_delay
+        self.reply = reply
+        self.requests: List[dict] = []
+        self.in_flight = 0
+        self.max_in_flight = 0
+        self.prompt_chars = 0
+        self._lock = threading.Lock()
+        self._httpd: Optional[ThreadingHTTPServer] = None
+        self._thread: Optional[threading.Thread] = None
+
+    @property
+    def base_url(self) -> str:
+        host, port = self._httpd.server_address[:2]
+        return f"http://{host}:{port}/v1"
+
+    def start(self) -> "FakeOpenAIServer":
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+
+            def log_message(self, *args):  # keep test output quiet
+                pass
+
+            def do_POST(self):
+                body = json.loads(self.rfile.read(int(self.headers.get("Content-Length", 0))) or b"{}")
+                server._handle(self, body)
+
+        self._httpd = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+        self._httpd.daemon_threads = True
+        self._thread = threading.Thread(target=self._httpd.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self) -> None:
+        if self._httpd is not None:
+            self._httpd.shutdown()
+            self._httpd.server_close()
+            self._httpd = None
+
+    def __enter__(self) -> "FakeOpenAIServer":
+        return self.start()
+
+    def __exit__(self, *exc) -> None:
+        self.stop()
+
+    def _handle(self, handler: BaseHTTPRequestHandler, body: dict) -> None:
+        messages = body.get("messages", [])
+        user = next((m["content"] for m in reversed(messages) if m.get("role") == "user"), "")
+        with self._lock:
+            self.requests.append(body)
+            self.prompt_chars += sum(len(m.get("content", "")) for m in messages)
+            self.in_flight += 1
+            self.max_in_flight = max(self.max_in_flight, self.in_flight)
+        try:
+            time.sleep(self.slow_delay if "SLOW" in user else self.delay)
+            if "FAIL" in user:
+                self._send(handler, 500, {"error": {"message": "stand-in failure", "type": "server_error"}})
+                return
+            text = self.reply(user)
+            if body.get("stream"):
+                self._stream(handler, body, text)
+            else:
+                self._send(handler, 200, {
+                    "id": "chatcmpl-fake",
+                    "object": "chat.completion",
+                    "created": int(time.time()),
+                    "model": body.get("model", "fake"),
+                    "choices": [{"index": 0, "finish_reason": "stop", "message": {"role": "assistant", "content": text}}],
+                    "usage": {"prompt_tokens": len(user) // 4, "completion_tokens": len(text) // 4, "total_tokens": (len(user) + len(text)) // 4},
+                })
+        except (BrokenPipeError, ConnectionResetError):
+            pass  # client gave up (timeout); nothing to send
+        finally:
+            with self._lock:
+                self.in_flight -= 1
+
+    @staticmethod
+    def _send(handler: BaseHTTPRequestHandler, status: int, payload: dict) -> None:
+        data = json.dumps(payload).encode()
+        handler.send_response(status)
+        handler.send_header("Content-Type", "application/json")
+        handler.send_header("Content-Length", str(len(data)))
+        handler.end_headers()
+        handler.wfile.write(data)
+
+    @staticmethod
+    def _stream(handler: BaseHTTPRequestHandler, body: dict, text: str) -> None:
+        handler.send_response(200)
+        handler.send_header("Content-Type", "text/event-stream")
+        handler.send_header("Connection", "close")
+        handler.end_headers()
+        words = text.split(" ")
+        for i, word in enumerate(words):
+            chunk = {
+                "id": "chatcmpl-fake",
+                "object": "chat.completion.chunk",
+                "created": int(time.time()),
+                "model": body.get("model", "fake"),
+                "choices": [{"index": 0, "delta": {"content": word + (" " if i < len(words) - 1 else "")}, "finish_reason": None}],
+            }
+            handler.wfile.write(f"data: {json.dumps(chunk)}\n\n".encode())
+            handler.wfile.flush()
+        handler.wfile.write(b"data: [DONE]\n\n")
+        handler.wfile.flush()
+        handler.close_connection = True
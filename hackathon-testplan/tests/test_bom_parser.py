@@ -17,3 +17,13 @@ def test_parse_bom_xlsx(tmp):
     rows = parse_bom(str(p))
     assert ("Y1","16MHz") in rows
     assert ("JP1","+5V") in rows
+
+def test_parse_bom_in_memory(tmp):
+    import io
+    from openpyxl import Workbook
+    csv_bytes = b"Ref,Value\nY1,16MHz\n"
+    assert parse_bom(csv_bytes) == parse_bom(io.BytesIO(csv_bytes), suffix=".csv") == [("Ref", "Value"), ("Y1", "16MHz")]
+    wb = Workbook(); wb.active.append(["JP1", "+5V"])
+    buf = io.BytesIO(); wb.save(buf)
+    assert parse_bom(buf.getvalue()) == [("JP1", "+5V")]  # sniffed as a workbook
+    assert parse_bom(memoryview(buf.getvalue()), suffix=".xlsx") == [("JP1", "+5V")]
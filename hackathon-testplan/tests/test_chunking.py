@@ -0,0 +1,28 @@
+from __future__ import annotations
+import pytest
+from storage.chunking import chunk_document, split_sections, token_windows
+
+DOC = """LoRa Node Datasheet
+1 Power Supply
+The board runs from a +5V input regulated to +3V3 for the MCU.
+2 Radio
+The SX1276 talks SPI to the MCU at 8 MHz.
+"""
+
+def test_sections_follow_headings():
+    titles = [t for t, _ in split_sections(DOC)]
+    assert titles == ["", "1 Power Supply", "2 Radio"]
+
+def test_windows_overlap_and_cover_all_tokens():
+    text = " ".join(f"w{i}" for i in range(25))
+    windows = list(token_windows(text, max_tokens=10, overlap=3))
+    assert [w.split()[0] for w in windows] == ["w0", "w7", "w14", "w21"]
+    assert windows[-1].split()[-1] == "w24"
+    with pytest.raises(ValueError):
+        list(token_windows(text, max_tokens=5, overlap=5))
+
+def test_repeated_sections_are_one_chunk():
+    chunks = chunk_document("ds.pdf", DOC + "\n1 Power Supply\n" + DOC.split("1 Power Supply\n")[1].split("2 Radio")[0])
+    texts = [c.text for c in chunks]
+    assert len(texts) == len(set(texts)) == 3
+    assert chunks[1].meta["section"] == "1 Power Supply" and chunks[1].meta["name"] == "ds.pdf"
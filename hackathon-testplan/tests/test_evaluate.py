@@ -0,0 +1,33 @@
+from __future__ import annotations
+import numpy as np
+import pytest
+from core.models import ParsedEntities
+from core.generator import generate_plan_offline
+from core.evaluate import evaluate_measurements, limit_table
+
+def test_limits_are_structured(sample_entities):
+    plan = generate_plan_offline(ParsedEntities.model_validate(sample_entities))
+    table = limit_table(plan)
+    assert table.step_ids == ["V1", "V2", "O1"]
+    assert table.units == ["V", "V", "Hz"]
+    assert table.low[0] == pytest.approx(4.9) and table.high[1] == pytest.approx(3.4)
+    assert table.low[2] == 15_900_000
+
+def test_vectorized_pass_fail(sample_entities):
+    plan = generate_plan_offline(ParsedEntities.model_validate(sample_entities))
+    boards = np.array([
+        [5.00, 3.30, 16_000_000],   # nominal
+        [5.20, 3.30, 16_000_000],   # +5V high
+        [5.05, np.nan, 16_050_000], # 3V3 not measured
+    ])
+    ev = evaluate_measurements(plan, boards)
+    assert ev.board_passed.tolist() == [True, False, False]
+    assert ev.failed.sum() == 1 and (~ev.measured).sum() == 1
+    assert ev.margin[1, 0] == pytest.approx(-0.1)
+    assert ev.margin_ratio[0, 2] == pytest.approx(1.0)
+    assert ev.step_yield()["V1"] == pytest.approx(2 / 3)
+
+def test_shape_mismatch_rejected(sample_entities):
+    plan = generate_plan_offline(ParsedEntities.model_validate(sample_entities))
+    with pytest.raises(ValueError):
+        evaluate_measurements(plan, np.zeros((4, 2)))
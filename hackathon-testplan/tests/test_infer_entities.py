@@ -1,5 +1,5 @@
 from __future__ import annotations
-from app.web import infer_entities_from_text
+from ingest.infer import infer_entities_from_text
 
 def test_infer_from_text_finds_rails_and_oscs():
     text = "Nets: +5V +3V3  Components: SX1276 LSM6DSOX MAX-M10S  Clocks: 16MHz, 32MHz"
@@ -0,0 +1,77 @@
+from __future__ import annotations
+import io, json, os, zipfile
+from concurrent.futures.process import BrokenProcessPool
+import pytest
+from app.jobs import JobManager
+import ingest.zip_loader as zip_loader
+from ingest.sources import parse_source, source_tasks
+
+def _zip(**members):
+    buf = io.BytesIO()
+    with zipfile.ZipFile(buf, "w") as zf:
+        for name, data in members.items():
+            zf.writestr(name.replace("_", "."), data)
+    return buf.getvalue()
+
+@pytest.fixture(scope="module")
+def jobs():
+    manager = JobManager(workers=2)
+    yield manager
+    manager.shutdown()
+
+def test_parse_source_in_memory():
+    data = json.dumps({"title": "Up", "rails": [{"name": "+5V", "voltage": 5.0}]}).encode()
+    assert parse_source("a.json", data)[0]["entities"].title == "Up"
+    assert parse_source("bom.csv", b"Ref,Value\nU1,ATmega328P\n")[0]["text"] == "Ref Value\nU1 ATmega328P"
+    pieces = parse_source("design.zip", _zip(bom_csv="U1,SX1276\n", board_net="327 5V U1\n", late_csv="U2,GPS\n"))
+    assert [p["kind"] for p in pieces] == ["note", "text", "entities", "text", "note"]  # every member is kept
+
+def test_zip_skips_unread_types_and_caps_size(monkeypatch):
+    data = _zip(bom_csv="U1,SX1276\n", photo_png=b"\x89PNG" * 1000)
+    assert [t[0] for t in source_tasks("design.zip", data)] == ["bom.csv"]
+    monkeypatch.setattr(zip_loader, "ZIP_MAX_MB", 0.001)
+    monkeypatch.setattr(zipfile.ZipFile, "read", lambda *a, **k: pytest.fail("member read before the size check"))
+    with pytest.raises(ValueError, match="ZIP_MAX_MB"):
+        source_tasks("big.zip", _zip(bom_csv="U1,SX1276\n" * 200))
+
+def test_jobs_match_inline_parse_and_are_cached(jobs):
+    data = _zip(bom_csv="U1,SX1276\n", notes_schdoc="Y1 16MHz", board_net="327 5V U1\n", late_csv="U2,GPS\n")
+    job_id = jobs.submit("design.zip", data)
+    assert jobs.wait([job_id], timeout=60)
+    job = jobs.get(job_id)
+    assert job.status == "done" and job.progress == 1.0 and job.total == 4
+    assert job.pieces() == parse_source("design.zip", data)
+    assert jobs.submit("design.zip", data) == job_id  # parsed once per content
+    assert jobs.stats()["results"]["hits"] == 1
+    assert jobs.submit("other.zip", data) != job_id
+
+def test_zip_is_split_in_a_worker(jobs, monkeypatch):
+    monkeypatch.setattr(zipfile.ZipFile, "read", lambda *a, **k: pytest.fail("archive decompressed in the caller"))
+    job_id = jobs.submit("split.zip", _zip(bom_csv="U1,SX1276\n", board_net="327 5V U1\n"))
+    assert jobs.wait([job_id], timeout=60)
+    assert jobs.get(job_id).labels == ["split.zip/bom.csv", "split.zip/board.net"]
+
+def test_job_reports_failures(jobs):
+    bad_id = jobs.submit("broken.zip", b"not a zip")
+    assert jobs.wait([bad_id], timeout=60)
+    bad = jobs.get(bad_id)
+    assert bad.status == "failed" and "BadZipFile" in bad.errors[0]
+    mixed = _zip(bad_json="{", bom_csv="U1,LSM6DSOX\n")
+    job_id = jobs.submit("mixed.zip", mixed)
+    assert jobs.wait([job_id], timeout=60)
+    job = jobs.get(job_id)
+    assert job.status == "done" and len(job.errors) == 1 and job.errors[0].startswith("mixed.zip/bad.json")
+    assert [p["kind"] for p in job.pieces()] == ["note", "text", "note"]
+    assert jobs.submit("mixed.zip", mixed) != job_id  # failures are not cached
+
+def test_pool_recovers_after_a_worker_dies():
+    manager = JobManager(workers=1)
+    try:
+        crash = manager._executor().submit(os._exit, 1)
+        with pytest.raises(BrokenProcessPool):
+            crash.result(timeout=60)
+        job_id = manager.submit("bom.csv", b"Ref,Value\nU1,ATmega328P\n")
+        assert manager.wait([job_id], timeout=60)
+        assert manager.get(job_id).status == "done"
+    finally:
+        manager.shutdown()
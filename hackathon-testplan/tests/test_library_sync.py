@@ -0,0 +1,100 @@
+from __future__ import annotations
+import subprocess, sys, zipfile
+from pathlib import Path
+from storage.chunking import chunk_sources
+from storage.library_sync import load_manifest, sync_library
+from storage.vectorstore import MANIFEST_NAME, VectorStore
+from tests.fake_chroma import FakeChromaClient
+
+def _docx(path: Path, paragraphs):
+    body = "".join(f"<w:p><w:r><w:t>{p}</w:t></w:r></w:p>" for p in paragraphs)
+    with zipfile.ZipFile(path, "w") as zf:
+        zf.writestr("word/document.xml", f'<w:document xmlns:w="w"><w:body>{body}</w:body></w:document>')
+
+def _library(tmp):
+    docs = tmp / "docs"
+    docs.mkdir()
+    (docs / "power.txt").write_text("1 Power\nThe +3.3V LDO feeds the MCU.\n\nLEGAL NOTICE\nShared boilerplate text.")
+    (docs / "radio.md").write_text("# Radio\nSX1276 on SPI.\n\nLEGAL NOTICE\nShared boilerplate text.")
+    _docx(docs / "spec.docx", ["HW Spec", "Crystal Y1 at 32 MHz"])
+    (docs / "image.png").write_bytes(b"\x89PNG")
+    return docs
+
+def test_incremental_sync_and_prune(tmp):
+    docs = _library(tmp)
+    client = FakeChromaClient()
+    store = VectorStore(tmp / "lib", client_factory=lambda path: client)
+    first = sync_library(docs, store, workers=0)
+    assert (first.scanned, first.added, first.failed) == (3, 3, 0)
+    coll = client.collections["design_docs"]
+    assert any("Crystal Y1" in d["text"] for d in coll.docs.values())
+    stored = coll.count()
+
+    again = sync_library(docs, store, workers=0)
+    assert again.unchanged == 3 and again.ingest.upserted == 0 and coll.count() == stored
+
+    (docs / "radio.md").write_text("# Radio\nSX1262 on SPI.\n\nLEGAL NOTICE\nShared boilerplate text.")
+    (docs / "power.txt").unlink()
+    third = sync_library(docs, store, workers=0)
+    assert (third.updated, third.removed) == (1, 1)
+    texts = [d["text"] for d in coll.docs.values()]
+    assert not any("SX1276" in t or "LDO" in t for t in texts)
+    assert any("boilerplate" in t for t in texts)  # still referenced by radio.md
+    shared = next(d["meta"] for d in coll.docs.values() if "boilerplate" in d["text"])
+    assert shared["name"] == "radio.md" and [s["name"] for s in chunk_sources(shared)] == ["radio.md"]
+    manifest = load_manifest(store.path / MANIFEST_NAME)
+    assert sorted(Path(k).name for k in manifest) == ["radio.md", "spec.docx"]
+
+def test_prune_keeps_chunks_added_outside_the_sync(tmp):
+    docs = tmp / "docs"
+    docs.mkdir()
+    text = "The board runs from a +5V input regulated to +3.3V."
+    store = VectorStore(tmp / "lib", client_factory=lambda path: FakeChromaClient())
+    store.add_doc("manual.md", text)
+    (docs / "copy.md").write_text(text)
+    assert sync_library(docs, store, workers=0).added == 1
+    (docs / "copy.md").unlink()
+    pruned = sync_library(docs, store, workers=0)
+    assert (pruned.removed, pruned.chunks_deleted) == (1, 0) and store.count() == 1
+    assert [s["name"] for s in chunk_sources(store.search("+3.3V", k=1)[0]["meta"])] == ["manual.md"]
+
+def test_pool_extraction_and_cli(tmp):
+    docs = _library(tmp)
+    stats = sync_library(docs, VectorStore(tmp / "pool", backend="local"), workers=2)
+    assert stats.added == 3 and stats.ingest.upserted > 0
+    out = subprocess.run(
+        [sys.executable, "-m", "app.cli", "library", "--store", str(tmp / "cli"), "--backend", "local", "sync", str(docs), "--workers", "0"],
+        cwd=Path(__file__).parent.parent, capture_output=True, text=True,
+    )
+    assert out.returncode == 0, out.stderr
+    assert "3 added" in out.stdout
+
+def test_failed_upsert_is_retried_on_next_sync(tmp, monkeypatch):
+    docs = _library(tmp)
+    client = FakeChromaClient()
+    store = VectorStore(tmp / "lib", client_factory=lambda path: client)
+    store.add_doc("other.txt", "A document synced from elsewhere.")
+    coll = client.collections["design_docs"]
+    real_upsert = coll.upsert
+
+    def fail_once(*args, **kwargs):
+        monkeypatch.setattr(coll, "upsert", real_upsert)
+        raise RuntimeError("store offline")
+
+    monkeypatch.setattr(coll, "upsert", fail_once)
+    failed = sync_library(docs, store, workers=0)
+    assert (failed.added, failed.failed) == (0, 3)
+    assert load_manifest(store.path / MANIFEST_NAME) == {}
+    retried = sync_library(docs, store, workers=0)
+    assert (retried.added, retried.unchanged, retried.failed) == (3, 0, 0)
+    assert any("Crystal Y1" in d["text"] for d in coll.docs.values())
+
+    (docs / "radio.md").write_text("# Radio\nSX1262 on SPI.\n\nLEGAL NOTICE\nShared boilerplate text.")
+    monkeypatch.setattr(coll, "upsert", fail_once)
+    update = sync_library(docs, store, workers=0)
+    assert (update.updated, update.failed, update.chunks_deleted) == (0, 1, 0)
+    assert any("SX1276" in d["text"] for d in coll.docs.values())  # the old version stays searchable
+    update = sync_library(docs, store, workers=0)
+    assert (update.updated, update.failed) == (1, 0)
+    texts = [d["text"] for d in coll.docs.values()]
+    assert any("SX1262" in t for t in texts) and not any("SX1276" in t for t in texts)
@@ -0,0 +1,37 @@
+from __future__ import annotations
+import asyncio
+import time
+from core.models import ParsedEntities
+from nlp.llm_async import AsyncRateLimiter, enhance_plans
+
+def _boards(sample_entities, titles):
+    return [ParsedEntities.model_validate({**sample_entities, "title": t}) for t in titles]
+
+def test_batch_runs_concurrently_with_fallback(fake_openai, sample_entities):
+    fake_openai.delay = 0.2
+    titles = [f"Board {i}" for i in range(12)] + ["FAIL board"]
+    start = time.perf_counter()
+    results = enhance_plans(_boards(sample_entities, titles), concurrency=4, timeout=5)
+    elapsed = time.perf_counter() - start
+    assert [r.plan.title for r in results] == [f"Bring-Up & Test Plan — {t}" for t in titles]
+    assert all(r.report.status == "enhanced" for r in results[:-1])
+    assert "Stand-in notes" in results[0].plan.notes
+    failed = results[-1]
+    assert failed.report.status == "failed" and "LLM Enhancements" not in failed.plan.notes
+    assert fake_openai.max_in_flight <= 4
+    assert elapsed < 13 * 0.2 / 2  # well under the serial time
+
+def test_per_request_timeout_falls_back(fake_openai, sample_entities):
+    fake_openai.slow_delay = 2.0
+    results = enhance_plans(_boards(sample_entities, ["SLOW board", "Fast board"]), timeout=0.3)
+    assert results[0].report.status == "failed" and "timed out" in results[0].report.reason
+    assert results[1].report.enhanced
+
+def test_rate_limiter_spaces_requests():
+    async def run():
+        limiter = AsyncRateLimiter(rate=20, burst=1)
+        start = asyncio.get_running_loop().time()
+        for _ in range(5):
+            await limiter.acquire()
+        return asyncio.get_running_loop().time() - start
+    assert asyncio.run(run()) >= 4 / 20 * 0.9
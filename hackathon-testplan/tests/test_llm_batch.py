@@ -0,0 +1,32 @@
+from __future__ import annotations
+from core.models import ParsedEntities
+from nlp.llm_batch import generate_plans_llm_batch, group_boards, split_batch_response
+from tests.fake_openai import batch_reply
+
+def _boards(sample_entities, titles):
+    return [ParsedEntities.model_validate({**sample_entities, "title": t}) for t in titles]
+
+def test_split_batch_response_maps_sections():
+    text = "preamble\n=== BOARD B1 ===\n- one\n\n=== BOARD B9 ===\n- stray\n=== BOARD B2 ===\n- two\n"
+    assert split_batch_response(text, ["B1", "B2", "B3"]) == {"B1": "- one", "B2": "- two"}
+
+def test_group_boards_respects_count_and_tokens():
+    assert group_boards(["a b c"] * 5, max_boards=2) == [[0, 1], [2, 3], [4]]
+    assert group_boards(["word " * 50, "x", "word " * 50], max_tokens=70) == [[0, 1], [2]]
+
+def test_boards_share_one_request(fake_openai, sample_entities):
+    fake_openai.reply = batch_reply
+    titles = [f"Board {i}" for i in range(4)]
+    results = generate_plans_llm_batch(_boards(sample_entities, titles), max_boards=8, timeout=5)
+    assert len(fake_openai.requests) == 1
+    assert [r.plan.title for r in results] == [f"Bring-Up & Test Plan — {t}" for t in titles]
+    assert all(r.report.status == "enhanced" for r in results)
+    assert "Stand-in notes for board B3" in results[2].plan.notes
+
+def test_board_missing_from_response_falls_back(fake_openai, sample_entities):
+    fake_openai.reply = batch_reply
+    results = generate_plans_llm_batch(_boards(sample_entities, ["Board A", "SKIP board", "Board C"]), max_boards=2, timeout=5)
+    assert len(fake_openai.requests) == 2
+    assert results[0].report.enhanced and results[2].report.enhanced
+    assert results[1].report.status == "failed" and "missing" in results[1].report.reason
+    assert "LLM Enhancements" not in results[1].plan.notes
@@ -0,0 +1,56 @@
+from __future__ import annotations
+import time
+from types import SimpleNamespace
+import nlp.llm_client as llm_client
+from core.cache import DiskCache
+from core.models import ParsedEntities
+
+class FakeOpenAI:
+    calls = 0
+
+    def __init__(self, **kwargs):
+        self.chat = SimpleNamespace(completions=SimpleNamespace(create=self._create))
+
+    def _create(self, **kwargs):
+        FakeOpenAI.calls += 1
+        msg = SimpleNamespace(content=f"enhanced #{FakeOpenAI.calls}")
+        return SimpleNamespace(choices=[SimpleNamespace(message=msg)])
+
+def _setup(monkeypatch, tmp):
+    FakeOpenAI.calls = 0
+    monkeypatch.setenv("OPENAI_API_KEY", "test")
+    monkeypatch.setattr(llm_client, "OpenAI", FakeOpenAI)
+    monkeypatch.setattr(llm_client, "_clients", {})
+    monkeypatch.setattr(llm_client, "search_context_for_entities", lambda text: "")
+    cache = DiskCache(tmp / "llm.sqlite3", ttl=None, max_entries=10)
+    monkeypatch.setattr(llm_client, "_response_cache", cache)
+    return cache
+
+def test_repeat_generation_hits_cache(monkeypatch, tmp, sample_entities):
+    cache = _setup(monkeypatch, tmp)
+    ent = ParsedEntities.model_validate(sample_entities)
+    first = llm_client.generate_plan_llm(ent)
+    second = llm_client.generate_plan_llm(ent)
+    assert FakeOpenAI.calls == 1
+    assert "enhanced #1" in first.notes and "enhanced #1" in second.notes
+    assert cache.info()["hits"] == 1
+
+def test_refresh_and_bypass(monkeypatch, tmp, sample_entities):
+    _setup(monkeypatch, tmp)
+    ent = ParsedEntities.model_validate(sample_entities)
+    llm_client.generate_plan_llm(ent)
+    refreshed = llm_client.generate_plan_llm(ent, refresh=True)
+    assert "enhanced #2" in refreshed.notes
+    assert "enhanced #2" in llm_client.generate_plan_llm(ent).notes
+    llm_client.generate_plan_llm(ent, use_cache=False)
+    assert FakeOpenAI.calls == 3
+
+def test_disk_cache_ttl_and_lru(tmp):
+    cache = DiskCache(tmp / "c.sqlite3", ttl=0.05, max_entries=2)
+    cache.put("a", "1"); cache.put("b", "2")
+    assert cache.get("a") == "1"
+    cache.put("c", "3")  # evicts b, the least recently used
+    assert cache.get("b") is None and cache.get("a") == "1"
+    time.sleep(0.06)
+    assert cache.get("c") is None
+    assert cache.info()["expired"] == 1 and cache.info()["evictions"] == 1
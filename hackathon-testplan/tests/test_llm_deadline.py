@@ -0,0 +1,64 @@
+from __future__ import annotations
+import threading
+import time
+import nlp.llm_client as llm_client
+from core.models import ParsedEntities
+from nlp.llm_client import generate_plan_llm_report
+
+def _ent(sample_entities, title):
+    return ParsedEntities.model_validate({**sample_entities, "title": title})
+
+def test_enhances_within_budget(fake_openai, sample_entities):
+    plan, report = generate_plan_llm_report(_ent(sample_entities, "Quick"), budget_s=5)
+    assert report.status == "enhanced" and report.attempts == 1
+    assert "LLM Enhancements" in plan.notes
+    assert {"offline", "retrieval", "cache", "completion", "total"} <= set(report.stages)
+
+def test_slow_completion_returns_offline_plan_at_deadline(fake_openai, sample_entities):
+    fake_openai.slow_delay = 3.0
+    start = time.perf_counter()
+    plan, report = generate_plan_llm_report(_ent(sample_entities, "SLOW"), budget_s=1.0)
+    assert time.perf_counter() - start < 2.0
+    assert not report.enhanced and report.reason
+    assert "LLM Enhancements" not in plan.notes
+
+def test_server_errors_are_retried_while_budget_remains(fake_openai, monkeypatch, sample_entities):
+    monkeypatch.setattr(llm_client, "LLM_BACKOFF_BASE_S", 0.01)
+    plan, report = generate_plan_llm_report(_ent(sample_entities, "FAIL"), budget_s=5)
+    assert report.status == "failed" and "InternalServerError" in report.reason
+    assert report.attempts == llm_client.LLM_MAX_RETRIES + 1
+    assert len(fake_openai.requests) == report.attempts
+
+def test_slow_retrieval_skips_enhancement(fake_openai, monkeypatch, sample_entities):
+    monkeypatch.setattr(llm_client, "search_context_for_entities", lambda text: time.sleep(2) or "")
+    start = time.perf_counter()
+    plan, report = generate_plan_llm_report(_ent(sample_entities, "Cold store"), budget_s=0.3)
+    assert time.perf_counter() - start < 1.0
+    assert "retrieval" in report.reason and not fake_openai.requests
+
+def test_hung_retrievals_do_not_starve_later_enhancements(fake_openai, monkeypatch, sample_entities):
+    monkeypatch.setattr(llm_client, "LLM_RETRIEVAL_WORKERS", 1)
+    monkeypatch.setattr(llm_client, "_retrieval_pool", None)
+    monkeypatch.setattr(llm_client, "_retrieval_slots", None)
+    store_back = threading.Event()
+    monkeypatch.setattr(llm_client, "search_context_for_entities", lambda text: store_back.wait(5) and "")
+    _, hung = generate_plan_llm_report(_ent(sample_entities, "Cold store"), budget_s=0.2)
+    assert "exceeded" in hung.reason
+    _, busy = generate_plan_llm_report(_ent(sample_entities, "Cold store again"), budget_s=0.2)
+    assert "busy" in busy.reason and not fake_openai.requests
+    store_back.set()
+    _, report = generate_plan_llm_report(_ent(sample_entities, "Warm store"), budget_s=5)
+    assert report.status == "enhanced"
+
+def test_stream_enhancement_yields_tokens(fake_openai, sample_entities):
+    report = llm_client.EnhancementReport()
+    chunks = list(llm_client.stream_enhancement(_ent(sample_entities, "Streamed"), report, budget_s=5))
+    assert len(chunks) > 1
+    assert "".join(chunks).startswith("- Stand-in notes for:")
+    assert report.status == "enhanced" and "first_token" in report.stages
+    assert fake_openai.requests[0]["stream"] is True
+
+def test_stream_enhancement_reports_failure(fake_openai, sample_entities):
+    report = llm_client.EnhancementReport()
+    assert list(llm_client.stream_enhancement(_ent(sample_entities, "FAIL"), report, budget_s=5)) == []
+    assert report.status == "failed" and report.reason
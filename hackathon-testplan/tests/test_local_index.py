@@ -0,0 +1,62 @@
+from __future__ import annotations
+import pytest
+import storage.local_index as li
+from storage.local_index import LocalIndexClient, tokenize
+from storage.vectorstore import VectorStore, resolve_backend
+
+DOCS = {
+    "p": "The +3.3V LDO feeds the MCU; +5V comes from USB.",
+    "r": "SX1276 radio on SPI. Run bit.radio to check the link.",
+    "c": "Crystal Y1 at 32.768 kHz; load capacitors 12 pF.",
+}
+
+def _coll(path, vectors=False):
+    return LocalIndexClient(path, vectors=vectors).get_or_create_collection("docs")
+
+def test_tokenize_keeps_part_names():
+    assert tokenize("+3.3V on VDD_3V3, bit.radio!") == ["3.3v", "on", "vdd_3v3", "bit.radio"]
+
+@pytest.mark.parametrize("vectors", [False, True])
+def test_bm25_ranking_and_persistence(tmp, vectors):
+    coll = _coll(tmp, vectors)
+    coll.upsert(ids=list(DOCS), documents=list(DOCS.values()), metadatas=[{"name": k} for k in DOCS])
+    res = coll.query(["SX1276 SPI", "3.3V"], n_results=2)
+    assert res["ids"][0][0] == "r" and res["ids"][1][0] == "p"
+    assert res["metadatas"][0][0] == {"name": "r"} and 0 < res["distances"][0][0] < 1
+    reopened = _coll(tmp, vectors=not vectors)  # the stored layout wins
+    assert reopened.count() == 3 and reopened.query(["crystal"], 1)["ids"] == [["c"]]
+    assert reopened.get(ids=["c", "zz"], include=[]) == {"ids": ["c"]}
+
+def test_replace_delete_and_cross_instance_refresh(tmp):
+    writer, reader = _coll(tmp), _coll(tmp)
+    writer.upsert(ids=list(DOCS), documents=list(DOCS.values()))
+    assert reader.count() == 3  # sees the other instance's write
+    writer.upsert(ids=["r"], documents=["LoRa transceiver, no radio part number here"])
+    writer.delete(ids=["c"])
+    assert reader.query(["SX1276"], 3)["ids"] == [[]]
+    assert reader.get()["ids"] == ["p", "r"] and reader.get(ids=["r"])["documents"][0].startswith("LoRa")
+
+def test_update_rewrites_metadata_and_keeps_doc_findable(tmp):
+    coll = _coll(tmp)
+    coll.upsert(ids=["r"], documents=[DOCS["r"]], metadatas=[{"name": "a"}])
+    coll.update(ids=["r", "zz"], metadatas=[{"name": "b"}, {"name": "z"}])
+    assert coll.count() == 1 and coll.get()["metadatas"] == [{"name": "b"}]
+    assert coll.query(["SX1276"], 1)["ids"] == [["r"]]  # the replaced row does not skew its term's df
+
+def test_segments_merge_without_losing_docs(tmp, monkeypatch):
+    monkeypatch.setattr(li, "MAX_SEGMENTS", 3)
+    coll = _coll(tmp, vectors=True)
+    for i in range(10):
+        coll.upsert(ids=[f"d{i}"], documents=[f"chunk number w{i} shared"])
+    coll.delete(ids=["d0"])
+    assert len(list(tmp.glob("local/docs/seg_*"))) <= 4
+    assert coll.query(["w7"], 1)["ids"] == [["d7"]]
+    assert set(coll.query(["shared"], 20)["ids"][0]) == {f"d{i}" for i in range(1, 10)}
+
+def test_store_selects_local_backend(tmp):
+    with pytest.raises(ValueError):
+        resolve_backend("nope")
+    store = VectorStore(tmp / "lib", backend="local")
+    store.add_docs([("radio.pdf", DOCS["r"], None), ("power.pdf", DOCS["p"], None)])
+    assert store.stats()["backend"] == "local" and store.count() == 2
+    assert store.search("SX1276")[0]["meta"]["name"] == "radio.pdf"
@@ -0,0 +1,39 @@
+from __future__ import annotations
+import time
+from core.models import FunctionalTest, Oscillator, ParsedEntities, PowerRail
+from ingest.merge import merge_entities, rail_key
+
+def test_rail_keys_normalize_names():
+    assert rail_key("+3V3") == rail_key("3.3V") == rail_key("3v30") == "3V3"
+    assert rail_key("+5V") == rail_key("5.0V") == "5V"
+    assert rail_key("VCC_AUX") == rail_key("vcc aux") != rail_key("VCC")
+
+def test_merge_deduplicates_and_reports_conflicts():
+    netlist = ParsedEntities(title="Unknown Board", rails=[PowerRail(name="+3V3", voltage=3.3)],
+                             functional_tests=[FunctionalTest(name="LoRa BIT")])
+    bom = ParsedEntities(title="", rails=[PowerRail(name="3.3V", voltage=3.3), PowerRail(name="+5V", voltage=5.0)],
+                         oscillators=[Oscillator(ref="Y1", frequency_hz=16e6)],
+                         functional_tests=[FunctionalTest(name="lora  bit", command="bit.lora", expected="PASS")])
+    pdf = ParsedEntities(title="Radio", oscillators=[Oscillator(ref="y1", frequency_hz=32e6)])
+    result = merge_entities([("board.net", netlist), ("bom.csv", bom), ("manual.pdf", pdf)])
+    ent = result.entities
+    assert ent.title == "Radio"
+    assert [r.name for r in ent.rails] == ["+3V3", "+5V"] and [o.frequency_hz for o in ent.oscillators] == [16e6]
+    assert ent.functional_tests[0].name == "LoRa BIT" and ent.functional_tests[0].command == "bit.lora"  # gaps filled
+    assert result.duplicates == 2 and result.sources == {"board.net": 2, "bom.csv": 2, "manual.pdf": 0}
+    [conflict] = result.conflicts
+    assert (conflict.kind, conflict.key, conflict.field, conflict.kept, conflict.other_source) == ("oscillator", "Y1", "frequency_hz", 16e6, "manual.pdf")
+    assert netlist.functional_tests[0].command is None  # inputs are not modified
+
+def test_merge_is_linear():
+    def source(n, offset):
+        return ParsedEntities(rails=[PowerRail(name=f"R{i}", voltage=1.0) for i in range(offset, offset + n)],
+                              functional_tests=[FunctionalTest(name=f"T{i}") for i in range(offset, offset + n)])
+    timings = []
+    for n in (2_000, 16_000):
+        sources = [(f"s{k}", source(n // 4, k * n // 8)) for k in range(4)]
+        start = time.perf_counter()
+        result = merge_entities(sources)
+        timings.append(time.perf_counter() - start)
+        assert len(result.entities.rails) == n // 8 * 3 + n // 4 and not result.conflicts
+    assert timings[1] < timings[0] * 8 * 3  # 8x the entities, nowhere near 64x the time
@@ -20,3 +20,31 @@ def test_parse_netlist_basic(tmp, write):
     names = {r.name for r in ent.rails}
     assert "5V" in "".join(names)
     assert any("3V3" in n for n in names)
+
+def test_netlist_validators(tmp, write):
+    from ingest.netlist_parser import load_netlist
+    from rules.validator import run_netlist_rules
+    p = write("board.d356", SAMPLE_D356 + "327 5V TP1\n327 VCC_AUX U9\n327 SPARE1 J1\n")
+    ent, index = load_netlist(str(p))
+    assert index.pin_count("5V") == 3 and index.refs_on("Y1") == {"U5"}
+    report = run_netlist_rules(ent, index)
+    assert report.by_rule["rail_loads"] == ["Rail VCC_AUX connects only one pin; it has no loads"]
+    assert report.by_rule["rail_test_points"] == [
+        "Rail 3V3 has no test point (TP*) on its net",
+        "Rail VCC_AUX has no test point (TP*) on its net",
+    ]
+    assert "SPARE1" in report.by_rule["orphan_nets"][0]
+    assert report.by_rule["crystal_connectivity"] == []
+
+def test_parse_netlist_from_memory(tmp, write):
+    import io, zipfile
+    from ingest.zip_loader import iter_zip
+    from_path = parse_netlist(str(write("board.d356", SAMPLE_D356)))
+    data = SAMPLE_D356.encode()
+    assert parse_netlist(data) == parse_netlist(io.BytesIO(data)) == from_path
+    buf = io.BytesIO()
+    with zipfile.ZipFile(buf, "w") as zf:
+        zf.writestr("nets/board.d356", data); zf.writestr("empty/", b"")
+    members = list(iter_zip(buf.getvalue()))
+    assert [name for name, _ in members] == ["nets/board.d356"]
+    assert parse_netlist(members[0][1]) == from_path
@@ -0,0 +1,42 @@
+from __future__ import annotations
+from core.cache import LRUCache
+from core.models import ParsedEntities
+from core.generator import (
+    clear_plan_cache, entities_fingerprint, generate_plan_offline, plan_cache_info,
+)
+
+def test_fingerprint_is_content_based(sample_entities):
+    a = ParsedEntities.model_validate(sample_entities)
+    b = ParsedEntities.model_validate(sample_entities)
+    assert entities_fingerprint(a) == entities_fingerprint(b)
+    b.rails[0].tolerance_mv = 50
+    assert entities_fingerprint(a) != entities_fingerprint(b)
+
+def test_unchanged_plan_is_reused_but_not_shared(sample_entities):
+    clear_plan_cache()
+    ent = ParsedEntities.model_validate(sample_entities)
+    first = generate_plan_offline(ent)
+    first.notes += "\nmutated by caller"
+    second = generate_plan_offline(ParsedEntities.model_validate(sample_entities))
+    assert plan_cache_info()["plans"]["hits"] == 1
+    assert "mutated by caller" not in second.notes
+    assert second.to_markdown() == generate_plan_offline(ent).to_markdown()
+
+def test_one_changed_section_reuses_the_others(sample_entities):
+    clear_plan_cache()
+    generate_plan_offline(ParsedEntities.model_validate(sample_entities))
+    sample_entities["rails"].append({"name": "+1V8", "voltage": 1.8, "tolerance_mv": 50})
+    plan = generate_plan_offline(ParsedEntities.model_validate(sample_entities))
+    info = plan_cache_info()
+    assert info["plans"]["misses"] == 2
+    # oscillator, functional and negative sections come from the cache
+    assert info["sections"]["hits"] == 3
+    assert "1.75–1.85 V" in plan.to_markdown()
+
+def test_lru_evicts_oldest():
+    cache = LRUCache(maxsize=2)
+    cache.put("a", 1); cache.put("b", 2)
+    assert cache.get("a") == 1
+    cache.put("c", 3)
+    assert "b" not in cache and "a" in cache
+    assert cache.info()["evictions"] == 1
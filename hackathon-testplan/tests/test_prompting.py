@@ -0,0 +1,34 @@
+from __future__ import annotations
+from core.models import ParsedEntities
+from nlp.prompting import build_user_prompt, compact_user_prompt, estimate_tokens
+
+def _big_board():
+    rails = [{"name": f"+3V3_{i}", "voltage": 3.3, "tolerance_mv": 100} for i in range(300)]
+    rails += [{"name": f"+1V8_{i}", "voltage": 1.8, "tolerance_mv": 50} for i in range(100)]
+    tests = [{"name": f"GPS BIT {i}", "command": "bit.gps"} for i in range(50)]
+    tests.append({"name": "IMU BIT", "command": "bit.imu"})
+    return ParsedEntities(title="Big", rails=rails, functional_tests=tests)
+
+def test_small_prompt_is_untouched(sample_entities):
+    ent = ParsedEntities.model_validate(sample_entities)
+    out = compact_user_prompt(ent, context="[ds] +5V rail", budget_tokens=3000)
+    assert not out.compacted
+    assert out.prompt.startswith(build_user_prompt(ent))
+    assert "[ds] +5V rail" in out.prompt
+
+def test_large_prompt_fits_budget():
+    ent = _big_board()
+    context = "\n".join(["[ds] IMU bit.imu self-test procedure"] + [f"[other] unrelated filler text number {i}" for i in range(200)])
+    out = compact_user_prompt(ent, context=context, budget_tokens=600)
+    assert out.tokens_before > 600 >= out.tokens_after
+    assert out.compacted and out.trimmed_tokens > 0
+    assert out.rail_lines == 2 and out.rails_in == 400
+    assert out.tests_deduped == 49
+    assert "(300 rails)" in out.prompt and "GPS BIT 0: cmd=bit.gps (×50)" in out.prompt
+    # the relevant snippet outranks the filler
+    assert out.snippets_kept < out.snippets_in
+    assert "[ds] IMU bit.imu" in out.prompt
+
+def test_estimate_tokens_is_reasonable():
+    assert estimate_tokens("") == 0
+    assert 8 <= estimate_tokens("Measure rail +3V3 at TP4: 3.30 V ±100 mV") <= 25
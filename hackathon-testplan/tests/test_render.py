@@ -0,0 +1,58 @@
+from __future__ import annotations
+import csv
+import io
+import json
+import xml.etree.ElementTree as ET
+from core.models import ParsedEntities
+from core.generator import generate_plan_offline
+from core.render import render_plan, write_plan
+
+def _plan(sample_entities):
+    return generate_plan_offline(ParsedEntities.model_validate(sample_entities))
+
+def test_markdown_stream_matches_to_markdown(sample_entities):
+    plan = _plan(sample_entities)
+    buf = io.StringIO()
+    render_plan(plan, buf, "md")
+    assert buf.getvalue() == plan.to_markdown()
+
+def test_csv_one_row_per_step(sample_entities):
+    plan = _plan(sample_entities)
+    buf = io.StringIO(newline="")
+    render_plan(plan, buf, "csv")
+    rows = list(csv.DictReader(io.StringIO(buf.getvalue())))
+    assert len(rows) == len(plan.steps)
+    assert rows[0]["id"] == "S0"
+    assert any("4.90–5.10 V" in r["expected"] for r in rows)
+
+def test_jsonl_round_trip(sample_entities):
+    plan = _plan(sample_entities)
+    buf = io.StringIO()
+    render_plan(plan, buf, "jsonl")
+    records = [json.loads(line) for line in buf.getvalue().splitlines()]
+    assert [r["step"]["id"] for r in records] == [s.id for s in plan.steps]
+    assert records[0]["plan"] == plan.title
+
+def test_junit_is_well_formed(tmp, sample_entities):
+    plan = _plan(sample_entities)
+    plan.notes += "\n<b>&\x01</b>"
+    out = write_plan(plan, tmp / "plan.xml")
+    assert out == "junit"
+    root = ET.parse(tmp / "plan.xml").getroot()
+    assert root.get("tests") == str(len(plan.steps))
+    assert len(root.findall("./testsuite/testcase")) == len(plan.steps)
+    suites = [s.get("name") for s in root.findall("./testsuite")]
+    assert suites[:2] == ["Setup", "Visual Inspection"] and suites[-1] == "Notes"
+
+def test_plan_index_pages_search_and_groups(sample_entities):
+    from core.plan_view import PlanIndex, step_markdown
+    plan = _plan(sample_entities)
+    index = PlanIndex(plan)
+    everything = index.search("  ")
+    assert everything == list(range(len(plan.steps))) and sum(map(len, index.sections.values())) == len(index)
+    assert index.page(everything, 99, 5) == everything[(index.page_count(len(index), 5) - 1) * 5:]  # clamped
+    hits = index.search("dmm GND")
+    assert hits and all("dmm" in (plan.steps[i].equipment or "").lower() for i in hits)
+    groups = index.grouped(everything)
+    assert [s for _, steps in groups for s in steps] == plan.steps
+    assert "\n\n".join(step_markdown(s) for s in plan.steps[:2]) in plan.to_markdown().replace(f"## {plan.steps[1].section}\n", "")
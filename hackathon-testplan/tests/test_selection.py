@@ -0,0 +1,23 @@
+from __future__ import annotations
+from storage.selection import minhash, select_snippets, similarity
+
+PARA = "The +3.3V rail is produced by an LDO and must stay within 3 percent of nominal at full load."
+
+def _hit(i, text, distance, name="ds.pdf"):
+    return {"id": str(i), "text": text, "meta": {"name": name}, "distance": distance}
+
+def test_minhash_estimates_overlap():
+    assert similarity(minhash(PARA), minhash(PARA + " Rev B.")) > 0.8
+    assert similarity(minhash(PARA), minhash("SX1276 radio on the SPI bus, reset on PB3")) < 0.1
+
+def test_near_duplicates_dropped_and_budget_respected():
+    hits = [
+        _hit(1, PARA, 0.1, "rev_a.pdf"),
+        _hit(2, PARA + " Rev B.", 0.12, "rev_b.pdf"),
+        _hit(3, "SX1276 radio on the SPI bus, reset on PB3.", 0.3),
+        _hit(4, "Crystal Y1 32 MHz with 12 pF load capacitors. " * 3, 0.4),
+    ]
+    sel = select_snippets(hits, budget_chars=10_000)
+    assert [h["id"] for h in sel.hits] == ["1", "3", "4"] and sel.duplicates == 1
+    small = select_snippets(hits, budget_chars=160)
+    assert small.chars <= 160 and [h["id"] for h in small.hits] == ["1", "3"] and small.over_budget == 1
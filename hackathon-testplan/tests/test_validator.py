@@ -1,6 +1,6 @@
 from __future__ import annotations
 from core.models import ParsedEntities
-from rules.validator import validate_entities, annotate_plan
+from rules.validator import RULES, run_rules, validate_entities, annotate_plan
 from core.generator import generate_plan_offline
 
 def test_validate_entities_empty_rails():
@@ -52,3 +52,50 @@ def test_annotate_plan_with_issues():
     
     assert "Validation Notes" in annotated_plan.notes
     assert "No rails found" in annotated_plan.notes
+
+def test_rules_flag_windows_ppm_and_missing_commands():
+    ent = ParsedEntities(
+        title="Test",
+        rails=[
+            {"name": "+3V3", "voltage": 3.3, "tolerance_mv": 100},
+            {"name": "+3V3_RF", "voltage": 3.35, "tolerance_mv": 100},
+            {"name": "+5V", "voltage": 500.0, "tolerance_mv": 100},
+        ],
+        oscillators=[{"ref": "Y1", "frequency_hz": 32_768, "tolerance_hz": 1_000}],
+        functional_tests=[{"name": "Ping"}],
+    )
+    report = run_rules(ent)
+    assert "+3V3 and +3V3_RF" in report.by_rule["overlapping_rail_windows"][0]
+    assert report.by_rule["implausible_rail_voltage"]
+    assert "ppm" in report.by_rule["oscillator_ppm"][0]
+    assert "Ping" in report.by_rule["functional_test_command"][0]
+    assert set(report.timings) == set(RULES)
+
+def test_overlapping_rail_windows_reports_nested_pairs():
+    ent = ParsedEntities(
+        title="Nested",
+        rails=[
+            {"name": "A", "voltage": 3.3, "tolerance_mv": 1000},
+            {"name": "B", "voltage": 3.0, "tolerance_mv": 100},
+            {"name": "C", "voltage": 3.05, "tolerance_mv": 100},
+            {"name": "D", "voltage": 5.0, "tolerance_mv": 100},
+        ],
+    )
+    issues = run_rules(ent, rules=["overlapping_rail_windows"]).by_rule["overlapping_rail_windows"]
+    assert issues == [
+        "Rails A, B, C have overlapping tolerance windows (2.90–3.15 V); confirm test points so readings cannot be swapped"
+    ]
+
+def test_overlapping_rail_windows_report_each_cluster_once():
+    rails = [{"name": f"R{i}", "voltage": 1.0 + (i % 2) * 0.5, "tolerance_mv": 20} for i in range(6_000)]
+    issues = run_rules(ParsedEntities(title="Big", rails=rails), rules=["overlapping_rail_windows"]).issues
+    assert len(issues) == 2
+    assert all("(+2990 more)" in issue for issue in issues)
+
+def test_rules_stay_fast_on_large_inputs():
+    rails = [{"name": f"R{i}", "voltage": 1.0 + (i % 40) * 0.1, "tolerance_mv": 20} for i in range(6_000)]
+    rails.append(dict(rails[0]))
+    report = run_rules(ParsedEntities(title="Big", rails=rails))
+    assert any("Duplicate rail entry: R0" in i for i in report.issues)
+    assert len(report.by_rule["overlapping_rail_windows"]) == 40
+    assert sum(report.timings.values()) < 1.0
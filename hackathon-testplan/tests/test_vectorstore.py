@@ -0,0 +1,109 @@
+from __future__ import annotations
+import subprocess, sys, threading
+from pathlib import Path
+from storage.chunking import chunk_sources
+from storage.vectorstore import VectorStore, fuse_hits
+from tests.fake_chroma import FakeChromaClient
+
+def _factory(clients):
+    def open_client(path):
+        client = FakeChromaClient(path)
+        clients.append(client)
+        return client
+    return open_client
+
+def test_import_does_not_open_chroma(tmp):
+    code = "import sys, storage.vectorstore, nlp.llm_client; print('chromadb' in sys.modules)"
+    out = subprocess.run([sys.executable, "-c", code], cwd=tmp, capture_output=True, text=True,
+                         env={"PYTHONPATH": str(Path(__file__).parent.parent)})
+    assert out.stdout.strip() == "False", out.stderr
+    assert not (tmp / "out").exists()
+
+def test_store_opens_once_on_first_use(tmp):
+    clients = []
+    store = VectorStore(tmp / "lib", client_factory=_factory(clients))
+    assert store.search("3.3V") == [] and not clients  # nothing on disk yet, nothing opened
+    threads = [threading.Thread(target=store.add_doc, args=(f"d{i}", f"rail {i} 3.3V")) for i in range(8)]
+    for t in threads: t.start()
+    for t in threads: t.join()
+    assert len(clients) == 1 and store.count() == 8
+    assert store.search("rail 3 3.3V", k=1)[0]["meta"]["name"] == "d3"
+    store.close()
+    assert clients[0].closed and not store.is_open
+    assert store.clear() and store.count() == 0 and len(clients) == 2
+
+def test_missing_chromadb_is_quiet(tmp, capsys):
+    def unavailable(path):
+        raise ImportError("No module named 'chromadb'")
+    (tmp / "lib").mkdir()
+    store = VectorStore(tmp / "lib", client_factory=unavailable)
+    assert store.search("x") == [] and store.search("y") == []
+    assert store.stats()["unavailable"] and capsys.readouterr().out.count("Warning") == 1
+
+def test_add_docs_chunks_dedups_and_batches(tmp):
+    clients = []
+    store = VectorStore(tmp / "lib", client_factory=_factory(clients))
+    body = "\n".join(f"{i} Section {i}\n" + " ".join(f"tok{i}_{j}" for j in range(300)) for i in range(1, 4))
+    docs = [("a.pdf", body, None), ("b.pdf", body, {"rev": "B"}), ("c.txt", "tiny note", None)]
+    stats = store.add_docs(docs, max_tokens=100, overlap=20, batch_size=5)
+    assert stats.docs == 3 and stats.upserted == store.count()
+    assert stats.duplicates == stats.chunks - stats.upserted > 0
+    assert -(-stats.upserted // 5) <= stats.batches <= -(-stats.chunks // 5) and stats.chunks_per_s > 0
+    again = store.add_docs(docs[:1], max_tokens=100, overlap=20)
+    assert again.upserted == 0 and again.duplicates == again.chunks
+    assert store.add_doc("c.txt", "tiny note") != ""
+
+def test_shared_chunks_list_every_source(tmp):
+    store = VectorStore(tmp / "lib", client_factory=_factory([]))
+    notice = "LEGAL NOTICE\nAll rights reserved by the vendor."
+    store.add_docs([("a.pdf", notice, None), ("b.pdf", notice, None)])  # repeat within one batch
+    fingerprint = store.add_doc("c.md", notice)  # repeat of a stored chunk
+    assert store.count() == 1
+    meta = store.search("rights reserved", k=1)[0]["meta"]
+    assert meta["name"] == "a.pdf" and meta["doc_id"] == fingerprint
+    assert [s["name"] for s in chunk_sources(meta)] == ["a.pdf", "b.pdf", "c.md"]
+    store.add_doc("c.md", notice)
+    assert len(chunk_sources(store.search("rights reserved", k=1)[0]["meta"])) == 3
+
+def test_entity_context_is_one_batched_query(tmp, monkeypatch):
+    import storage.vectorstore as vs
+    clients = []
+    store = VectorStore(tmp / "lib", client_factory=_factory(clients))
+    monkeypatch.setattr(vs, "_store", store)
+    store.add_doc("radio.pdf", "SX1276 radio on SPI, powered from +3.3V")
+    store.add_doc("power.pdf", "+5V input, +3.3V LDO")
+    store.add_doc("misc.txt", "unrelated notes")
+    terms = vs.extract_search_terms('{"rails":["+3.3V","+5V"],"parts":"SX1276 on SPI","cmd":"bit.radio"}')
+    assert terms == ["+3.3V", "+5V", "SX1276", "SPI", "bit.radio"]
+    context = vs.search_context_for_entities('{"rails":["+3.3V"],"parts":"SX1276 on SPI"}')
+    lines = context.splitlines()
+    assert clients[0].collections["design_docs"].queries == 1
+    assert len(lines) == len(set(lines)) == 3
+    assert lines[0].startswith("[radio.pdf]")  # matched by most terms
+
+def test_fuse_hits_ranks_by_agreement():
+    a = {"id": "a", "text": "", "meta": {}, "distance": 0.5}
+    b = {"id": "b", "text": "", "meta": {}, "distance": 0.2}
+    fused = fuse_hits([[b, a], [a], [a, b]])
+    assert [h["id"] for h in fused] == ["a", "b"]
+    assert fused[0]["matches"] == 3 and fused[1]["distance"] == 0.2
+
+def test_query_cache_invalidated_by_writes(tmp):
+    clients = []
+    store = VectorStore(tmp / "lib", client_factory=_factory(clients), disk_cache=True)
+    store.add_doc("power.pdf", "+5V input, +3.3V LDO")
+    coll = clients[0].collections["design_docs"]
+    assert store.search_many(["+3.3V", "I2C"]) == store.search_many(["I2C", "+3.3V"])[::-1]
+    assert coll.queries == 1
+    store.add_doc("bus.pdf", "I2C pull-ups to +3.3V")
+    assert {h["meta"]["name"] for h in store.search("I2C")} == {"power.pdf", "bus.pdf"}
+    assert coll.queries == 2
+    stats = store.stats()["query_cache"]
+    assert stats["hits"] == 2 and stats["misses"] == 3
+
+    # A second process sharing the path: disk hits until the version changes
+    other = VectorStore(tmp / "lib", client_factory=_factory(clients), disk_cache=True)
+    other.search("I2C")
+    assert len(clients) == 1 and other.stats()["query_disk_cache"]["hits"] == 1
+    assert store.clear()
+    assert other.search("I2C") == [] and len(clients) == 2
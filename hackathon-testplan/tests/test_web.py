@@ -0,0 +1,92 @@
+from __future__ import annotations
+import json, time
+from pathlib import Path
+from streamlit.testing.v1 import AppTest
+from core.models import ParsedEntities
+
+WEB = str(Path(__file__).parent.parent / "app" / "web.py")
+
+def _button(at, label):
+    return next(b for b in at.button if label in b.label)
+
+def test_generate_reuses_cached_stages(monkeypatch, sample_entities):
+    import app.web as web
+    calls = []
+    real = web.validate_entities
+    monkeypatch.setattr(web, "validate_entities", lambda ent: calls.append(ent.title) or real(ent))
+    web.plan_download.clear(); web.plan_index.clear(); web.offline_plan.clear()
+    web.validate_entities_json.clear(); web.parse_entities_json.clear()
+    text = json.dumps(sample_entities)
+    md = web.plan_download(text, "md")
+    assert md == web.offline_plan(text).to_markdown() and web.plan_download(text, "md") == md
+    assert web.plan_download(text, "md", "- extra").endswith("LLM Enhancements:\n- extra")
+    assert web.validate_entities_json(text) == real(web.parse_entities_json(text))
+    assert calls == [sample_entities["title"]]  # one validation for every later request
+
+def test_app_generates_plan_from_edited_entities():
+    import app.web as web
+    at = AppTest.from_file(WEB, default_timeout=30).run()
+    at.text_area[0].set_value(at.text_area[0].value.replace("LoRa Car Radio", "Edited Board"))
+    _button(at, "Generate Test Plan").click().run()
+    assert not at.exception
+    state = at.session_state
+    assert state["plan_entities"] == state["entities"] and '\n' not in state["entities"]  # one compact copy
+    assert {"entities_text", "entities_obj", "plan_md"}.isdisjoint(state.filtered_state)
+    assert at.markdown.values.count("# Bring-Up & Test Plan — Edited Board") == 1
+    assert at.metric[-1].value == str(len(web.offline_plan(state["plan_entities"]).steps))
+
+def test_plan_tab_pages_and_searches(sample_entities):
+    import app.web as web
+    ent = ParsedEntities.model_validate(sample_entities)
+    at = AppTest.from_file(WEB, default_timeout=30)
+    at.session_state["entities"] = at.session_state["plan_entities"] = ent.model_dump_json()
+    at.run()
+    steps = web.plan_index(ent.model_dump_json()).plan.steps
+    shown = lambda: [ln for md in at.markdown.values for ln in md.split("\n") if ln.startswith("**") and ". " in ln]
+    assert len(shown()) == min(len(steps), 25) and f"{len(steps)} of {len(steps)} steps" in at.main.caption.values
+    at.selectbox(key="plan_page_size").set_value(10).run()
+    assert len(shown()) == 10 and at.number_input(key="plan_page").max == -(-len(steps) // 10)
+    at.number_input(key="plan_page").set_value(2).run()
+    assert shown()[0] == f"**{steps[10].id}. {steps[10].description}**"
+    at.text_input(key="plan_search").set_value("ESD").run()
+    assert shown() == [f"**{s.id}. {s.description}**" for s in steps if "esd" in s.description.lower()]
+    assert at.session_state["plan_page"] == 1
+
+def test_app_merges_finished_parse_jobs():
+    from app.jobs import get_job_manager
+    manager = get_job_manager()
+    netlist = b"C  Project Name : Merged Board\n327 +5V U1\n327 +5V U2\n327 GND U1\n"
+    job_ids = [manager.submit("bom.csv", b"Y1,16MHz\nU1,SX1276\nU2,5V LDO\n"), manager.submit("board.net", netlist)]
+    assert manager.wait(job_ids, timeout=60)
+    at = AppTest.from_file(WEB, default_timeout=30).run()
+    at.session_state["parse_jobs"] = job_ids
+    at.run()
+    assert not at.exception and at.session_state["parse_jobs"] == []
+    ent = ParsedEntities.model_validate_json(at.session_state["entities"])
+    assert ent.title == "Merged Board" and [o.ref for o in ent.oscillators] == ["Y1"]  # the BOM is no longer dropped
+    assert [(r.name, r.voltage) for r in ent.rails] == [("+5V", 5.0)] and "LoRa BIT" in {t.name for t in ent.functional_tests}
+    assert any("Merged 2 sources" in s.value and "1 duplicates combined" in s.value for s in at.success)
+    assert not at.warning
+
+def test_session_sizes_report():
+    from app.session_stats import SessionSizes
+    sizes = SessionSizes(ttl=60)
+    shared = "x" * 1000
+    own = sizes.record("a", {"entities": shared, "plan_entities": shared})
+    assert own["plan_entities"] == 0 and own["entities"] > 1000  # shared values count once
+    sizes.record("b", {"entities": "{}"})
+    report = sizes.report()
+    assert report["sessions"] == 2 and report["max_bytes"] == sum(own.values())
+    assert list(report["by_key"]) == ["entities", "plan_entities"]
+    sizes.ttl = 0
+    time.sleep(0.01)
+    sizes.record("c", {})
+    assert sizes.report()["sessions"] == 1
+
+def test_session_sizes_are_sampled():
+    from app.session_stats import SessionSizes
+    sizes = SessionSizes(ttl=60, interval=60)
+    first = sizes.sample("a", {"entities": "{}"})
+    assert sizes.sample("a", {"entities": "x" * 10_000}) == first  # not re-pickled within the interval
+    sizes.interval = 0
+    assert sizes.sample("a", {"entities": "x" * 10_000})["entities"] > 10_000
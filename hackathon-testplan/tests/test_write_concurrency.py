@@ -0,0 +1,104 @@
+from __future__ import annotations
+import subprocess, sys, threading, time
+import pytest
+from pathlib import Path
+from storage.filelock import FileLock
+from storage.vectorstore import VectorStore
+from tests.fake_chroma import FakeChromaClient
+
+ROOT = Path(__file__).parent.parent
+
+WRITER = """
+import sys
+from storage.vectorstore import VectorStore
+store = VectorStore(sys.argv[1], backend="local")
+for i in range(int(sys.argv[3])):
+    assert store.add_doc(f"w{sys.argv[2]}-{i}", f"writer w{sys.argv[2]} doc d{sys.argv[2]}x{i} rail 3.3V")
+store.close()
+"""
+
+def test_concurrent_processes_lose_no_writes(tmp):
+    writers, per_writer = 4, 25
+    procs = [subprocess.Popen([sys.executable, "-c", WRITER, str(tmp / "lib"), str(w), str(per_writer)],
+                              cwd=ROOT, env={"PYTHONPATH": str(ROOT)}, stderr=subprocess.PIPE, text=True)
+             for w in range(writers)]
+    reader = VectorStore(tmp / "lib", backend="local")
+    latencies = []
+    while any(p.poll() is None for p in procs):
+        start = time.perf_counter()
+        reader.search(f"d{len(latencies) % writers}x3 rail", k=3)
+        latencies.append(time.perf_counter() - start)
+    for p in procs:
+        assert p.wait() == 0, p.stderr.read()
+    assert reader.count() == writers * per_writer
+    for w in range(writers):
+        for i in range(per_writer):
+            assert reader.search(f"d{w}x{i}", k=1)[0]["meta"]["name"] == f"w{w}-{i}"
+    assert max(latencies) < 1.0  # reads never wait on the writers' lock
+    reader.close()
+
+def test_add_doc_calls_coalesce_into_batches(tmp):
+    store = VectorStore(tmp / "lib", backend="local")
+    names = []
+    threads = [threading.Thread(target=lambda i=i: names.append(store.add_doc(f"d{i}", f"net n{i} rail"))) for i in range(20)]
+    for t in threads: t.start()
+    for t in threads: t.join()
+    assert all(names) and store.count() == 20
+    assert store._write_queue.flushes < 20
+    store.close()
+    assert store._write_queue is None
+    assert store.add_doc("late", "written after close") and store.count() == 21
+
+def test_failed_document_does_not_fail_its_batch(tmp, monkeypatch):
+    client = FakeChromaClient()
+    store = VectorStore(tmp / "lib", client_factory=lambda path: client)
+    coll = store.collection
+    real_upsert = coll.upsert
+
+    def upsert(ids, documents, metadatas=None):
+        if any("poison" in d for d in documents):
+            raise ValueError("rejected document")
+        real_upsert(ids, documents, metadatas)
+
+    monkeypatch.setattr(coll, "upsert", upsert)
+    futures = [store.queue_doc(f"d{i}", f"net n{i} rail") for i in range(5)] + [store.queue_doc("bad", "poison net")]
+    results = [f.result(timeout=10) for f in futures]
+    assert results[:5] == [[]] * 5 and len(results[5]) == 1
+    assert store._write_queue.flushes < 6  # coalesced with the bad document
+    assert store.add_doc("good", "net n9 rail") and not store.add_doc("bad", "poison again")
+    assert store.count() == 6
+    store.close()
+
+def test_serial_add_doc_skips_the_linger(tmp):
+    store = VectorStore(tmp / "lib", backend="local")
+    store.add_doc("d0", "net n0 rail")
+    store._write_queue.linger = 5.0
+    start = time.perf_counter()
+    for i in range(1, 6):
+        assert store.add_doc(f"d{i}", f"net n{i} rail")
+    assert time.perf_counter() - start < 2.0  # no caller waits out the linger
+    assert store._write_queue.flushes == 6
+    store.close()
+
+def test_flush_error_reaches_every_caller(tmp, monkeypatch):
+    store = VectorStore(tmp / "lib", client_factory=lambda path: FakeChromaClient())
+    real_upsert = store._upsert_new
+
+    def broken(chunks, stats):
+        raise OSError("disk full")
+
+    monkeypatch.setattr(store, "_upsert_new", broken)
+    futures = [store.queue_doc(f"d{i}", f"net n{i} rail") for i in range(3)]
+    for f in futures:
+        with pytest.raises(OSError):
+            f.result(timeout=10)
+    monkeypatch.setattr(store, "_upsert_new", real_upsert)
+    assert store.add_doc("after", "net n9 rail") and store.count() == 1  # the writer thread survived
+    store.close()
+
+def test_file_lock_times_out_across_handles(tmp):
+    with FileLock(tmp / "w.lock"):
+        with pytest.raises(TimeoutError):
+            FileLock(tmp / "w.lock", timeout=0.05).acquire()
+    with FileLock(tmp / "w.lock", timeout=0.05) as lock:
+        assert lock.waited < 0.05